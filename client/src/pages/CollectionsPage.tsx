@@ -1,11 +1,11 @@
 import { useEffect, useState } from 'react'
 import { motion } from 'framer-motion'
 import { useNavigate } from 'react-router-dom'
-import { FolderOpen, Calendar, Files, Download } from 'lucide-react'
+import { FolderOpen, Calendar, Files, Download, Bookmark } from 'lucide-react'
 import { OrbitalMenu } from '../components/OrbitalMenu'
 import { GlassCard } from '../components/GlassCard'
 import { OrbButton } from '../components/OrbButton'
-import { getAllCollections, getCollection } from '../utils/api'
+import { createTaxonomy, getAllCollections, getCollection } from '../utils/api'
 import { useStore } from '../store/useStore'
 import JSZip from 'jszip'
 
@@ -15,6 +15,7 @@ export function CollectionsPage() {
   const [collections, setCollections] = useState<any[]>([])
   const [isLoading, setIsLoading] = useState(true)
   const [downloadingId, setDownloadingId] = useState<string | null>(null)
+  const [savingTemplateId, setSavingTemplateId] = useState<string | null>(null)
 
   useEffect(() => {
     loadCollections()
@@ -86,6 +87,23 @@ export function CollectionsPage() {
     }
   }
 
+  const handleSaveTemplate = async (collectionData: any, index: number, e: React.MouseEvent) => {
+    e.stopPropagation() // Prevent card click
+
+    // The collection's categories and folders become a template new uploads can be placed into
+    const name = window.prompt('Template name', `Collection ${index + 1}`)
+    if (!name?.trim()) return
+
+    try {
+      setSavingTemplateId(collectionData.collection_id)
+      await createTaxonomy(name.trim(), { collectionId: collectionData.collection_id })
+    } catch (error) {
+      console.error('Error saving taxonomy template:', error)
+    } finally {
+      setSavingTemplateId(null)
+    }
+  }
+
   return (
     <div className="relative w-full min-h-screen">
       <OrbitalMenu />
@@ -163,8 +181,8 @@ export function CollectionsPage() {
                     )}
                   </div>
 
-                  {/* Download Button */}
-                  <div className="mt-4 pt-4 border-t border-white/10">
+                  {/* Download and Template Buttons */}
+                  <div className="mt-4 pt-4 border-t border-white/10 space-y-2">
                     <OrbButton
                       size="sm"
                       variant="primary"
@@ -175,6 +193,16 @@ export function CollectionsPage() {
                       <Download className="w-4 h-4 mr-2" />
                       {downloadingId === collection.collection_id ? 'Downloading...' : 'Download ZIP'}
                     </OrbButton>
+                    <OrbButton
+                      size="sm"
+                      variant="ghost"
+                      onClick={(e) => handleSaveTemplate(collection, index, e)}
+                      disabled={savingTemplateId === collection.collection_id}
+                      className="w-full"
+                    >
+                      <Bookmark className="w-4 h-4 mr-2" />
+                      {savingTemplateId === collection.collection_id ? 'Saving...' : 'Save as Template'}
+                    </OrbButton>
                   </div>
                 </GlassCard>
               </motion.div>
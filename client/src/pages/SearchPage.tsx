@@ -1,15 +1,35 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { motion } from 'framer-motion'
 import { Search as SearchIcon, Sparkles, File, FolderOpen } from 'lucide-react'
 import { OrbitalMenu } from '../components/OrbitalMenu'
 import { GlassCard } from '../components/GlassCard'
-import { searchCollections } from '../utils/api'
+import { autocompleteFiles, searchCollections } from '../utils/api'
 import { FileItem } from '../store/useStore'
 
 export function SearchPage() {
   const [query, setQuery] = useState('')
   const [results, setResults] = useState<FileItem[]>([])
   const [isSearching, setIsSearching] = useState(false)
+  const [suggestions, setSuggestions] = useState<string[]>([])
+
+  // Typeahead from the filename index; stale requests are aborted as the user types
+  useEffect(() => {
+    const q = query.trim()
+    if (!q) {
+      setSuggestions([])
+      return
+    }
+    const controller = new AbortController()
+    const timer = setTimeout(() => {
+      autocompleteFiles(q, { limit: 8, signal: controller.signal })
+        .then((files) => setSuggestions([...new Set(files.map((file) => file.name))]))
+        .catch(() => {})
+    }, 80)
+    return () => {
+      clearTimeout(timer)
+      controller.abort()
+    }
+  }, [query])
 
   const handleSearch = async () => {
     if (!query.trim()) return
@@ -61,9 +81,15 @@ export function SearchPage() {
                   value={query}
                   onChange={(e) => setQuery(e.target.value)}
                   onKeyPress={(e) => e.key === 'Enter' && handleSearch()}
+                  list="search-suggestions"
                   placeholder="Search by meaning, not just keywords..."
                   className="w-full bg-white/5 border border-white/10 rounded-2xl px-12 py-4 text-white placeholder-white/40 focus:outline-none focus:border-cosmic-cyan transition-colors"
                 />
+                <datalist id="search-suggestions">
+                  {suggestions.map((name) => (
+                    <option key={name} value={name} />
+                  ))}
+                </datalist>
               </div>
               <button
                 onClick={handleSearch}
@@ -1,13 +1,13 @@
 import { useState, useRef, useEffect } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
-import { Upload, FolderOpen, Sparkles, AlertCircle, RefreshCw, ArrowLeft, X, Check } from 'lucide-react'
+import { Upload, FolderOpen, Sparkles, AlertCircle, RefreshCw, ArrowLeft, X, Check, Trash2 } from 'lucide-react'
 import { useNavigate } from 'react-router-dom'
 import { OrbitalMenu } from '../components/OrbitalMenu'
 import { GlassCard } from '../components/GlassCard'
 import { OrbButton } from '../components/OrbButton'
 import { useStore } from '../store/useStore'
 import { pickDirectory, processFiles, isFileSystemAccessSupported } from '../utils/fileProcessor'
-import { analyzeFiles, healthCheck } from '../utils/api'
+import { analyzeFiles, deleteTaxonomy, getAllTaxonomies, healthCheck, Taxonomy } from '../utils/api'
 
 export function WorkspacePage() {
   const navigate = useNavigate()
@@ -18,6 +18,8 @@ export function WorkspacePage() {
   const [backendStatus, setBackendStatus] = useState<'checking' | 'connected' | 'error'>('checking')
   const [selectedFiles, setSelectedFiles] = useState<File[]>([])
   const [directoryPath, setDirectoryPath] = useState<string>('')
+  const [taxonomies, setTaxonomies] = useState<Taxonomy[]>([])
+  const [taxonomyId, setTaxonomyId] = useState<string>('')
 
   const {
     files,
@@ -79,6 +81,26 @@ export function WorkspacePage() {
     checkBackend()
   }, [])
 
+  // Saved taxonomy templates; without any the AI designs the structure
+  useEffect(() => {
+    if (backendStatus !== 'connected') return
+    getAllTaxonomies()
+      .then(setTaxonomies)
+      .catch((err) => console.error('Error loading taxonomy templates:', err))
+  }, [backendStatus])
+
+  const handleDeleteTaxonomy = async () => {
+    if (!taxonomyId) return
+    try {
+      await deleteTaxonomy(taxonomyId)
+      setTaxonomies(taxonomies.filter((t) => t.taxonomy_id !== taxonomyId))
+      setTaxonomyId('')
+    } catch (err) {
+      console.error('Error deleting taxonomy template:', err)
+      setError('Failed to delete the template. Please try again.')
+    }
+  }
+
   const handleCancelProcessing = () => {
     setIsProcessing(false)
     setProcessingMessage('')
@@ -140,7 +162,7 @@ export function WorkspacePage() {
       console.log('First file sample:', processed[0])
       console.log('Full payload:', JSON.stringify({ files: processed.slice(0, 2) }, null, 2))
 
-      const result = await analyzeFiles(processed)
+      const result = await analyzeFiles(processed, taxonomyId || undefined)
 
       console.log('Received result from backend:', result)
 
@@ -448,6 +470,34 @@ export function WorkspacePage() {
                           )}
                         </div>
 
+                        {/* Taxonomy Template */}
+                        {taxonomies.length > 0 && (
+                          <div className="mb-6 flex items-center justify-center gap-2">
+                            <select
+                              value={taxonomyId}
+                              onChange={(e) => setTaxonomyId(e.target.value)}
+                              className="px-4 py-2 rounded-lg bg-white/10 border border-white/20 text-white/80 text-sm"
+                              aria-label="Taxonomy template"
+                            >
+                              <option value="">Let the AI design the structure</option>
+                              {taxonomies.map((t) => (
+                                <option key={t.taxonomy_id} value={t.taxonomy_id}>
+                                  {t.name} ({t.folders} folders)
+                                </option>
+                              ))}
+                            </select>
+                            {taxonomyId && (
+                              <button
+                                onClick={handleDeleteTaxonomy}
+                                className="p-2 rounded-lg bg-white/10 hover:bg-red-500/30 text-white/60 hover:text-red-300 transition-all duration-200"
+                                aria-label="Delete template"
+                              >
+                                <Trash2 className="w-4 h-4" />
+                              </button>
+                            )}
+                          </div>
+                        )}
+
                         {/* Action Buttons */}
                         <div className="flex flex-col sm:flex-row gap-4 justify-center items-center">
                           <OrbButton
@@ -71,11 +71,16 @@ export interface AnalyzeResponse {
 /**
  * Send files to backend for AI analysis and organization
  */
-export async function analyzeFiles(files: FileItem[]): Promise<AnalyzeResponse> {
+export async function analyzeFiles(files: FileItem[], taxonomyId?: string): Promise<AnalyzeResponse> {
   try {
     console.log(`[analyzeFiles] Sending ${files.length} files to backend`)
 
-    const response = await api.post<AnalyzeResponse>('/api/analyze', { files })
+    // Compact view: placed files come back as {id, name, path, type, size}; the
+    // store already holds everything else (content, text) for each id
+    const response = await api.post<AnalyzeResponse>('/api/analyze', { files }, {
+      // With a taxonomy template, files are placed by similarity to its folders (no LLM call)
+      params: { view: 'compact', fields: 'path,type,size', taxonomy_id: taxonomyId },
+    })
 
     console.log('[analyzeFiles] Success:', response.data)
     return response.data
@@ -95,6 +100,21 @@ export async function searchCollections(query: string): Promise<FileItem[]> {
   return response.data.results
 }
 
+/**
+ * Filename/path suggestions for the search box (no embedding call, fast enough per keystroke)
+ */
+export async function autocompleteFiles(
+  q: string,
+  options: { limit?: number; collectionIds?: string[]; signal?: AbortSignal } = {}
+): Promise<(FileItem & { collection_id: string })[]> {
+  const response = await api.get<{ results: (FileItem & { collection_id: string })[] }>('/api/autocomplete', {
+    params: { q, limit: options.limit, collection_id: options.collectionIds },
+    paramsSerializer: { indexes: null }, // collection_id=a&collection_id=b
+    signal: options.signal,
+  })
+  return response.data.results
+}
+
 /**
  * Get collection by ID
  */
@@ -111,6 +131,45 @@ export async function getAllCollections(): Promise<any[]> {
   return response.data.collections
 }
 
+export interface Taxonomy {
+  taxonomy_id: string
+  name: string
+  structure: Record<string, Record<string, string[]>>
+  folders: number
+  source_collection_id: string | null
+  embedding_space: string | null
+  created_at: string
+}
+
+/**
+ * Get all taxonomy templates
+ */
+export async function getAllTaxonomies(): Promise<Taxonomy[]> {
+  const response = await api.get<{ taxonomies: Taxonomy[] }>('/api/taxonomies')
+  return response.data.taxonomies
+}
+
+/**
+ * Save a collection's organization (or a given structure) as a reusable taxonomy template
+ */
+export async function createTaxonomy(
+  name: string,
+  source: { collectionId: string } | { structure: Taxonomy['structure'] }
+): Promise<Taxonomy> {
+  const body = 'collectionId' in source
+    ? { name, collection_id: source.collectionId }
+    : { name, structure: source.structure }
+  const response = await api.post<Taxonomy>('/api/taxonomies', body)
+  return response.data
+}
+
+/**
+ * Delete a taxonomy template
+ */
+export async function deleteTaxonomy(taxonomyId: string): Promise<void> {
+  await api.delete(`/api/taxonomies/${taxonomyId}`)
+}
+
 /**
  * Health check
  */
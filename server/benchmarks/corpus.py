@@ -0,0 +1,110 @@
+"""
+Synthetic Corpus - Generate file lists shaped like real user folders
+"""
+from typing import List, Dict, Any, Iterator, Optional
+import random
+
+
+# Extension -> relative weight; roughly a mixed personal/work folder
+EXTENSION_WEIGHTS = {
+    "pdf": 12, "docx": 8, "txt": 8, "md": 5, "xlsx": 4, "csv": 4, "pptx": 2,
+    "jpg": 14, "png": 10, "mp4": 3, "mp3": 3,
+    "py": 6, "js": 5, "ts": 3, "html": 2, "css": 2, "json": 4,
+    "zip": 2, "": 2,
+}
+TEXT_EXTENSIONS = {"pdf", "docx", "txt", "md", "csv", "py", "js", "ts", "html", "css", "json"}
+
+WORDS = (
+    "invoice report quarterly budget project meeting notes syllabus lecture assignment "
+    "photo vacation family receipt contract proposal design draft final review summary "
+    "analysis data model server client config readme roadmap plan research paper thesis "
+    "chapter tax statement bank salary resume portfolio screenshot recording podcast music"
+).split()
+
+
+class CorpusSpec:
+    """Shape of a synthetic corpus"""
+
+    def __init__(
+        self,
+        files: int = 1000,
+        text_ratio: float = 0.6,
+        mean_text_length: int = 1500,
+        duplicate_ratio: float = 0.1,
+        folder_depth: int = 3,
+        folders: int = 50,
+        seed: int = 42,
+    ):
+        self.files = files
+        self.text_ratio = text_ratio
+        self.mean_text_length = mean_text_length
+        self.duplicate_ratio = duplicate_ratio
+        self.folder_depth = folder_depth
+        self.folders = folders
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    words = []
+    total = 0
+    while total < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)
+
+
+def iter_corpus(spec: CorpusSpec) -> Iterator[Dict[str, Any]]:
+    """Yield file dicts in the /api/analyze FileItem shape"""
+    rng = random.Random(spec.seed)
+    extensions = list(EXTENSION_WEIGHTS)
+    weights = list(EXTENSION_WEIGHTS.values())
+    folders = [
+        "/".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, spec.folder_depth)))
+        for _ in range(spec.folders)
+    ]
+    originals: List[Dict[str, Any]] = []
+
+    for i in range(spec.files):
+        if originals and rng.random() < spec.duplicate_ratio:
+            source = rng.choice(originals)
+            stem, dot, ext = source["name"].rpartition(".")
+            name = f"{stem} ({rng.randint(1, 3)}).{ext}" if dot else f"{source['name']} copy"
+            folder = rng.choice(folders)
+            yield {
+                **source,
+                "id": f"file-{i}",
+                "name": name,
+                "path": f"{folder}/{name}",
+            }
+            continue
+
+        ext = rng.choices(extensions, weights)[0]
+        stem = "_".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + f"_{i}"
+        name = f"{stem}.{ext}" if ext else stem
+        folder = rng.choice(folders)
+        file = {
+            "id": f"file-{i}",
+            "name": name,
+            "path": f"{folder}/{name}",
+            "type": ext or "unknown",
+            "size": int(rng.lognormvariate(11, 2)),
+        }
+        if ext in TEXT_EXTENSIONS and rng.random() < spec.text_ratio:
+            length = max(50, int(rng.expovariate(1 / spec.mean_text_length)))
+            file["extractedText"] = _sentence(rng, length)
+        if len(originals) < 5000:
+            originals.append(file)
+        yield file
+
+
+def generate_corpus(spec: CorpusSpec) -> List[Dict[str, Any]]:
+    return list(iter_corpus(spec))
+
+
+def search_queries(count: int, seed: Optional[int] = None) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) for _ in range(count)]
@@ -0,0 +1,204 @@
+"""
+Fake Ollama - Local stand-in for /api/embeddings and /api/generate with tunable latency/failures
+"""
+from typing import Optional
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+# Structure returned by /api/generate, shaped like a real model answer
+DEFAULT_STRUCTURE = {
+    "structure": {
+        "Work": {
+            "Reports": ["Quarterly Reports", "Project Reports"],
+            "Finance": ["Invoices", "Receipts"],
+        },
+        "Code": {
+            "Source Code": ["Python", "JavaScript"],
+            "Web Files": ["HTML", "CSS"],
+        },
+        "Media": {
+            "Images": ["Photos", "Screenshots"],
+            "Videos": ["Recordings"],
+        },
+        "Education": {
+            "Syllabus": ["Computer Science"],
+            "Notes": ["Lectures"],
+        },
+    },
+    "rules": {"file_name_pattern": "Category/Subcategory/Folder"},
+}
+
+
+class FakeModelConfig:
+    """Latency and failure knobs; latencies are in seconds"""
+
+    def __init__(
+        self,
+        embedding_latency: float = 0.02,
+        generate_latency: float = 2.0,
+        jitter: float = 0.5,
+        tail_probability: float = 0.0,
+        tail_multiplier: float = 10.0,
+        failure_rate: float = 0.0,
+        dimension: int = 768,
+        tokens_per_second: float = 200.0,
+        prompt_tokens_per_second: float = 0.0,
+    ):
+        self.embedding_latency = embedding_latency
+        self.generate_latency = generate_latency
+        self.jitter = jitter
+        self.tail_probability = tail_probability
+        self.tail_multiplier = tail_multiplier
+        self.failure_rate = failure_rate
+        self.dimension = dimension
+        self.tokens_per_second = tokens_per_second
+        # Prompt evaluation before the first token (~4 characters per token); 0 ignores prompt length
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+
+    def prefill(self, prompt: str) -> float:
+        if not self.prompt_tokens_per_second:
+            return 0.0
+        return len(prompt) / 4 / self.prompt_tokens_per_second
+
+    def delay(self, base: float) -> float:
+        """Lognormal-ish latency around `base`, with an optional straggler tail"""
+        value = base * random.lognormvariate(0, self.jitter) if self.jitter else base
+        if self.tail_probability and random.random() < self.tail_probability:
+            value *= self.tail_multiplier
+        return value
+
+
+def embedding_for(text: str, dimension: int) -> list:
+    """Deterministic unit vector per text"""
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    vector = rng.standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def create_app(config: FakeModelConfig) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    app.state.config = config
+    app.state.counters = {"embeddings": 0, "generate": 0, "failures": 0, "prompt_chars": 0}
+
+    def should_fail() -> bool:
+        if config.failure_rate and random.random() < config.failure_rate:
+            app.state.counters["failures"] += 1
+            return True
+        return False
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.counters["embeddings"] += 1
+        await asyncio.sleep(config.delay(config.embedding_latency))
+        if should_fail():
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        return {"embedding": embedding_for(body.get("prompt", ""), config.dimension)}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        app.state.counters["generate"] += 1
+        app.state.counters["prompt_chars"] += len(body.get("prompt", ""))
+        await asyncio.sleep(config.prefill(body.get("prompt", "")))
+        if should_fail():
+            await asyncio.sleep(config.delay(config.generate_latency))
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+
+        text = json.dumps(DEFAULT_STRUCTURE)
+        if not body.get("stream", True):
+            await asyncio.sleep(config.delay(config.generate_latency))
+            return {"model": body.get("model"), "response": text, "done": True}
+
+        # Streamed answer: the total latency is spread over ~4 character "tokens"
+        tokens = [text[i : i + 4] for i in range(0, len(text), 4)]
+        per_token = 1.0 / config.tokens_per_second if config.tokens_per_second else 0.0
+
+        async def stream():
+            for token in tokens:
+                if per_token:
+                    await asyncio.sleep(per_token)
+                yield json.dumps({"model": body.get("model"), "response": token, "done": False}) + "\n"
+            yield json.dumps({"model": body.get("model"), "response": "", "done": True}) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "llama3.2"}, {"name": "nomic-embed-text"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.counters
+
+    return app
+
+
+class FakeOllamaServer:
+    """Runs the fake model server on a background thread"""
+
+    def __init__(self, config: Optional[FakeModelConfig] = None, host: str = "127.0.0.1", port: int = 11555):
+        self.config = config or FakeModelConfig()
+        self.host = host
+        self.port = port
+        self.app = create_app(self.config)
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level="warning", access_log=False)
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def counters(self) -> dict:
+        return dict(self.app.state.counters)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Fake Ollama server did not start")
+            time.sleep(0.02)
+
+    def stop(self):
+        self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--embedding-latency", type=float, default=0.02)
+    parser.add_argument("--generate-latency", type=float, default=2.0)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeModelConfig(
+        embedding_latency=args.embedding_latency,
+        generate_latency=args.generate_latency,
+        jitter=args.jitter,
+        tail_probability=args.tail_probability,
+        failure_rate=args.failure_rate,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+    )
+    uvicorn.run(create_app(config), host="127.0.0.1", port=args.port, log_level="info")
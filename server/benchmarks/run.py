@@ -0,0 +1,314 @@
+"""
+Benchmark Runner - End-to-end throughput/latency/memory measurements against a fake model server
+
+Usage (from the server directory):
+    python -m benchmarks.run --files 5000 --output results.json
+    python -m benchmarks.run --files 5000 --baseline results.json
+"""
+from typing import Dict, Any, List, Optional
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+from benchmarks.corpus import CorpusSpec, generate_corpus, search_queries  # noqa: E402
+from benchmarks.fake_ollama import FakeModelConfig, FakeOllamaServer  # noqa: E402
+
+
+# Metric name suffixes where a bigger number is better; everything else is "lower is better"
+HIGHER_IS_BETTER = ("files_per_second", "queries_per_second")
+# Descriptive counts that are reported but never judged
+INFORMATIONAL = {"files", "queries", "concurrency", "categories", "duplicate_groups"}
+
+
+def _current_rss() -> int:
+    """Resident set size in bytes (Linux /proc, falling back to the peak from getrusage)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RSSSampler:
+    """Polls RSS on a background thread to find the peak during a phase"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.baseline = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.baseline = self.peak = _current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _current_rss())
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Server-Timing "name;dur=ms, ..." -> {name: seconds}"""
+    stages = {}
+    for entry in filter(None, (e.strip() for e in (header or "").split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name != "total":
+                stages[name] = float(value) / 1000
+    return stages
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _dir_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    if not path.exists():
+        return 0
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _encode_upload(files: List[Dict[str, Any]], upload: str):
+    if upload == "json":
+        return json.dumps({"files": files}).encode(), {"content-type": "application/json"}
+    body = "".join(json.dumps(f) + "\n" for f in files).encode()
+    if upload == "ndjson":
+        return body, {"content-type": "application/x-ndjson"}
+    return gzip.compress(body, 6), {"content-type": "application/x-ndjson", "content-encoding": "gzip"}
+
+
+async def _run(args, workdir: Path, server: FakeOllamaServer) -> Dict[str, Any]:
+    import httpx
+    import main
+
+    app = main.app
+    spec = CorpusSpec(
+        files=args.files,
+        text_ratio=args.text_ratio,
+        mean_text_length=args.mean_text_length,
+        duplicate_ratio=args.duplicate_ratio,
+        seed=args.seed,
+    )
+    results: Dict[str, Any] = {}
+
+    startup = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        results["startup_seconds"] = time.perf_counter() - startup
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Analyze
+            files = generate_corpus(spec)
+            body, headers = _encode_upload(files, args.upload)
+            headers["x-lumina-timing"] = "1"
+            del files
+            with RSSSampler() as rss:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/analyze", content=body, headers=headers, params={"view": args.view}
+                )
+                elapsed = time.perf_counter() - start
+            del body
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/analyze failed: {response.status_code} {response.text[:500]}")
+            payload = response.json()
+
+            results["analyze"] = {
+                "files": args.files,
+                "seconds": elapsed,
+                "files_per_second": args.files / elapsed if elapsed else 0.0,
+                "stage_seconds": parse_server_timing(response.headers.get("server-timing")),
+                "peak_rss_bytes": rss.peak,
+                "peak_rss_delta_bytes": rss.peak - rss.baseline,
+                "request_bytes": len(response.request.content or b""),
+                "response_bytes": len(response.content),
+                "response_wire_bytes": response.num_bytes_downloaded,
+                "response_encoding": response.headers.get("content-encoding", "identity"),
+                "categories": len(payload.get("categories", [])),
+                "duplicate_groups": len(payload.get("duplicate_groups", [])),
+            }
+            collection_id = payload["collection_id"]
+
+            # Search
+            latencies = []
+            queries = search_queries(args.search_queries, seed=args.seed)
+            semaphore = asyncio.Semaphore(args.search_concurrency)
+
+            async def one(query: str):
+                async with semaphore:
+                    start = time.perf_counter()
+                    r = await client.get("/api/search", params={"query": query, "limit": 10})
+                    latencies.append(time.perf_counter() - start)
+                    r.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*[one(q) for q in queries])
+            search_elapsed = time.perf_counter() - start
+            results["search"] = {
+                "queries": len(queries),
+                "concurrency": args.search_concurrency,
+                "queries_per_second": len(queries) / search_elapsed if search_elapsed else 0.0,
+                "p50_seconds": _percentile(latencies, 50),
+                "p95_seconds": _percentile(latencies, 95),
+                "p99_seconds": _percentile(latencies, 99),
+                "mean_seconds": statistics.fmean(latencies) if latencies else 0.0,
+            }
+
+            # Collection read
+            start = time.perf_counter()
+            (await client.get(f"/api/collections/{collection_id}")).raise_for_status()
+            results["collection_read_seconds"] = time.perf_counter() - start
+
+    results["storage"] = {
+        "sqlite_bytes": _dir_size(workdir / "lumina.db"),
+        "chroma_bytes": _dir_size(workdir / "chroma_db"),
+    }
+    results["fake_server"] = server.counters
+    return {"spec": spec.to_dict(), "results": results}
+
+
+def flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested numeric results into dotted metric names"""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Relative change per metric; `regression` is set when it moved the wrong way past tolerance"""
+    now = flatten(current["results"])
+    before = flatten(baseline["results"])
+    rows = []
+    for name in sorted(set(now) & set(before)):
+        if name.startswith("fake_server.") or name.rsplit(".", 1)[-1] in INFORMATIONAL or not before[name]:
+            continue
+        change = (now[name] - before[name]) / abs(before[name])
+        higher_better = name.endswith(HIGHER_IS_BETTER)
+        worse = -change if higher_better else change
+        rows.append({
+            "metric": name,
+            "baseline": before[name],
+            "current": now[name],
+            "change": change,
+            "regression": worse > tolerance,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LUMINA end-to-end benchmark")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--text-ratio", type=float, default=0.6)
+    parser.add_argument("--mean-text-length", type=int, default=1500)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--upload", choices=["json", "ndjson", "ndjson-gzip"], default="json")
+    parser.add_argument("--view", choices=["full", "compact"], default="full", help="/api/analyze response view")
+    parser.add_argument("--search-queries", type=int, default=200)
+    parser.add_argument("--search-concurrency", type=int, default=1)
+    parser.add_argument("--embedding-latency", type=float, default=0.02)
+    parser.add_argument("--generate-latency", type=float, default=2.0)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=11555)
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    config = FakeModelConfig(
+        embedding_latency=args.embedding_latency,
+        generate_latency=args.generate_latency,
+        jitter=args.jitter,
+        tail_probability=args.tail_probability,
+        failure_rate=args.failure_rate,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+    )
+    server = FakeOllamaServer(config, port=args.port)
+    server.start()
+
+    with tempfile.TemporaryDirectory(prefix="lumina-bench-") as tmp:
+        workdir = Path(tmp)
+        # Must be set before config.settings is imported by the app
+        os.environ.update({
+            "AI_PROVIDER": "ollama",
+            "OLLAMA_BASE_URL": server.url,
+            "DATABASE_URL": f"sqlite:///{workdir / 'lumina.db'}",
+            "CHROMA_PERSIST_DIR": str(workdir / "chroma_db"),
+        })
+        try:
+            # Keep stdout clean for the JSON report; app progress output goes to stderr
+            with contextlib.redirect_stdout(sys.stderr):
+                report = asyncio.run(_run(args, workdir, server))
+        finally:
+            server.stop()
+
+    report["meta"] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "upload": args.upload,
+        "fake_model": vars(config),
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        report["comparison"] = rows
+        regressions = [r for r in rows if r["regression"]]
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:<45} {row['baseline']:>14.4f} -> {row['current']:>14.4f} "
+                  f"({row['change']:+.1%}) {flag}", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.2"
     OLLAMA_EMBEDDING_MODEL: str = "nomic-embed-text"
+    OLLAMA_REPLICA_URLS: List[str] = []  # Extra Ollama servers with the same models, for failover/hedging
 
     # Gemini API (Cloud)
     GEMINI_API_KEY: str = ""
@@ -23,6 +24,13 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./lumina.db"
     CHROMA_PERSIST_DIR: str = "./chroma_db"
 
+    # Retention and compaction (0 disables a policy)
+    RETENTION_KEEP_LAST: int = 0  # Keep only the newest N collections
+    RETENTION_MAX_AGE_DAYS: float = 0  # Delete collections older than this
+    DELETE_BATCH_SIZE: int = 1000  # File rows deleted per transaction
+    COMPACTION_MIN_DELETED_ROWS: int = 5000  # Deleted rows that trigger a background SQLite compaction
+    COMPACTION_PAGES_PER_STEP: int = 1000  # Free pages returned per incremental vacuum step
+
     # Server
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -34,10 +42,102 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 52428800  # 50MB
     MAX_FILES_PER_BATCH: int = 10000
 
+    # Responses
+    ANALYZE_RESPONSE_VIEW: str = "full"  # /api/analyze default: "full" file dicts or "compact" ({id, name} + ?fields=)
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # Smaller JSON responses are sent uncompressed
+    RESPONSE_GZIP_LEVEL: int = 5
+    RESPONSE_BROTLI_QUALITY: int = 4  # br needs the optional 'brotli' package
+    RESPONSE_ZSTD_LEVEL: int = 3
+    STATS_MAX_TOP_N: int = 100  # Largest `top_n` (extensions listed) a collection stats request may ask for
+
+    # Admission control for bulk endpoints (analyze, snapshot import, neighbor graph builds)
+    ADMISSION_MAX_BULK_REQUESTS: int = 2  # Bulk requests processed at once
+    ADMISSION_MAX_INFLIGHT_BYTES: int = 268435456  # 256MB of request bodies across admitted bulk requests
+    ADMISSION_MAX_REQUEST_BYTES: int = 134217728  # 128MB per request (413 beyond)
+    ADMISSION_QUEUE_LIMIT: int = 8  # Bulk requests allowed to wait; more get 429
+    ADMISSION_QUEUE_TIMEOUT: float = 30.0  # Seconds a bulk request may wait before 429
+    ADMISSION_RETRY_AFTER: int = 5  # Retry-After before any bulk request has completed
+
+    # Neighbor graph ("similar files", near-duplicate suggestions, clustering)
+    NEIGHBOR_GRAPH_DIR: str = "./neighbor_graphs"
+    NEIGHBOR_GRAPH_K: int = 10  # Neighbors kept per file
+    NEIGHBOR_MAX_LIMIT: int = 100  # Largest similar-files `limit` and graph `k` a request may ask for
+    NEIGHBOR_GRAPH_MEMORY_MB: int = 256  # Budget for one block of similarity scores while building
+    NEIGHBOR_GRAPH_CACHE_SIZE: int = 8  # Graphs kept loaded
+    NEIGHBOR_DUPLICATE_THRESHOLD: float = 0.95  # Cosine similarity suggested as a near-duplicate
+    NEIGHBOR_CLUSTER_THRESHOLD: float = 0.8  # Cosine similarity linking files into one cluster
+
+    # Filename/path autocomplete (SQLite FTS5 trigram index, no model calls)
+    AUTOCOMPLETE_DEFAULT_LIMIT: int = 10
+    AUTOCOMPLETE_MAX_LIMIT: int = 50
+    AUTOCOMPLETE_MAX_QUERY_LENGTH: int = 200
+    AUTOCOMPLETE_CANDIDATES: int = 200  # Newest index hits ranked per query (name hits and name-or-path hits each)
+
+    # Re-embedding migration (rebuilds the vector index when the embedding model changes)
+    VECTOR_MIGRATION_AUTO: bool = True  # Start it on startup and on provider switches when the model differs
+    VECTOR_MIGRATION_BATCH_SIZE: int = 50  # Files re-embedded per batch
+    VECTOR_MIGRATION_MAX_RATE: float = 20.0  # Files per second at most; 0 = unpaced
+    VECTOR_MIGRATION_IDLE_WAIT: float = 2.0  # Seconds between checks while bulk requests are running
+    VECTOR_MIGRATION_MAX_ATTEMPTS: int = 3  # Passes that retry a file whose embedding failed before it is left out
+
+    # Export
+    EXPORT_SOURCE_ROOT: str = ""  # Directory the collection's relative paths are resolved against
+    EXPORT_CHUNK_SIZE: int = 1048576  # 1MB read size while streaming ZIPs
+    SNAPSHOT_BATCH_SIZE: int = 5000  # Vectors read from / added to the vector store per call during snapshot export/import
+
     # AI
     MAX_TOKENS: int = 4000
     TEMPERATURE: float = 0.7
+    LLM_STREAMING: bool = True  # Stream Ollama tokens and parse/map categories as they complete
+    LLM_TOKEN_BUDGET: int = 1000  # Max generated tokens for the organization structure
+    PROMPT_TOKEN_BUDGET: int = 1500  # Estimated tokens of the organization prompt; file samples fill what is left
+    PROMPT_PREVIEW_CHARS: int = 80  # Extracted text shown per sampled file
+    PROMPT_TOP_EXTENSIONS: int = 15  # Extensions listed in the prompt statistics
+    PROMPT_SAMPLE_POOL: int = 2000  # Files the sample is drawn from in large batches (plus one per extension/folder)
+    TAXONOMY_FALLBACK_ID: str = ""  # Taxonomy template used when the model gives no structure (default: built-in rules)
+    TAXONOMY_MAX_FOLDERS: int = 500  # Folder paths per taxonomy template (one embedding each)
     EMBEDDING_BATCH_SIZE: int = 50  # Increased for faster processing
+    PIPELINE_CHUNK_SIZE: int = 1000  # Embedded files persisted (and later placed) per step of /api/analyze
+    PIPELINE_QUEUE_DEPTH: int = 2  # Embedded chunks waiting to be persisted before embedding pauses
+
+    # Provider connection pool (shared by embeddings, thinker and search)
+    PROVIDER_MAX_CONNECTIONS: int = 50  # Also the keep-alive pool size; match EMBEDDING_BATCH_SIZE
+    PROVIDER_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection is kept open
+    PROVIDER_CONNECT_TIMEOUT: float = 5.0
+    PROVIDER_READ_TIMEOUT: float = 60.0  # Default; embedding and generate calls set their own
+    PROVIDER_POOL_TIMEOUT: float = 120.0  # Waiting for a free connection when the pool is saturated
+    PROVIDER_DRAIN_TIMEOUT: float = 300.0  # How long a provider swap waits for in-flight requests
+
+    # Provider routing (hedging, retries, circuit breaking across Ollama replicas)
+    ROUTER_HEDGE_ENABLED: bool = True
+    ROUTER_HEDGE_QUANTILE: float = 0.95  # Hedge a call once it runs longer than this latency quantile
+    ROUTER_HEDGE_MIN_DELAY: float = 0.05  # Seconds; never hedge sooner than this
+    ROUTER_HEDGE_BUDGET: float = 0.1  # Max hedged requests as a share of all requests
+    ROUTER_MAX_RETRIES: int = 2  # Extra rounds after every endpoint failed
+    ROUTER_BACKOFF_BASE: float = 0.2  # Seconds; full-jitter exponential backoff between rounds
+    ROUTER_BACKOFF_MAX: float = 5.0
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures before an endpoint is skipped
+    CIRCUIT_RESET_TIMEOUT: float = 30.0  # Seconds before a skipped endpoint gets a probe request
+
+    # Multi-process mode (see serve.py)
+    INDEX_SERVICE_SOCKET: str = ""  # Set by serve.py for API workers; empty = single process owns the stores
+    CPU_WORKERS: int = 0  # Process pool size for mapping/dedupe; 0 runs them on the event loop
+    CPU_OFFLOAD_MIN_FILES: int = 2000  # Smaller batches stay inline (pickling would cost more)
+
+    # Startup
+    PREWARM: bool = True  # Initialize provider clients and the vector store in the background after startup
+
+    # Observability
+    LOG_LEVEL: str = "INFO"  # DEBUG renders full structures (truncated)
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    LOG_SAMPLE_RATE: float = 0.1  # Share of high-frequency debug/info events (per batch / per file) kept
+    METRICS_ENABLED: bool = True  # Expose /metrics; when off every metric call is a no-op
+    TIMING_HEADER: bool = False  # Always send Server-Timing (otherwise only on X-Lumina-Timing: 1)
+
+    # Duplicate detection (runs before embedding)
+    DEDUPE_ENABLED: bool = True
+    DEDUPE_NEAR_THRESHOLD: float = 0.85  # Estimated Jaccard similarity of text shingles
+    DEDUPE_MIN_TEXT_LENGTH: int = 100  # Shorter texts are only checked for exact duplicates
 
     model_config = {
         "env_file": ".env",
@@ -0,0 +1,245 @@
+"""
+Admission Control - Bounded in-flight bulk work, queueing with 429 backpressure, and request priorities
+"""
+from typing import AsyncIterator, Deque, List, Optional, Tuple
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import heapq
+import itertools
+import math
+import time
+
+from config import settings
+from core.metrics import ADMISSION_INFLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED, PROVIDER_QUEUED
+from core.log import get_logger
+
+log = get_logger("admission")
+
+# Request classes; lower is served first wherever requests compete (see PriorityGate)
+INTERACTIVE = 0
+BULK = 1
+
+_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def set_priority(priority: int):
+    """Run the current task, and tasks it starts from now on, at `priority` (background jobs)"""
+    _priority.set(priority)
+
+
+class AdmissionRejected(Exception):
+    """Request refused: 413 over a per-request cap, 429 when the server is saturated"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self):
+        return {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+
+
+class Ticket:
+    """One admitted bulk request: the bytes it was charged and the files it carries"""
+
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+        self.files = 0
+
+    def add_files(self, count: int):
+        """Charge decoded files; over MAX_FILES_PER_BATCH the request is refused"""
+        if self.files + count > settings.MAX_FILES_PER_BATCH:
+            ADMISSION_REJECTED.labels("too_many_files").inc()
+            raise AdmissionRejected(413, f"Too many files (max {settings.MAX_FILES_PER_BATCH} per request)")
+        self.files += count
+        ADMISSION_INFLIGHT.labels("files").inc(count)
+
+    async def count_files(self, files: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """Charge streamed files one by one as they are decoded"""
+        async for file in files:
+            self.add_files(1)
+            yield file
+
+    async def stream(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Pass a request body through, refusing it once it exceeds ADMISSION_MAX_REQUEST_BYTES"""
+        received = 0
+        async for chunk in chunks:
+            received += len(chunk)
+            if received > settings.ADMISSION_MAX_REQUEST_BYTES:
+                ADMISSION_REJECTED.labels("too_large").inc()
+                raise AdmissionRejected(413, f"Request body exceeds {settings.ADMISSION_MAX_REQUEST_BYTES} bytes")
+            yield chunk
+
+    async def read_body(self, chunks: AsyncIterator[bytes]) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(chunks)])
+
+
+class AdmissionController:
+    """
+    Admits bulk requests (ingestion, imports, graph builds) while fewer than
+    ADMISSION_MAX_BULK_REQUESTS run and their bodies fit in
+    ADMISSION_MAX_INFLIGHT_BYTES; a lone request is always let in. Others wait in
+    FIFO order, up to ADMISSION_QUEUE_LIMIT of them for at most
+    ADMISSION_QUEUE_TIMEOUT seconds, and are refused with 429 + Retry-After
+    beyond that. Cheap requests are never queued here.
+    Each request is charged its Content-Length, or the per-request cap when the
+    size is unknown, before any of its body is read.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.inflight_bytes = 0
+        self._queue: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._duration: Optional[float] = None  # EWMA of bulk request durations
+
+    def _fits(self, nbytes: int) -> bool:
+        if self.active == 0:
+            return True
+        return (
+            self.active < settings.ADMISSION_MAX_BULK_REQUESTS
+            and self.inflight_bytes + nbytes <= settings.ADMISSION_MAX_INFLIGHT_BYTES
+        )
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from recent bulk durations and the queue length"""
+        if self._duration is None:
+            return settings.ADMISSION_RETRY_AFTER
+        rounds = math.ceil((len(self._queue) + 1) / settings.ADMISSION_MAX_BULK_REQUESTS)
+        return max(1, math.ceil(self._duration * rounds))
+
+    def _charge(self, nbytes: int):
+        self.active += 1
+        self.inflight_bytes += nbytes
+        ADMISSION_INFLIGHT.labels("requests").set(self.active)
+        ADMISSION_INFLIGHT.labels("bytes").set(self.inflight_bytes)
+
+    def _grant(self):
+        """Admit waiters from the head of the queue while they fit"""
+        while self._queue:
+            nbytes, future = self._queue[0]
+            if future.done():  # timed out or cancelled
+                self._queue.popleft()
+                continue
+            if not self._fits(nbytes):
+                break
+            self._queue.popleft()
+            self._charge(nbytes)
+            future.set_result(None)
+        ADMISSION_QUEUED.set(len(self._queue))
+
+    def _reject(self, reason: str, detail: str):
+        ADMISSION_REJECTED.labels(reason).inc()
+        retry_after = self.retry_after()
+        log.warning("admission.rejected", reason=reason, active=self.active, queued=len(self._queue),
+                    retry_after=retry_after)
+        raise AdmissionRejected(429, detail, retry_after)
+
+    @asynccontextmanager
+    async def admit(self, content_length: Optional[int] = None) -> AsyncIterator[Ticket]:
+        """Hold a bulk slot for the duration of the block; runs it at BULK priority"""
+        if content_length is not None and content_length > settings.ADMISSION_MAX_REQUEST_BYTES:
+            ADMISSION_REJECTED.labels("too_large").inc()
+            raise AdmissionRejected(413, f"Request body exceeds {settings.ADMISSION_MAX_REQUEST_BYTES} bytes")
+        nbytes = settings.ADMISSION_MAX_REQUEST_BYTES if content_length is None else content_length
+
+        if not self._queue and self._fits(nbytes):
+            self._charge(nbytes)
+        elif len(self._queue) >= settings.ADMISSION_QUEUE_LIMIT:
+            self._reject("queue_full", "Server busy, retry later")
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._queue.append((nbytes, future))
+            ADMISSION_QUEUED.set(len(self._queue))
+            try:
+                await asyncio.wait_for(asyncio.shield(future), settings.ADMISSION_QUEUE_TIMEOUT)
+            except BaseException as e:
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                if future.done() and not future.cancelled():
+                    # Admitted right at the deadline (keep it) or as the client went away
+                    if not timed_out:
+                        self._release(nbytes, None)
+                        raise
+                else:
+                    future.cancel()
+                    self._grant()
+                    if timed_out:
+                        self._reject("queue_timeout", "Server busy, retry later")
+                    raise
+
+        ticket = Ticket(nbytes)
+        token = _priority.set(BULK)
+        start = time.perf_counter()
+        completed = False
+        try:
+            yield ticket
+            completed = True
+        finally:
+            _priority.reset(token)
+            ADMISSION_INFLIGHT.labels("files").dec(ticket.files)
+            # Only completed requests inform Retry-After; refused ones end early
+            self._release(nbytes, time.perf_counter() - start if completed else None)
+
+    def _release(self, nbytes: int, duration: Optional[float]):
+        self.active -= 1
+        self.inflight_bytes -= nbytes
+        if duration is not None:
+            self._duration = duration if self._duration is None else 0.8 * self._duration + 0.2 * duration
+        ADMISSION_INFLIGHT.labels("requests").set(self.active)
+        ADMISSION_INFLIGHT.labels("bytes").set(self.inflight_bytes)
+        self._grant()
+
+
+class PriorityGate:
+    """
+    Caps concurrent calls to a shared backend; when full, the freed slot goes to
+    the waiting call with the lowest priority value (INTERACTIVE before BULK),
+    first come first served within a class. The priority comes from the calling
+    request's context, so a search embedding overtakes queued batch embeddings.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.in_use < self.capacity:
+            self.in_use += 1
+        else:
+            priority = current_priority()
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._order), future))
+            queued = PROVIDER_QUEUED.labels("bulk" if priority == BULK else "interactive")
+            queued.inc()
+            try:
+                await future  # the slot is handed over by _release
+            except BaseException:
+                if future.done() and not future.cancelled():
+                    self._release()
+                else:
+                    future.cancel()
+                raise
+            finally:
+                queued.dec()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_use -= 1
@@ -0,0 +1,195 @@
+"""
+Duplicate Detector - Exact and near-duplicate grouping ahead of embedding
+"""
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterable
+from pathlib import Path
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+from config import settings
+
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_WORD_RE = re.compile(r"\w+")
+# "report (1)", "report - Copy", "report copy 2", "Copy of report"
+_COPY_SUFFIX_RE = re.compile(r"(\s*\(\d+\)|[\s_-]+copy(\s*\d+)?)+$")
+_COPY_PREFIX_RE = re.compile(r"^copy of\s+")
+
+
+class DuplicateDetector:
+    """
+    Marks files that duplicate an earlier file so only one embedding per group is computed.
+
+    Files are checked one at a time against the canonical (first seen) member of each group:
+    - exact: identical content/extracted text hash
+    - near: MinHash signatures over word shingles of extractedText, bucketed with LSH so only
+      files sharing a band are compared (sub-quadratic); files with no text at all match on
+      an identical copy-normalized name + size instead
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        num_perm: int = 128,
+        bands: int = 16,
+        min_text_length: Optional[int] = None,
+    ):
+        self.threshold = threshold if threshold is not None else settings.DEDUPE_NEAR_THRESHOLD
+        self.min_text_length = (
+            min_text_length if min_text_length is not None else settings.DEDUPE_MIN_TEXT_LENGTH
+        )
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+        self._exact: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        self._buckets: Dict[tuple, List[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._groups: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def groups(self) -> List[Dict[str, Any]]:
+        """Duplicate groups found so far, canonical file first"""
+        return list(self._groups.values())
+
+    def add(self, file: Dict[str, Any]) -> Optional[str]:
+        """
+        Register a file; if it duplicates an earlier one, set file["duplicate_of"]
+        to the canonical file id and return it
+        """
+        file_id = file["id"]
+        content_hash = self._content_hash(file)
+        if content_hash is not None:
+            canonical = self._exact.get(content_hash)
+            if canonical is not None:
+                return self._mark(file, canonical, "exact")
+        else:
+            # No text to compare: a likely copy at best, never an exact duplicate
+            name_key = self._name_key(file)
+            if name_key is not None:
+                canonical = self._names.setdefault(name_key, file_id)
+                if canonical != file_id:
+                    return self._mark(file, canonical, "near")
+
+        signature = self._signature(file.get("extractedText") or "")
+        if signature is not None:
+            best, best_score = None, 0.0
+            for candidate in self._candidates(signature):
+                score = float(np.mean(self._signatures[candidate] == signature))
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best is not None and best_score >= self.threshold:
+                return self._mark(file, best, "near")
+
+            # New canonical for near-duplicate lookups
+            self._signatures[file_id] = signature
+            for band in range(self.bands):
+                key = (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+                self._buckets.setdefault(key, []).append(file_id)
+
+        if content_hash is not None:
+            self._exact.setdefault(content_hash, file_id)
+        return None
+
+    def mark_all(self, files: Iterable[Dict[str, Any]]):
+        """Run detection over an in-memory file list"""
+        for file in files:
+            self.add(file)
+
+    async def mark_all_offloaded(self, files: List[Dict[str, Any]]):
+        """mark_all on a CPU worker process; only the fields detection reads are sent over"""
+        from core.workers import run_cpu
+
+        records = [{key: file[key] for key in _DETECTION_FIELDS if key in file} for file in files]
+        marks, groups = await run_cpu(
+            _detect_duplicates, records, self.threshold, self.num_perm, self.bands, self.min_text_length
+        )
+        for file, canonical in zip(files, marks):
+            if canonical:
+                file["duplicate_of"] = canonical
+        self._groups.update(groups)
+
+    async def iter_marked(self, files: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Run detection over files as they stream in"""
+        async for file in files:
+            self.add(file)
+            yield file
+
+    @staticmethod
+    def share_embeddings(files: List[Dict[str, Any]]):
+        """Copy each canonical file's embedding onto its duplicates"""
+        embeddings = {
+            f["id"]: f.get("embedding") for f in files if not f.get("duplicate_of")
+        }
+        for file in files:
+            canonical = file.get("duplicate_of")
+            if canonical:
+                file["embedding"] = embeddings.get(canonical)
+
+    def _mark(self, file: Dict[str, Any], canonical: str, kind: str) -> str:
+        file["duplicate_of"] = canonical
+        group = self._groups.setdefault(
+            canonical, {"canonical": canonical, "kind": kind, "members": [canonical]}
+        )
+        if kind == "near":
+            group["kind"] = "near"
+        group["members"].append(file["id"])
+        return canonical
+
+    @staticmethod
+    def _content_hash(file: Dict[str, Any]) -> Optional[str]:
+        body = file.get("content") or file.get("extractedText")
+        if not body:
+            return None
+        return hashlib.blake2b(body.encode("utf-8", "ignore"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _name_key(file: Dict[str, Any]) -> Optional[str]:
+        """Copy-normalized name with the size, for files without text"""
+        if not file.get("size"):
+            return None
+        name = file.get("name", "").lower()
+        stem = Path(name).stem
+        stem = _COPY_PREFIX_RE.sub("", _COPY_SUFFIX_RE.sub("", stem)).strip()
+        return f"{stem}|{Path(name).suffix}|{file['size']}"
+
+    def _signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature over word 3-shingles, or None when the text is too short"""
+        if len(text) < self.min_text_length:
+            return None
+        words = _WORD_RE.findall(text[:20000].lower())
+        if len(words) < 3:
+            return None
+
+        shingles = {" ".join(words[i : i + 3]) for i in range(len(words) - 2)}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _candidates(self, signature: np.ndarray) -> set:
+        found = set()
+        for band in range(self.bands):
+            key = (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            found.update(self._buckets.get(key, ()))
+        return found
+
+
+# Fields read by DuplicateDetector.add
+_DETECTION_FIELDS = ("id", "name", "type", "size", "content", "extractedText")
+
+
+def _detect_duplicates(records, threshold, num_perm, bands, min_text_length):
+    """Process pool entry point for DuplicateDetector.mark_all_offloaded"""
+    detector = DuplicateDetector(threshold, num_perm, bands, min_text_length)
+    detector.mark_all(records)
+    return [record.get("duplicate_of") for record in records], detector._groups
@@ -1,117 +1,197 @@
 """
 Embedding Engine - Generate embeddings using Ollama or Gemini
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 import asyncio
 from config import settings
+from core.metrics import stage_timer, provider_call, FALLBACKS, CACHE_HITS, FILES_PROCESSED
+from core.log import get_logger
+from core.providers import request_timeout
+from core.routing import ProviderRouter
+
+log = get_logger("embeddings")
+
+
+def embedding_space(provider: Optional[str] = None) -> str:
+    """
+    Identity of the vector space embeddings are produced in ("<provider>:<model>").
+    Vectors from different spaces are not comparable, so every stored vector and
+    every query is tagged with it.
+    """
+    provider = (provider or settings.AI_PROVIDER).lower()
+    model = settings.GEMINI_EMBEDDING_MODEL if provider == "gemini" else settings.OLLAMA_EMBEDDING_MODEL
+    return f"{provider}:{model}"
 
 
 class EmbeddingEngine:
     """Generate embeddings for semantic understanding"""
 
-    def __init__(self):
+    def __init__(self, router=None):
+        """
+        router: shared ProviderRouter (pooled clients to every Ollama replica) from
+        the ProviderRegistry. Without one the engine creates and owns its own,
+        closed by `aclose()`.
+        """
         self.provider = settings.AI_PROVIDER.lower()
         self.client = None
         self.model = None
+        self._owns_client = False
 
         if self.provider == "ollama":
             # Ollama setup
             try:
-                import httpx
-                self.client = httpx.AsyncClient(base_url=settings.OLLAMA_BASE_URL)
+                if router is None:
+                    router = ProviderRouter.from_urls([settings.OLLAMA_BASE_URL, *settings.OLLAMA_REPLICA_URLS])
+                    self._owns_client = True
+                self.client = router
                 self.model = settings.OLLAMA_EMBEDDING_MODEL
-                print(f"✅ Ollama embedding client initialized: {self.model}")
+                log.info("embedding.client_ready", provider="ollama", model=self.model)
             except Exception as e:
-                print(f"Warning: Ollama not available: {e}")
+                log.warning("embedding.provider_unavailable", provider="ollama", error=str(e))
         
         elif self.provider == "gemini":
             # Gemini setup
             try:
                 import google.generativeai as genai
                 if not settings.GEMINI_API_KEY:
-                    print("⚠️ Warning: GEMINI_API_KEY not set")
+                    log.warning("embedding.missing_api_key", provider="gemini")
                 else:
                     genai.configure(api_key=settings.GEMINI_API_KEY)
                     self.client = genai
                     self.model = settings.GEMINI_EMBEDDING_MODEL
-                    print(f"✅ Gemini embedding client initialized: {self.model}")
+                    log.info("embedding.client_ready", provider="gemini", model=self.model)
             except Exception as e:
-                print(f"Warning: Gemini not available: {e}")
+                log.warning("embedding.provider_unavailable", provider="gemini", error=str(e))
         
         else:
-            print(f"⚠️ Unknown AI provider: {self.provider}. Using Ollama as default.")
+            log.warning("embedding.unknown_provider", provider=self.provider, fallback="ollama")
             self.provider = "ollama"
 
-    async def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for a single text"""
+        self.space = embedding_space(self.provider)
+
+    async def aclose(self):
+        """Close the router's clients if this instance created them"""
+        if self._owns_client and self.client is not None:
+            await self.client.aclose()
+
+    async def generate_embedding(self, text: str) -> Optional[List[float]]:
+        """
+        Generate embedding for a single text.
+        None when no vector could be produced: callers skip the file instead of
+        storing a placeholder that would match everything equally.
+        """
         if not self.client:
-            # Return dummy embedding if no client available
-            return [0.0] * 768
+            FALLBACKS.labels("missing_embedding").inc()
+            return None
 
         try:
             if self.provider == "ollama":
                 # Ollama - truncate text for faster processing
-                response = await self.client.post(
-                    "/api/embeddings",
-                    json={"model": self.model, "prompt": text[:1000]},
-                    timeout=30.0,
-                )
-                data = response.json()
-                return data.get("embedding", [0.0] * 768)
+                with provider_call("ollama", "embedding"):
+                    data = await self.client.post_json(
+                        "embedding",
+                        "/api/embeddings",
+                        {"model": self.model, "prompt": text[:1000]},
+                        timeout=request_timeout(30.0),
+                    )
+                if not data.get("embedding"):
+                    FALLBACKS.labels("missing_embedding").inc()
+                    return None
+                return data["embedding"]
             
             elif self.provider == "gemini":
                 # Gemini - use their embedding API
-                result = self.client.embed_content(
-                    model=self.model,
-                    content=text[:1000],
-                    task_type="retrieval_document"
-                )
+                with provider_call("gemini", "embedding"):
+                    result = self.client.embed_content(
+                        model=self.model,
+                        content=text[:1000],
+                        task_type="retrieval_document"
+                    )
                 return result['embedding']
             
             else:
-                return [0.0] * 768
+                return None
 
         except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return [0.0] * 768
-
-    async def generate_embeddings(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Generate embeddings for all files - OPTIMIZED"""
-        print(f"⚡ Fast-generating embeddings for {len(files)} files...")
-
-        async def process_file(file_data: Dict[str, Any]) -> Dict[str, Any]:
-            # Create text representation of file for embedding (reduced size for speed)
-            text_parts = [
-                file_data.get("name", ""),
-                file_data.get("path", ""),
-            ]
-
-            # Add extracted text if available (reduced from 2000 to 500 for speed)
-            if file_data.get("extractedText"):
-                text_parts.append(file_data["extractedText"][:500])
-
-            text = " ".join(text_parts)
-
-            # Generate embedding
-            embedding = await self.generate_embedding(text)
-            file_data["embedding"] = embedding
-
+            log.warning("embedding.failed", provider=self.provider, error=str(e))
+            FALLBACKS.labels("missing_embedding").inc()
+            return None
+
+    @staticmethod
+    def file_text(file_data: Dict[str, Any]) -> str:
+        """Text a file is embedded from: name, path and the start of its extracted text"""
+        text_parts = [
+            file_data.get("name", ""),
+            file_data.get("path", ""),
+        ]
+
+        # Add extracted text if available (reduced from 2000 to 500 for speed)
+        if file_data.get("extractedText"):
+            text_parts.append(file_data["extractedText"][:500])
+
+        return " ".join(text_parts)
+
+    async def _process_file(self, file_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Embed a single file dict in place"""
+        # Duplicates reuse their canonical file's embedding (see DuplicateDetector)
+        if file_data.get("duplicate_of"):
+            CACHE_HITS.labels("duplicate_embedding").inc()
             return file_data
 
-        # Process in larger batches for better concurrency
+        # Generate embedding (None if it failed; the file is then not indexed)
+        embedding = await self.generate_embedding(self.file_text(file_data))
+        file_data["embedding"] = embedding
+
+        return file_data
+
+    async def _embed_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Embed one batch concurrently, dropping files that failed"""
+        # Use asyncio.gather with return_exceptions to not fail entire batch
+        batch_results = await asyncio.gather(
+            *[self._process_file(file_data) for file_data in batch],
+            return_exceptions=True
+        )
+        # Filter out exceptions
+        return [r for r in batch_results if not isinstance(r, Exception)]
+
+    async def iter_embedded(
+        self, files: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Embed files while they are still arriving, yielding each embedded batch.
+        One batch is embedded while the next one is being collected, and only
+        those two are held here.
+        """
         batch_size = settings.EMBEDDING_BATCH_SIZE
-        results = []
-
-        for i in range(0, len(files), batch_size):
-            batch = files[i : i + batch_size]
-            # Use asyncio.gather with return_exceptions to not fail entire batch
-            batch_results = await asyncio.gather(
-                *[process_file(file_data) for file_data in batch],
-                return_exceptions=True
-            )
-            # Filter out exceptions
-            valid_results = [r for r in batch_results if not isinstance(r, Exception)]
-            results.extend(valid_results)
-            print(f"⚡ Processed {len(results)}/{len(files)} files")
-
-        return results
+        batch = []
+        pending: Optional[asyncio.Task] = None
+        done = 0
+
+        try:
+            async for file_data in files:
+                batch.append(file_data)
+                if len(batch) >= batch_size:
+                    if pending:
+                        with stage_timer("embedding"):
+                            embedded = await pending
+                        done += len(embedded)
+                        log.debug("embedding.progress", done=done, sampled=True)
+                        FILES_PROCESSED.labels("embedding").inc(len(embedded))
+                        yield embedded
+                    pending = asyncio.create_task(self._embed_batch(batch))
+                    batch = []
+
+            if pending:
+                with stage_timer("embedding"):
+                    embedded = await pending
+                pending = None
+                FILES_PROCESSED.labels("embedding").inc(len(embedded))
+                yield embedded
+            if batch:
+                with stage_timer("embedding"):
+                    embedded = await self._embed_batch(batch)
+                FILES_PROCESSED.labels("embedding").inc(len(embedded))
+                yield embedded
+        finally:
+            if pending and not pending.done():
+                pending.cancel()
@@ -0,0 +1,246 @@
+"""
+Zip Exporter - Stream an organized collection as a ZIP archive
+"""
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import struct
+import time
+import zlib
+
+
+# Extensions whose payload is already compressed - deflating them again only burns CPU
+STORED_EXTENSIONS = {
+    "jpg", "jpeg", "png", "gif", "webp",
+    "mp4", "avi", "mov", "wmv", "flv", "mkv", "webm", "m4v",
+    "mp3", "aac", "ogg", "wma", "m4a", "flac",
+    "zip", "rar", "7z", "gz", "bz2",
+    "docx", "xlsx", "pptx", "odt", "ods", "odp",
+}
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# Every entry is written as ZIP64 with a data descriptor, so header sizes are fixed
+_LOCAL_HEADER_SIZE = 30 + 20  # local file header + zip64 extra
+_DATA_DESCRIPTOR_SIZE = 24
+_CENTRAL_HEADER_SIZE = 46 + 28  # central directory header + zip64 extra
+_END_RECORDS_SIZE = 56 + 20 + 22  # zip64 end record + locator + end record
+
+# CRCs of source files keyed by (path, size, mtime) so resumed downloads can skip re-reading
+_CRC_CACHE: "OrderedDict[Tuple[str, int, int], int]" = OrderedDict()
+_CRC_CACHE_MAX = 50000
+
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    """Convert a timestamp to (dos_time, dos_date)"""
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dos_time, dos_date
+
+
+def _clean_component(value: Optional[str]) -> str:
+    """Make a single archive path component safe"""
+    value = (value or "").replace("/", "-").replace("\\", "-").strip()
+    return value if value not in ("", ".", "..") else "_"
+
+
+class ZipEntry:
+    """A single source file scheduled for the archive"""
+
+    __slots__ = ("arcname", "source", "size", "mtime", "method", "crc", "compressed_size", "offset")
+
+    def __init__(self, arcname: str, source: Path, size: int, mtime: int, method: int):
+        self.arcname = arcname.encode("utf-8")
+        self.source = source
+        self.size = size
+        self.mtime = mtime
+        self.method = method
+        self.crc: Optional[int] = _CRC_CACHE.get((str(source), size, mtime))
+        self.compressed_size = 0
+        self.offset = 0
+
+
+class ZipExporter:
+    """Builds a Category/Subcategory/Folder ZIP from source files as a byte stream"""
+
+    def __init__(
+        self,
+        files: List[Dict[str, Any]],
+        source_root: str,
+        store_only: bool = False,
+        chunk_size: int = 1024 * 1024,
+    ):
+        self.root = Path(source_root).resolve()
+        self.store_only = store_only
+        self.chunk_size = chunk_size
+        self.entries: List[ZipEntry] = []
+        self.missing: List[str] = []
+        self._collect(files)
+
+    def _collect(self, files: List[Dict[str, Any]]):
+        """Resolve source files and lay them out in the organized hierarchy"""
+        seen = set()
+        for file in sorted(files, key=lambda f: (f.get("category") or "", f.get("subcategory") or "",
+                                                  f.get("folder") or "", f.get("name") or "")):
+            source = (self.root / file.get("path", "")).resolve()
+            # Never follow paths outside the export root
+            if self.root not in source.parents or not source.is_file():
+                self.missing.append(file.get("path", ""))
+                continue
+
+            if file.get("category"):
+                parts = [file["category"], file.get("subcategory"), file.get("folder")]
+                arcname = "/".join(_clean_component(p) for p in parts if p)
+                arcname = f"{arcname}/{_clean_component(file['name'])}"
+            else:
+                arcname = "/".join(_clean_component(p) for p in Path(file.get("path", "")).parts)
+
+            # Keep names unique: "report.pdf" -> "report (2).pdf"
+            unique, counter = arcname, 2
+            while unique in seen:
+                stem, dot, ext = arcname.rpartition(".")
+                unique = f"{stem} ({counter}).{ext}" if dot and "/" not in ext else f"{arcname} ({counter})"
+                counter += 1
+            seen.add(unique)
+
+            stat = source.stat()
+            ext = source.suffix.lstrip(".").lower()
+            method = ZIP_STORED if self.store_only or ext in STORED_EXTENSIONS else ZIP_DEFLATED
+            self.entries.append(ZipEntry(unique, source, stat.st_size, int(stat.st_mtime), method))
+
+    @property
+    def etag(self) -> str:
+        """Stable validator - identical inputs always produce identical bytes"""
+        digest = hashlib.sha1(b"stored" if self.store_only else b"auto")
+        for entry in self.entries:
+            digest.update(entry.arcname)
+            digest.update(struct.pack("<QQB", entry.size, entry.mtime, entry.method))
+        return f'"{digest.hexdigest()}"'
+
+    @property
+    def content_length(self) -> Optional[int]:
+        """Exact archive size, known up front only when nothing is deflated"""
+        if any(entry.method != ZIP_STORED for entry in self.entries):
+            return None
+        total = _END_RECORDS_SIZE
+        for entry in self.entries:
+            name_len = len(entry.arcname)
+            total += _LOCAL_HEADER_SIZE + name_len + entry.size + _DATA_DESCRIPTOR_SIZE
+            total += _CENTRAL_HEADER_SIZE + name_len
+        return total
+
+    def iter_bytes(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Yield the archive bytes in [start, end] (inclusive).
+        The archive is regenerated deterministically, so a range is served by skipping
+        output before `start`; stored entries with a cached CRC are skipped without reading.
+        """
+        for chunk in self._generate(start, end):
+            if chunk:
+                yield chunk
+
+    def _generate(self, start: int, end: Optional[int]) -> Iterator[bytes]:
+        """Produce every archive record in order, clipped to the requested window"""
+        window = _ByteWindow(start, end)
+
+        for entry in self.entries:
+            entry.offset = window.position
+            dos_time, dos_date = _dos_datetime(entry.mtime)
+            header = struct.pack(
+                "<IHHHHHIIIHH", 0x04034B50, 45, 0x0808, entry.method, dos_time, dos_date,
+                0, 0xFFFFFFFF, 0xFFFFFFFF, len(entry.arcname), 20,
+            ) + entry.arcname + struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+            yield window.take(header)
+
+            if entry.method == ZIP_STORED and entry.crc is not None and window.before_start(entry.size):
+                window.skip(entry.size)
+                entry.compressed_size = entry.size
+            else:
+                yield from self._iter_entry_data(entry, window)
+
+            yield window.take(struct.pack("<IIQQ", 0x08074B50, entry.crc, entry.compressed_size, entry.size))
+
+            if window.past_end:
+                return
+
+        central_offset = window.position
+        for entry in self.entries:
+            dos_time, dos_date = _dos_datetime(entry.mtime)
+            record = struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, 0x0300 | 45, 45, 0x0808, entry.method,
+                dos_time, dos_date, entry.crc, 0xFFFFFFFF, 0xFFFFFFFF, len(entry.arcname), 28,
+                0, 0, 0, 0o100644 << 16, 0xFFFFFFFF,
+            ) + entry.arcname + struct.pack("<HHQQQ", 0x0001, 24, entry.size, entry.compressed_size, entry.offset)
+            yield window.take(record)
+
+        central_size = window.position - central_offset
+        count = len(self.entries)
+        yield window.take(
+            struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, central_size, central_offset)
+            + struct.pack("<IIQI", 0x07064B50, 0, window.position, 1)
+            + struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+        )
+
+    def _iter_entry_data(self, entry: ZipEntry, window: "_ByteWindow") -> Iterator[bytes]:
+        """Stream one file's payload in bounded chunks, deflating if required"""
+        crc = 0
+        compressed_size = 0
+        remaining = entry.size
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15) if entry.method == ZIP_DEFLATED else None
+
+        with open(entry.source, "rb") as handle:
+            while remaining > 0:
+                data = handle.read(min(self.chunk_size, remaining))
+                if not data:
+                    raise IOError(f"{entry.source} changed size during export")
+                remaining -= len(data)
+                crc = zlib.crc32(data, crc)
+                if compressor:
+                    data = compressor.compress(data)
+                compressed_size += len(data)
+                yield window.take(data)
+            if compressor:
+                data = compressor.flush()
+                compressed_size += len(data)
+                yield window.take(data)
+
+        entry.crc = crc
+        entry.compressed_size = compressed_size
+        key = (str(entry.source), entry.size, entry.mtime)
+        _CRC_CACHE[key] = crc
+        _CRC_CACHE.move_to_end(key)
+        while len(_CRC_CACHE) > _CRC_CACHE_MAX:
+            _CRC_CACHE.popitem(last=False)
+
+
+class _ByteWindow:
+    """Tracks the output position and clips generated bytes to the requested range"""
+
+    def __init__(self, start: int, end: Optional[int]):
+        self.start = start
+        self.end = end
+        self.position = 0
+
+    @property
+    def past_end(self) -> bool:
+        return self.end is not None and self.position > self.end
+
+    def before_start(self, length: int) -> bool:
+        return self.position + length <= self.start
+
+    def skip(self, length: int):
+        self.position += length
+
+    def take(self, data: bytes) -> bytes:
+        chunk_start = self.position
+        self.position += len(data)
+        if self.position <= self.start or (self.end is not None and chunk_start > self.end):
+            return b""
+        lo = max(self.start - chunk_start, 0)
+        hi = len(data) if self.end is None else min(len(data), self.end - chunk_start + 1)
+        return data[lo:hi]
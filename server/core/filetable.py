@@ -0,0 +1,204 @@
+"""
+File Table - Columnar, array-backed file metadata for fast collection statistics
+"""
+from typing import List, Dict, Any, Iterable
+
+import numpy as np
+
+from core.scanner import FileScanner
+
+
+# Upper bounds (bytes) of the size histogram buckets; the last bucket is open-ended
+SIZE_BUCKETS = [
+    (1024, "<1KB"),
+    (10 * 1024, "1-10KB"),
+    (100 * 1024, "10-100KB"),
+    (1024 ** 2, "100KB-1MB"),
+    (10 * 1024 ** 2, "1-10MB"),
+    (100 * 1024 ** 2, "10-100MB"),
+    (1024 ** 3, "100MB-1GB"),
+]
+SIZE_BUCKET_LABELS = [label for _, label in SIZE_BUCKETS] + [">=1GB"]
+_SIZE_EDGES = np.array([edge for edge, _ in SIZE_BUCKETS], dtype=np.int64)
+
+# Category codes follow FileScanner.CATEGORIES order, with "other" last
+CATEGORY_NAMES = list(FileScanner.CATEGORIES.keys()) + ["other"]
+_CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORY_NAMES)}
+
+
+class FileTable:
+    """
+    One column per attribute, built in a single pass over the file dicts.
+    Extensions are interned to integer codes so every aggregation is a NumPy
+    bincount/argsort instead of a per-file Python loop.
+    """
+
+    def __init__(self, names: List[str], sizes: np.ndarray, ext_codes: np.ndarray,
+                 extensions: List[str], category_codes: np.ndarray):
+        self.names = names
+        self.sizes = sizes
+        self.ext_codes = ext_codes
+        self.extensions = extensions  # code -> extension ("" for none)
+        self.category_codes = category_codes
+
+    @classmethod
+    def from_files(cls, files: Iterable[Dict[str, Any]]) -> "FileTable":
+        """Build the table from file dicts"""
+        names: List[str] = []
+        sizes: List[int] = []
+        ext_codes: List[int] = []
+        interned: Dict[str, int] = {}
+        extensions: List[str] = []
+
+        for file in files:
+            name = file["name"]
+            ext = FileScanner.get_extension(name)
+            code = interned.get(ext)
+            if code is None:
+                code = interned[ext] = len(extensions)
+                extensions.append(ext)
+            names.append(name)
+            sizes.append(file.get("size", 0) or 0)
+            ext_codes.append(code)
+
+        ext_codes_arr = np.array(ext_codes, dtype=np.int32)
+        # Category per distinct extension, then broadcast to rows
+        other = _CATEGORY_CODES["other"]
+        ext_to_category = np.array(
+            [_CATEGORY_CODES[FileScanner.EXTENSION_CATEGORY.get(ext, "other")] for ext in extensions]
+            or [other],
+            dtype=np.int16,
+        )
+        category_codes = ext_to_category[ext_codes_arr] if ext_codes else np.zeros(0, dtype=np.int16)
+
+        return cls(
+            names=names,
+            sizes=np.array(sizes, dtype=np.int64),
+            ext_codes=ext_codes_arr,
+            extensions=extensions,
+            category_codes=category_codes,
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def category(self, index: int) -> str:
+        return CATEGORY_NAMES[self.category_codes[index]]
+
+    def category_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.category_codes, minlength=len(CATEGORY_NAMES))
+        return {CATEGORY_NAMES[i]: int(c) for i, c in enumerate(counts) if c}
+
+    def category_sizes(self) -> Dict[str, int]:
+        totals = np.bincount(self.category_codes, weights=self.sizes, minlength=len(CATEGORY_NAMES))
+        counts = np.bincount(self.category_codes, minlength=len(CATEGORY_NAMES))
+        return {CATEGORY_NAMES[i]: int(t) for i, t in enumerate(totals) if counts[i]}
+
+    def extension_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.ext_codes, minlength=len(self.extensions))
+        return {(self.extensions[i] or "no_extension"): int(c) for i, c in enumerate(counts) if c}
+
+    def top_extensions(self, n: int = 10) -> List[Dict[str, Any]]:
+        counts = np.bincount(self.ext_codes, minlength=len(self.extensions))
+        totals = np.bincount(self.ext_codes, weights=self.sizes, minlength=len(self.extensions))
+        # Stable sort so ties keep first-seen order
+        order = np.argsort(-counts, kind="stable")[:n]
+        return [
+            {
+                "extension": self.extensions[i] or "no_extension",
+                "count": int(counts[i]),
+                "total_size": int(totals[i]),
+            }
+            for i in order
+            if counts[i]
+        ]
+
+    def size_histogram(self) -> Dict[str, int]:
+        buckets = np.searchsorted(_SIZE_EDGES, self.sizes, side="right")
+        counts = np.bincount(buckets, minlength=len(SIZE_BUCKET_LABELS))
+        return {label: int(c) for label, c in zip(SIZE_BUCKET_LABELS, counts)}
+
+    def summary(self) -> Dict[str, Any]:
+        """Statistics in the shape returned by FileScanner.analyze_files"""
+        return {
+            "total_files": len(self),
+            "total_size": int(self.sizes.sum()),
+            "categories": self.category_counts(),
+            "extensions": self.extension_counts(),
+        }
+
+    def stats(self, top_n: int = 10) -> Dict[str, Any]:
+        """Full statistics, same shape as the saved-collection stats endpoint"""
+        return {
+            "total_files": len(self),
+            "total_size": int(self.sizes.sum()),
+            "categories": self.category_counts(),
+            "category_sizes": self.category_sizes(),
+            "top_extensions": self.top_extensions(top_n),
+            "size_histogram": self.size_histogram(),
+        }
+
+
+class RunningStats:
+    """
+    Per-extension counts and sizes accumulated one FileTable chunk at a time, for
+    collections that are never in memory all at once. Answers the aggregations
+    the organization prompt reads (summary, top_extensions, extensions).
+    """
+
+    def __init__(self):
+        self.extensions: List[str] = []  # first-seen order, as in FileTable
+        self._codes: Dict[str, int] = {}
+        self._counts: List[int] = []
+        self._sizes: List[int] = []
+        self.total_files = 0
+        self.total_size = 0
+
+    def __len__(self) -> int:
+        return self.total_files
+
+    def add(self, table: FileTable):
+        counts = np.bincount(table.ext_codes, minlength=len(table.extensions))
+        totals = np.bincount(table.ext_codes, weights=table.sizes, minlength=len(table.extensions))
+        for ext, count, total in zip(table.extensions, counts.tolist(), totals.tolist()):
+            code = self._codes.get(ext)
+            if code is None:
+                code = self._codes[ext] = len(self.extensions)
+                self.extensions.append(ext)
+                self._counts.append(0)
+                self._sizes.append(0)
+            self._counts[code] += count
+            self._sizes[code] += int(total)
+        self.total_files += len(table)
+        self.total_size += int(table.sizes.sum())
+
+    def category_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for ext, count in zip(self.extensions, self._counts):
+            category = FileScanner.EXTENSION_CATEGORY.get(ext, "other")
+            counts[category] = counts.get(category, 0) + count
+        # Same key order as FileTable.category_counts
+        return {name: counts[name] for name in CATEGORY_NAMES if counts.get(name)}
+
+    def extension_counts(self) -> Dict[str, int]:
+        return {(ext or "no_extension"): count for ext, count in zip(self.extensions, self._counts) if count}
+
+    def top_extensions(self, n: int = 10) -> List[Dict[str, Any]]:
+        order = sorted(range(len(self.extensions)), key=lambda i: -self._counts[i])[:n]
+        return [
+            {
+                "extension": self.extensions[i] or "no_extension",
+                "count": self._counts[i],
+                "total_size": self._sizes[i],
+            }
+            for i in order
+            if self._counts[i]
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_files": self.total_files,
+            "total_size": self.total_size,
+            "categories": self.category_counts(),
+            "extensions": self.extension_counts(),
+        }
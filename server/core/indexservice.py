@@ -0,0 +1,359 @@
+"""
+Index Service - One process owning SQLite writes and the vector store, shared by API workers over a Unix socket
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import inspect
+import os
+import signal
+import struct
+
+from core.log import configure_logging, get_logger
+from core.metrics import stage_timer
+
+log = get_logger("indexservice")
+
+# 4-byte big-endian length prefix, then one MessagePack document
+_HEADER = struct.Struct(">I")
+MAX_FRAME = (1 << 32) - 1
+
+
+class IndexServiceError(Exception):
+    """The index service reported a failure (or could not be reached)"""
+
+
+def _encode_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+async def write_frame(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    import msgpack
+
+    body = msgpack.packb(message, default=_encode_default, use_bin_type=True)
+    if len(body) > MAX_FRAME:
+        raise IndexServiceError(f"message of {len(body)} bytes exceeds the frame limit")
+    writer.write(_HEADER.pack(len(body)))
+    writer.write(body)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    import msgpack
+
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return msgpack.unpackb(await reader.readexactly(length), raw=False)
+
+
+def _pack_files(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Embeddings travel as float32 bytes (the vector store keeps float32 anyway)"""
+    import numpy as np
+
+    packed = []
+    for file in files:
+        embedding = file.get("embedding")
+        if embedding is not None:
+            file = {**file, "embedding": np.asarray(embedding, dtype=np.float32).tobytes()}
+        packed.append(file)
+    return packed
+
+
+def _unpack_files(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    import numpy as np
+
+    for file in files:
+        if isinstance(file.get("embedding"), bytes):
+            file["embedding"] = np.frombuffer(file["embedding"], dtype=np.float32).tolist()
+    return files
+
+
+def _remote_error(response: Dict[str, Any]) -> Exception:
+    """Re-raise organizer errors callers handle by type as that type, anything else as IndexServiceError"""
+    from core.organizer import EmbeddingSpaceMismatch
+    from core.snapshot import SnapshotError
+
+    types = {cls.__name__: cls for cls in (EmbeddingSpaceMismatch, SnapshotError)}
+    return types.get(response.get("error_type"), IndexServiceError)(response["error"])
+
+
+class IndexService:
+    """
+    Serves the public coroutine methods of a FileOrganizer to API workers.
+    Requests on one connection are handled in order; connections run concurrently
+    on this process's event loop, so SQLite and ChromaDB only ever see one process.
+    """
+
+    def __init__(self, socket_path: str, organizer=None):
+        from core.organizer import FileOrganizer
+
+        self.socket_path = socket_path
+        self.organizer = organizer or FileOrganizer()
+        self._methods = {
+            name: method
+            for name, method in inspect.getmembers(self.organizer, inspect.iscoroutinefunction)
+            if not name.startswith("_")
+        }
+        self._methods["stage_files_packed"] = self.stage_files_packed
+
+    async def stage_files_packed(self, collection_id, files, embedding_space=None) -> int:
+        return await self.organizer.stage_files(collection_id, _unpack_files(files), embedding_space)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                response: Dict[str, Any] = {"id": request.get("id")}
+                method = self._methods.get(request.get("method"))
+                if method is None:
+                    response["error"] = f"unknown method {request.get('method')!r}"
+                else:
+                    try:
+                        response["result"] = await method(*request.get("args", []), **request.get("kwargs", {}))
+                    except Exception as e:
+                        log.error("indexservice.call_failed", method=request.get("method"), error=str(e))
+                        response["error"] = str(e)
+                        response["error_type"] = type(e).__name__
+                await write_frame(writer, response)
+        finally:
+            writer.close()
+
+    async def serve(self, stop: asyncio.Event):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        log.info("indexservice.listening", socket=self.socket_path, methods=sorted(self._methods))
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def run_index_service(socket_path: str):
+    """Process entry point: open the database and vector store, then serve until SIGTERM/SIGINT"""
+    from database.models import init_db
+
+    configure_logging()
+    init_db()
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        service = IndexService(socket_path)
+        service.organizer.connect_vector_store()
+        service.organizer.schedule_sweep()
+        service.organizer.schedule_retention()
+        await service.serve(stop)
+
+    asyncio.run(main())
+
+
+class RemoteOrganizer:
+    """
+    FileOrganizer stand-in used by API workers in multi-process mode. Every public
+    organizer coroutine has a forwarding method here; staging and searches are
+    special-cased to keep payloads small and to embed queries in the worker.
+    """
+
+    def __init__(self, socket_path: str, max_idle: int = 8):
+        self.socket_path = socket_path
+        self.max_idle = max_idle
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._next_id = 0
+
+    def connect_vector_store(self):
+        """The index service owns the vector store; nothing to warm up here"""
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError as e:
+                raise IndexServiceError(f"index service unreachable at {self.socket_path}: {e}")
+        self._next_id += 1
+        try:
+            await write_frame(writer, {"id": self._next_id, "method": method, "args": args, "kwargs": kwargs})
+            response = await read_frame(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if len(self._idle) < self.max_idle:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        if "error" in response:
+            raise _remote_error(response)
+        return response.get("result")
+
+    async def stage_files(
+        self, collection_id: str, files: List[Dict[str, Any]], embedding_space: Optional[str] = None
+    ) -> int:
+        return await self._call("stage_files_packed", collection_id, _pack_files(files), embedding_space)
+
+    async def semantic_search(self, query: str, limit: int = 10, embedding_engine=None) -> List[Dict[str, Any]]:
+        """Embed the query in this worker, search in the index service"""
+        from core.organizer import EmbeddingSpaceMismatch
+
+        try:
+            if embedding_engine is None:
+                from core.embeddings import EmbeddingEngine
+
+                embedding_engine = EmbeddingEngine()
+            with stage_timer("search_embedding"):
+                query_embedding = await embedding_engine.generate_embedding(query)
+            return await self._call("search_by_embedding", query_embedding, limit, embedding_engine.space)
+        except EmbeddingSpaceMismatch:
+            raise
+        except Exception as e:
+            log.error("search.failed", error=str(e))
+            return []
+
+    # The other organizer coroutines are forwarded as they are
+
+    async def staged_records(self, collection_id: str, after_id: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        return await self._call("staged_records", collection_id, after_id, limit)
+
+    async def place_files(
+        self,
+        collection_id: str,
+        placements: List[List[Any]],
+        duplicate_counts: Optional[Dict[str, int]] = None,
+    ) -> int:
+        return await self._call("place_files", collection_id, placements, duplicate_counts)
+
+    async def set_duplicate_counts(self, collection_id: str, duplicate_counts: Dict[str, int]) -> int:
+        return await self._call("set_duplicate_counts", collection_id, duplicate_counts)
+
+    async def finish_collection(
+        self,
+        collection_id: str,
+        total_files: int,
+        organized_structure: Dict[str, Any],
+        duplicate_groups: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        return await self._call("finish_collection", collection_id, total_files, organized_structure, duplicate_groups)
+
+    async def discard_collection(self, collection_id: str) -> int:
+        return await self._call("discard_collection", collection_id)
+
+    async def search_by_embedding(
+        self, query_embedding: Optional[List[float]], limit: int = 10, embedding_space: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return await self._call("search_by_embedding", query_embedding, limit, embedding_space)
+
+    async def autocomplete(
+        self, query: str, limit: int = 10, collection_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        return await self._call("autocomplete", query, limit, collection_ids)
+
+    async def build_neighbor_graph(self, collection_id: str, k: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        return await self._call("build_neighbor_graph", collection_id, k)
+
+    async def similar_files(self, collection_id: str, file_id: str, limit: int = 10) -> Optional[Dict[str, Any]]:
+        return await self._call("similar_files", collection_id, file_id, limit)
+
+    async def neighbor_duplicates(self, collection_id: str, threshold: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        return await self._call("neighbor_duplicates", collection_id, threshold)
+
+    async def neighbor_clusters(
+        self, collection_id: str, threshold: Optional[float] = None, min_size: int = 2
+    ) -> Optional[List[List[str]]]:
+        return await self._call("neighbor_clusters", collection_id, threshold, min_size)
+
+    async def get_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call("get_collection", collection_id)
+
+    async def get_collection_files(self, collection_id: str) -> Optional[List[Dict[str, Any]]]:
+        return await self._call("get_collection_files", collection_id)
+
+    async def get_collection_stats(self, collection_id: str, top_n: int = 10) -> Optional[Dict[str, Any]]:
+        return await self._call("get_collection_stats", collection_id, top_n)
+
+    async def get_all_collections(self) -> List[Dict[str, Any]]:
+        return await self._call("get_all_collections")
+
+    async def delete_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call("delete_collection", collection_id)
+
+    async def sweep_unfinished(self) -> List[str]:
+        return await self._call("sweep_unfinished")
+
+    async def apply_retention(
+        self,
+        keep_last: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+        dry_run: bool = False,
+    ) -> List[str]:
+        return await self._call("apply_retention", keep_last, max_age_days, dry_run)
+
+    async def create_taxonomy(
+        self,
+        name: str,
+        structure: Dict[str, Any],
+        folder_vectors: Optional[List[List[float]]] = None,
+        embedding_space: Optional[str] = None,
+        source_collection_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return await self._call(
+            "create_taxonomy", name, structure, folder_vectors, embedding_space, source_collection_id
+        )
+
+    async def get_taxonomy(self, taxonomy_id: str, with_vectors: bool = False) -> Optional[Dict[str, Any]]:
+        return await self._call("get_taxonomy", taxonomy_id, with_vectors)
+
+    async def get_all_taxonomies(self) -> List[Dict[str, Any]]:
+        return await self._call("get_all_taxonomies")
+
+    async def set_taxonomy_vectors(self, taxonomy_id: str, folder_vectors: List[List[float]], embedding_space: str) -> bool:
+        return await self._call("set_taxonomy_vectors", taxonomy_id, folder_vectors, embedding_space)
+
+    async def delete_taxonomy(self, taxonomy_id: str) -> bool:
+        return await self._call("delete_taxonomy", taxonomy_id)
+
+    async def export_snapshot(self, collection_id: str, path: str) -> Optional[Dict[str, Any]]:
+        return await self._call("export_snapshot", collection_id, path)
+
+    async def import_snapshot(self, path: str, keep_id: bool = True) -> Dict[str, Any]:
+        return await self._call("import_snapshot", path, keep_id)
+
+    async def vector_index_status(self) -> Dict[str, Any]:
+        return await self._call("vector_index_status")
+
+    async def claim_migration(self, owner: str) -> bool:
+        return await self._call("claim_migration", owner)
+
+    async def release_migration(self, owner: str):
+        return await self._call("release_migration", owner)
+
+    async def begin_migration(self, embedding_space: str) -> Optional[Dict[str, Any]]:
+        return await self._call("begin_migration", embedding_space)
+
+    async def pending_migration_records(self, name: str, after_id: int = 0, limit: int = 100) -> Optional[Dict[str, Any]]:
+        return await self._call("pending_migration_records", name, after_id, limit)
+
+    async def add_migrated_vectors(
+        self, name: str, records: List[Dict[str, Any]], failed: Optional[int] = None, owner: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await self._call("add_migrated_vectors", name, records, failed, owner)
+
+    async def complete_migration(self, name: str) -> Optional[Dict[str, Any]]:
+        return await self._call("complete_migration", name)
+
+    async def cancel_migration(self) -> Optional[Dict[str, Any]]:
+        return await self._call("cancel_migration")
+
+    async def aclose(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
@@ -0,0 +1,210 @@
+"""
+Upload Ingest - Incrementally decode compressed NDJSON / MessagePack file uploads
+"""
+from typing import AsyncIterator, Iterator, Dict, Any, Optional, Type
+import json
+import zlib
+
+from pydantic import BaseModel, ValidationError
+
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+
+
+class IngestError(Exception):
+    """Upload rejected while streaming; carries the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def is_streaming_upload(content_type: Optional[str]) -> bool:
+    """Check if a request body should go through the streaming ingest path"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return media_type in NDJSON_TYPES or media_type in MSGPACK_TYPES
+
+
+class _ZlibStream:
+    """gzip/deflate decoder that inflates at most `limit` bytes per step"""
+
+    def __init__(self, wbits: int, limit: int):
+        self._obj = zlib.decompressobj(wbits)
+        self._limit = limit
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        yield self._obj.decompress(data, self._limit)
+        while self._obj.unconsumed_tail:
+            yield self._obj.decompress(self._obj.unconsumed_tail, self._limit)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+# A zstd block decodes to at most 128 KiB and takes at least 3 bytes of input
+_ZSTD_BLOCK_SIZE = 128 * 1024
+_ZSTD_MIN_BLOCK_INPUT = 3
+
+
+class _ZstdStream:
+    """
+    zstd decoder (optional dependency) that inflates about `limit` bytes per
+    step at most. Its decompress() has no output cap, so input goes in slices
+    too short to complete more than `limit` bytes worth of blocks.
+    """
+
+    def __init__(self, limit: int):
+        try:
+            import zstandard
+        except ImportError:
+            raise IngestError(415, "zstd uploads require the 'zstandard' package")
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+        self._error = zstandard.ZstdError
+        self._step = max(_ZSTD_MIN_BLOCK_INPUT, _ZSTD_MIN_BLOCK_INPUT * (limit // _ZSTD_BLOCK_SIZE))
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        view = memoryview(data)
+        try:
+            for start in range(0, len(view), self._step):
+                output = self._obj.decompress(view[start : start + self._step])
+                if output:
+                    yield output
+        except self._error as e:
+            raise IngestError(400, f"Corrupt zstd body: {e}")
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _decoder(content_encoding: Optional[str], limit: int):
+    """Pick the stream decoder for the body's Content-Encoding (None for identity)"""
+    encoding = (content_encoding or "identity").strip().lower()
+
+    if encoding in ("identity", ""):
+        return None
+    if encoding in ("gzip", "x-gzip"):
+        return _ZlibStream(16 + zlib.MAX_WBITS, limit)
+    if encoding == "deflate":
+        return _ZlibStream(zlib.MAX_WBITS, limit)
+    if encoding == "zstd":
+        return _ZstdStream(limit)
+
+    raise IngestError(415, f"Unsupported Content-Encoding: {encoding}")
+
+
+class UploadIngest:
+    """
+    Turns a raw request body stream into validated file dicts one record at a time.
+    Limits are enforced as bytes arrive, so an oversized upload is rejected
+    before it is ever held in memory.
+    """
+
+    def __init__(
+        self,
+        content_type: Optional[str],
+        content_encoding: Optional[str],
+        max_files: int,
+        max_record_size: int,
+        model: Optional[Type[BaseModel]] = None,
+    ):
+        self.media_type = (content_type or "").split(";")[0].strip().lower()
+        self.content_encoding = content_encoding
+        self.max_files = max_files
+        self.max_record_size = max_record_size
+        self.model = model
+        self.count = 0
+        self.bytes_received = 0
+
+    async def iter_files(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one file dict per decoded record"""
+        decoder = _decoder(self.content_encoding, self.max_record_size)
+
+        async def plain_chunks() -> AsyncIterator[bytes]:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                self.bytes_received += len(chunk)
+                if decoder is None:
+                    yield chunk
+                    continue
+                try:
+                    for data in decoder.feed(chunk):
+                        yield data
+                except zlib.error as e:
+                    raise IngestError(400, f"Corrupt {self.content_encoding} body: {e}")
+            if decoder is not None:
+                yield decoder.flush()
+
+        if self.media_type in MSGPACK_TYPES:
+            records = self._iter_msgpack(plain_chunks())
+        else:
+            records = self._iter_ndjson(plain_chunks())
+
+        async for record in records:
+            yield self._accept(record)
+
+    async def _iter_ndjson(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+        buffer = bytearray()
+        async for chunk in chunks:
+            # Only the new bytes can contain the next newline
+            scan = len(buffer)
+            buffer += chunk
+            start = 0
+            while True:
+                newline = buffer.find(b"\n", max(start, scan))
+                if newline == -1:
+                    break
+                line = bytes(buffer[start:newline]).strip()
+                start = newline + 1
+                if line:
+                    yield self._decode_line(line)
+            del buffer[:start]
+            if len(buffer) > self.max_record_size:
+                raise IngestError(413, f"File record exceeds MAX_FILE_SIZE ({self.max_record_size} bytes)")
+
+        line = bytes(buffer).strip()
+        if line:
+            yield self._decode_line(line)
+
+    async def _iter_msgpack(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+        try:
+            import msgpack
+        except ImportError:
+            raise IngestError(415, "MessagePack uploads require the 'msgpack' package")
+
+        unpacker = msgpack.Unpacker(raw=False, max_buffer_size=self.max_record_size)
+        async for chunk in chunks:
+            try:
+                unpacker.feed(chunk)
+            except msgpack.BufferFull:
+                raise IngestError(413, f"File record exceeds MAX_FILE_SIZE ({self.max_record_size} bytes)")
+            try:
+                for record in unpacker:
+                    yield record
+            except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as e:
+                raise IngestError(400, f"Invalid MessagePack record: {e}")
+
+    def _decode_line(self, line: bytes) -> Any:
+        if len(line) > self.max_record_size:
+            raise IngestError(413, f"File record exceeds MAX_FILE_SIZE ({self.max_record_size} bytes)")
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as e:
+            raise IngestError(400, f"Invalid NDJSON record {self.count + 1}: {e}")
+
+    def _accept(self, record: Any) -> Dict[str, Any]:
+        """Validate one record and apply the batch limit"""
+        self.count += 1
+        if self.count > self.max_files:
+            raise IngestError(413, f"Too many files: limit is {self.max_files} per batch")
+
+        if not isinstance(record, dict):
+            raise IngestError(400, f"Record {self.count} is not an object")
+        if self.model is None:
+            return record
+        try:
+            return self.model.model_validate(record).model_dump()
+        except ValidationError as e:
+            raise IngestError(422, f"Record {self.count}: {e.errors()[0].get('msg', 'invalid')}")
@@ -0,0 +1,102 @@
+"""
+JSON Stream - Incremental parsing of the LLM's organization structure as tokens arrive
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import json
+
+
+class StructureStreamParser:
+    """
+    Scans streamed text shaped like {"structure": {"Category": {...}, ...}, ...}
+    and returns each category as soon as its value closes. Text before the first
+    "{" is ignored, and `done` flips once the structure object itself closes, so
+    the caller can stop generation without waiting for trailing keys or junk.
+    """
+
+    def __init__(self, key: str = "structure"):
+        self.key = key
+        self.text = ""
+        self.done = False
+        self.categories: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._keys: Dict[int, Optional[str]] = {}
+        self._in_structure = False
+        self._member_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume more text; returns the categories completed by it"""
+        if self.done or not chunk:
+            return []
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start : i + 1]
+                continue
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":":
+                self._keys[self._depth] = self._decode(self._last_string)
+                if self._in_structure and self._depth == 2:
+                    self._member_start = self._string_start
+            elif char in "{[":
+                self._depth += 1
+                if char == "{" and self._depth == 2 and self._keys.get(1) == self.key:
+                    self._in_structure = True
+            elif char in "}]":
+                self._depth -= 1
+                if self._in_structure and self._depth == 2 and self._member_start is not None:
+                    member = self._parse_member(text[self._member_start : i + 1])
+                    self._member_start = None
+                    if member and member[0] not in self.categories:
+                        self.categories[member[0]] = member[1]
+                        completed.append(member)
+                elif self._in_structure and self._depth == 1:
+                    self.done = True
+                    self._pos = i + 1
+                    return completed
+                elif self._depth == 0:
+                    # Top-level object closed without a structure key
+                    self.done = True
+                    self._pos = i + 1
+                    return completed
+        self._pos = len(text)
+        return completed
+
+    @staticmethod
+    def _decode(raw: Optional[str]) -> Optional[str]:
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_member(member: str) -> Optional[Tuple[str, Any]]:
+        try:
+            return next(iter(json.loads("{" + member + "}").items()))
+        except (ValueError, StopIteration):
+            return None
@@ -0,0 +1,140 @@
+"""
+Structured Logging - Level-gated event logging with lazy, truncated payloads
+"""
+from typing import Any, Dict, Optional
+import json
+import logging
+import random
+import sys
+import time
+
+from config import settings
+
+
+_ROOT = "lumina"
+_configured = False
+
+
+def truncate(value: Any, max_items: int = 10, max_string: int = 300, depth: int = 3) -> Any:
+    """
+    Shrink a payload for logging: long strings are cut, numeric vectors (embeddings)
+    collapse to their length, and containers keep only the first few entries.
+    """
+    if isinstance(value, str):
+        if len(value) > max_string:
+            return f"{value[:max_string]}...(+{len(value) - max_string} chars)"
+        return value
+    if isinstance(value, (list, tuple)):
+        if len(value) > max_items and all(isinstance(v, (int, float)) for v in value[:max_items]):
+            return f"<{len(value)} numbers>"
+        if depth <= 0:
+            return f"<list {len(value)} items>"
+        items = [truncate(v, max_items, max_string, depth - 1) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"...(+{len(value) - max_items} more)")
+        return items
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"<dict {len(value)} keys>"
+        out = {}
+        for i, (key, item) in enumerate(value.items()):
+            if i >= max_items:
+                out["..."] = f"+{len(value) - max_items} more keys"
+                break
+            out[str(key)] = truncate(item, max_items, max_string, depth - 1)
+        return out
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return truncate(str(value), max_items, max_string, depth)
+
+
+class _TextFormatter(logging.Formatter):
+    """2024-01-01T00:00:00 INFO lumina.thinker event key=value ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+        parts = [stamp, record.levelname, record.name, record.getMessage()]
+        for key, value in getattr(record, "fields", {}).items():
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, default=str, separators=(",", ":"))
+            parts.append(f"{key}={value}")
+        line = " ".join(str(p) for p in parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """Install the lumina handler once; safe to call repeatedly"""
+    global _configured
+    root = logging.getLogger(_ROOT)
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(_JSONFormatter() if (fmt or settings.LOG_FORMAT) == "json" else _TextFormatter())
+    root.addHandler(handler)
+    root.propagate = False
+    _configured = True
+
+
+class StructuredLogger:
+    """
+    Logs an event name plus keyword fields.
+    - Nothing is rendered unless the level is enabled.
+    - Callable field values are only called when the event is actually emitted,
+      so expensive payloads cost nothing at INFO.
+    - `sampled=True` keeps only LOG_SAMPLE_RATE of high-frequency debug/info
+      events; warnings and errors are always logged.
+    """
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"{_ROOT}.{name}")
+
+    def is_enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, fields: Dict[str, Any]):
+        if not self._logger.isEnabledFor(level):
+            return
+        exc_info = fields.pop("exc_info", None)
+        sampled = fields.pop("sampled", False)
+        if sampled and level < logging.WARNING and random.random() >= settings.LOG_SAMPLE_RATE:
+            return
+        rendered = {
+            key: truncate(value() if callable(value) else value)
+            for key, value in fields.items()
+        }
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": rendered})
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
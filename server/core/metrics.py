@@ -0,0 +1,356 @@
+"""
+Metrics - In-process counters, gauges and histograms with Prometheus text exposition
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect
+import time
+
+from config import settings
+
+
+# Seconds; covers sub-millisecond SQLite reads up to multi-minute LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Bytes; 1KB .. 1GB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+TOKEN_BUCKETS = tuple(256 * 2 ** i for i in range(8))
+
+# Per-request stage durations, only allocated when a timing breakdown was requested
+_request_timing: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timing", default=None)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _NoopChild:
+    """Stand-in returned by every metric when metrics are disabled"""
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+
+_NOOP = _NoopChild()
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """A metric family; `labels(...)` returns the per-label-set child"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), enabled: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.enabled = enabled
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        if not self.enabled:
+            return _NOOP
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    # Unlabelled shortcuts
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, enabled: bool = True):
+        super().__init__(name, documentation, labelnames, enabled)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames, self.enabled))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, self.enabled))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets, self.enabled))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "lumina_http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "lumina_http_request_seconds", "HTTP request latency", ["method", "route"]
+)
+HTTP_INFLIGHT = REGISTRY.gauge("lumina_http_inflight_requests", "HTTP requests in progress")
+HTTP_REQUEST_BYTES = REGISTRY.histogram(
+    "lumina_http_request_bytes", "HTTP request body size", ["route"], SIZE_BUCKETS
+)
+HTTP_RESPONSE_BYTES = REGISTRY.histogram(
+    "lumina_http_response_bytes", "HTTP response body size", ["route"], SIZE_BUCKETS
+)
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "lumina_stage_seconds", "Time spent per pipeline stage", ["stage"]
+)
+FILES_PROCESSED = REGISTRY.counter(
+    "lumina_files_processed_total", "Files passed through a pipeline stage", ["stage"]
+)
+
+PROVIDER_LATENCY = REGISTRY.histogram(
+    "lumina_provider_request_seconds", "Model provider call latency", ["provider", "operation"]
+)
+PROVIDER_ERRORS = REGISTRY.counter(
+    "lumina_provider_errors_total", "Failed model provider calls", ["provider", "operation"]
+)
+PROVIDER_INFLIGHT = REGISTRY.gauge(
+    "lumina_provider_inflight_requests", "Model provider calls in progress", ["provider", "operation"]
+)
+PROVIDER_HEDGES = REGISTRY.counter(
+    "lumina_provider_hedges_total", "Duplicate requests sent for straggling provider calls", ["operation"]
+)
+PROVIDER_HEDGE_WINS = REGISTRY.counter(
+    "lumina_provider_hedge_wins_total", "Hedged requests that answered before the original", ["operation"]
+)
+PROVIDER_RETRIES = REGISTRY.counter(
+    "lumina_provider_retries_total", "Provider call rounds retried after every endpoint failed", ["operation"]
+)
+CIRCUIT_OPEN = REGISTRY.gauge(
+    "lumina_provider_circuit_open", "1 while an endpoint's circuit breaker is open", ["endpoint"]
+)
+FALLBACKS = REGISTRY.counter(
+    "lumina_fallbacks_total", "Degraded results returned instead of a model answer", ["kind"]
+)
+STARTUP_SECONDS = REGISTRY.gauge(
+    "lumina_startup_seconds", "Initialization time per component (total = until serving)", ["component"]
+)
+CACHE_HITS = REGISTRY.counter(
+    "lumina_cache_hits_total", "Work avoided by reusing an earlier result", ["cache"]
+)
+ADMISSION_INFLIGHT = REGISTRY.gauge(
+    "lumina_admission_inflight", "Admitted bulk work in progress (requests, bytes, files)", ["resource"]
+)
+ADMISSION_QUEUED = REGISTRY.gauge("lumina_admission_queued", "Bulk requests waiting for admission")
+ADMISSION_REJECTED = REGISTRY.counter(
+    "lumina_admission_rejected_total", "Requests refused by admission control", ["reason"]
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "lumina_prompt_tokens", "Estimated tokens of organization prompts", (), TOKEN_BUCKETS
+)
+PROVIDER_QUEUED = REGISTRY.gauge(
+    "lumina_provider_queued", "Provider calls waiting for a slot, by request priority", ["priority"]
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block into lumina_stage_seconds and the request's timing breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timing = _request_timing.get()
+        if timing is not None:
+            timing[stage] = timing.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def provider_call(provider: str, operation: str):
+    """Track latency, in-flight count and errors of one model provider call"""
+    inflight = PROVIDER_INFLIGHT.labels(provider, operation)
+    inflight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PROVIDER_ERRORS.labels(provider, operation).inc()
+        raise
+    finally:
+        inflight.dec()
+        PROVIDER_LATENCY.labels(provider, operation).observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency, in-flight requests and payload sizes.
+    When the client sends `X-Lumina-Timing: 1` (or TIMING_HEADER is on) the per-stage
+    breakdown is returned in a standard `Server-Timing` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (not REGISTRY.enabled and not settings.TIMING_HEADER):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        want_timing = settings.TIMING_HEADER or headers.get(b"x-lumina-timing", b"0") != b"0"
+        timing: Optional[Dict[str, float]] = {} if want_timing else None
+        token = _request_timing.set(timing)
+
+        start = time.perf_counter()
+        status = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timing is not None:
+                    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timing.items()]
+                    entries.append(f"total;dur={(time.perf_counter() - start) * 1000:.1f}")
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", ", ".join(entries).encode("latin-1"))
+                    ]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_INFLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_INFLIGHT.dec()
+            _request_timing.reset(token)
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_RESPONSE_BYTES.labels(route).observe(response_bytes)
+            request_length = headers.get(b"content-length")
+            if request_length and request_length.isdigit():
+                HTTP_REQUEST_BYTES.labels(route).observe(int(request_length))
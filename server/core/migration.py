@@ -0,0 +1,178 @@
+"""
+Re-embedding Migration - Background rebuild of the vector index after an embedding model change
+"""
+from typing import Any, Dict, List, Optional
+import asyncio
+import os
+import time
+import uuid
+
+from config import settings
+from core.admission import BULK, set_priority
+from core.embeddings import EmbeddingEngine
+from core.log import get_logger
+
+log = get_logger("migration")
+
+# Embedded when a whole batch failed, to tell a model that is down from files it cannot embed
+PROBE_TEXT = "lumina"
+
+
+class ReembeddingMigration:
+    """
+    Re-embeds every stored file with the current embedding model into a new
+    vector index next to the active one; searches keep using the active index
+    (and are refused if their model differs) until the organizer cuts over.
+
+    Runs on spare capacity only: at BULK priority, so searches overtake its
+    model calls at the provider gate, and not at all while bulk requests are
+    admitted. Batches of VECTOR_MIGRATION_BATCH_SIZE files are paced to at most
+    VECTOR_MIGRATION_MAX_RATE files per second. Progress is kept in the
+    VectorIndex row and files already re-embedded are skipped, so a restart
+    resumes where the previous run stopped.
+    """
+
+    def __init__(self, organizer, providers, admission):
+        self.organizer = organizer
+        self.providers = providers
+        self.admission = admission
+        # Several API workers may share one index service; only the claim holder runs
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        """Start migrating to the current embedding model in the background; False if already running"""
+        if self.running:
+            return False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+    async def stop(self):
+        """Stop the job, keeping its progress (shutdown)"""
+        if self.running:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def cancel(self) -> Optional[Dict[str, Any]]:
+        """Stop the job and drop the index it was building"""
+        await self.stop()
+        return await self.organizer.cancel_migration()
+
+    async def status(self) -> Dict[str, Any]:
+        status = await self.organizer.vector_index_status()
+        building = status.get("building")
+        if building:
+            processed = building["done"] + building["failed"]
+            building["progress"] = round(min(1.0, processed / building["total"]), 4) if building["total"] else 1.0
+        status["migration"] = {"running": self.running, "error": self._error}
+        return status
+
+    async def _run(self):
+        set_priority(BULK)
+        self._error = None
+        try:
+            # Open the vector store and provider clients off the event loop (no-ops once warm)
+            await asyncio.to_thread(self.organizer.connect_vector_store)
+            await asyncio.to_thread(self.providers.start)
+            while True:
+                if not await self.organizer.claim_migration(self.owner):
+                    log.info("migration.claimed_elsewhere", owner=self.owner)
+                    return
+                space = self.providers.current.embedding_engine.space
+                building = await self.organizer.begin_migration(space)
+                if building is None:
+                    return
+                outcome = await self._migrate(building["name"], space)
+                if outcome == "done":
+                    await self.organizer.complete_migration(building["name"])
+                    return
+                if outcome != "model_changed":
+                    log.warning("migration.stopped", index=building["name"], reason=outcome)
+                    return
+                # Providers were swapped mid-run: start over towards the new model
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = str(e)
+            log.error("migration.failed", error=str(e), exc_info=True)
+        finally:
+            try:
+                await self.organizer.release_migration(self.owner)
+            except Exception:
+                pass
+
+    async def _migrate(self, name: str, space: str) -> str:
+        """
+        Passes over the file table until one finds nothing left to embed. A file
+        whose embedding fails while the model is up is retried on later passes,
+        up to VECTOR_MIGRATION_MAX_ATTEMPTS times, then left out of the new
+        index, so a few files the model cannot embed do not hold up the cutover.
+        Returns "done", "stalled" (a batch failed entirely and the model does
+        not answer a probe either), "cancelled" or "model_changed".
+        """
+        failures: Dict[int, int] = {}  # row id -> failed attempts, for files not embedded yet
+        while True:
+            after_id: Optional[int] = 0
+            tried = 0
+            while after_id is not None:
+                await self._wait_for_capacity()
+                page = await self.organizer.pending_migration_records(
+                    name, after_id, settings.VECTOR_MIGRATION_BATCH_SIZE
+                )
+                if page is None:
+                    return "cancelled"
+                after_id = page["last_id"]
+                records: List[Dict[str, Any]] = [
+                    r for r in page["records"] if failures.get(r["id"], 0) < settings.VECTOR_MIGRATION_MAX_ATTEMPTS
+                ]
+                if not records:
+                    continue
+
+                started = time.monotonic()
+                async with self.providers.lease() as services:
+                    engine = services.embedding_engine
+                    if engine.space != space:
+                        return "model_changed"
+                    vectors = await asyncio.gather(*(
+                        engine.generate_embedding(EmbeddingEngine.file_text({
+                            "name": r["name"], "path": r["path"], "extractedText": r["extracted_text"],
+                        }))
+                        for r in records
+                    ))
+                    # A batch failing entirely counts against its files only if the model is up
+                    if not any(vectors) and not await engine.generate_embedding(PROBE_TEXT):
+                        return "stalled"
+                for record, vector in zip(records, vectors):
+                    record["embedding"] = vector
+                    if vector:
+                        failures.pop(record["id"], None)
+                    else:
+                        failures[record["id"]] = failures.get(record["id"], 0) + 1
+                ok = [r for r in records if r["embedding"]]
+                # Each file that is still failing is counted once, however often it was retried
+                progress = await self.organizer.add_migrated_vectors(name, ok, len(failures), self.owner)
+                if progress is None:
+                    return "cancelled"
+                tried += len(records)
+                log.info("migration.batch", index=name, embedded=len(ok), failed=len(records) - len(ok),
+                         done=progress["done"], total=progress["total"], sampled=True)
+
+                if settings.VECTOR_MIGRATION_MAX_RATE > 0:
+                    pace = len(records) / settings.VECTOR_MIGRATION_MAX_RATE
+                    await asyncio.sleep(max(0.0, pace - (time.monotonic() - started)))
+
+            if tried == 0:
+                if failures:
+                    log.warning("migration.files_skipped", index=name, files=len(failures),
+                                attempts=settings.VECTOR_MIGRATION_MAX_ATTEMPTS)
+                return "done"
+
+    async def _wait_for_capacity(self):
+        """Hold off while bulk requests (ingestion, imports, graph builds) are admitted"""
+        while self.admission.active > 0:
+            await asyncio.sleep(settings.VECTOR_MIGRATION_IDLE_WAIT)
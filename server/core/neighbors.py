@@ -0,0 +1,126 @@
+"""
+Neighbor Graph - Top-k cosine neighbors of every file in a collection, built from stored vectors
+"""
+from typing import Dict, List, Tuple
+import os
+
+import numpy as np
+
+
+def top_k_neighbors(vectors: np.ndarray, k: int, memory_budget: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (indices, scores) of each row's k most cosine-similar other rows, best first.
+    Similarities are computed one block of rows at a time (block @ all.T), with the
+    block height chosen so the score block and its partition scratch stay within
+    `memory_budget` bytes; the full N x N matrix never exists.
+    Process pool entry point, so it only takes and returns arrays.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n = len(vectors)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int32), np.empty((n, 0), dtype=np.float32)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1, norms)
+    # Score block (float32) plus argpartition's index scratch (int64) per row
+    block = max(1, min(n, memory_budget // (n * 12)))
+
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        sims = unit[start:stop] @ unit.T
+        rows = np.arange(stop - start)
+        sims[rows, start + rows] = -np.inf  # not its own neighbor
+        top = np.argpartition(sims, n - k, axis=1)[:, n - k:]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+
+class NeighborGraph:
+    """
+    Persisted top-k graph of one collection: row i holds the neighbors of file_ids[i]
+    as row numbers with their cosine similarity. Besides "more like this" lookups
+    it answers near-duplicate suggestions and threshold clustering without
+    touching the vectors again.
+    """
+
+    def __init__(self, file_ids: List[str], neighbors: np.ndarray, scores: np.ndarray):
+        self.file_ids = list(file_ids)
+        self.neighbors = neighbors
+        self.scores = scores
+        self._rows: Dict[str, int] = {file_id: i for i, file_id in enumerate(self.file_ids)}
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    def __contains__(self, file_id: str) -> bool:
+        return file_id in self._rows
+
+    def neighbors_of(self, file_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+        row = self._rows.get(file_id)
+        if row is None:
+            return []
+        return [
+            (self.file_ids[i], score)
+            for i, score in zip(self.neighbors[row, :limit].tolist(), self.scores[row, :limit].tolist())
+        ]
+
+    def _edges(self, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Edges at or above `threshold`, each unordered pair once"""
+        rows, cols = np.nonzero(self.scores >= threshold)
+        a, b = rows, self.neighbors[rows, cols]
+        scores = self.scores[rows, cols]
+        # a -> b and b -> a are the same pair; either may be missing from the other's top-k
+        pairs = np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1)
+        _, first = np.unique(pairs, axis=0, return_index=True)
+        keep = np.zeros(len(pairs), dtype=bool)
+        keep[first] = True
+        return pairs[keep, 0], pairs[keep, 1], scores[keep]
+
+    def duplicate_suggestions(self, threshold: float) -> List[Dict[str, object]]:
+        """File pairs similar enough to be near-duplicates, most similar first"""
+        a, b, scores = self._edges(threshold)
+        order = np.argsort(-scores, kind="stable")
+        return [
+            {"file_id": self.file_ids[i], "similar_id": self.file_ids[j], "score": round(score, 4)}
+            for i, j, score in zip(a[order].tolist(), b[order].tolist(), scores[order].tolist())
+        ]
+
+    def clusters(self, threshold: float, min_size: int = 2) -> List[List[str]]:
+        """Connected components of the graph restricted to edges at or above `threshold`, largest first"""
+        parent = list(range(len(self.file_ids)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        a, b, _ = self._edges(threshold)
+        for i, j in zip(a.tolist(), b.tolist()):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        groups: Dict[int, List[str]] = {}
+        for i, file_id in enumerate(self.file_ids):
+            groups.setdefault(find(i), []).append(file_id)
+        return sorted((g for g in groups.values() if len(g) >= min_size), key=len, reverse=True)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, file_ids=np.array(self.file_ids), neighbors=self.neighbors, scores=self.scores)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NeighborGraph":
+        with np.load(path) as data:
+            return cls(data["file_ids"].tolist(), data["neighbors"], data["scores"])
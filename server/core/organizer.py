@@ -2,201 +2,837 @@
 File Organizer - Manages collections, vector store, and persistence
 """
 from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+import asyncio
 import json
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
+import threading
+import time
 import uuid
 
-from database.models import Collection, FileRecord, get_session
+from sqlalchemy import bindparam, case, delete, func, insert, select, text, update
+
+from database.models import (
+    NAME_INDEX, Collection, FileRecord, Taxonomy, VectorIndex, compact_database, get_session, name_index_available,
+)
+from core.scanner import FileScanner
+from core.filetable import SIZE_BUCKETS, SIZE_BUCKET_LABELS
+from core.snapshot import COLUMNS as SNAPSHOT_COLUMNS, Snapshot, SnapshotError, SnapshotWriter
+from core.neighbors import NeighborGraph, top_k_neighbors
+from core.workers import run_cpu
+from core.metrics import stage_timer, FILES_PROCESSED
+from core.log import get_logger
+from core.startup import STARTUP
+
 from config import settings
 
+log = get_logger("organizer")
+
+# A migration claim not refreshed for this long is considered abandoned
+MIGRATION_CLAIM_TIMEOUT = 120.0
+# Vector queries per search while neighbors from unfinished collections crowd out the rest
+SEARCH_REFILL_ATTEMPTS = 3
+
+
+class EmbeddingSpaceMismatch(Exception):
+    """Query or vectors come from a different embedding model/dimension than the index"""
+
+
+def _taxonomy_dict(row: Taxonomy, with_vectors: bool = False) -> Dict[str, Any]:
+    structure = json.loads(row.structure)
+    taxonomy = {
+        "taxonomy_id": row.taxonomy_id,
+        "name": row.name,
+        "structure": structure,
+        "folders": sum(len(folders) for subcategories in structure.values() for folders in subcategories.values()),
+        "source_collection_id": row.source_collection_id,
+        "embedding_space": row.embedding_space,
+        "created_at": row.created_at.isoformat(),
+    }
+    if with_vectors:
+        taxonomy["folder_vectors"] = json.loads(row.folder_vectors) if row.folder_vectors else None
+    return taxonomy
+
+
+def _index_dict(row: VectorIndex) -> Dict[str, Any]:
+    return {
+        "name": row.name,
+        "embedding_space": row.embedding_space,
+        "dimension": row.dimension,
+        "state": row.state,
+        "total": row.total,
+        "done": row.done,
+        "failed": row.failed,
+        "created_at": row.created_at.isoformat(),
+        "activated_at": row.activated_at.isoformat() if row.activated_at else None,
+    }
+
+
+def _like_pattern(term: str) -> str:
+    """Escape LIKE wildcards (ESCAPE '\\')"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _record_metadata(record: Dict[str, Any], duplicate_counts: Dict[str, int], index: Dict[str, Any]) -> Dict[str, Any]:
+    """Vector store metadata of a stored file row (keys as in FileRecord)"""
+    return {
+        "collection_id": record["collection_id"],
+        "file_id": record["file_id"],
+        "name": record["name"],
+        "path": f"{record['category']}/{record['subcategory']}/{record['folder']}" if record["category"] else record["path"],
+        "original_path": record["path"],
+        "type": record["type"],
+        "size": record["size"],
+        "duplicate_count": duplicate_counts.get(record["file_id"], 0),
+        "embedding_space": index["embedding_space"],
+        "embedding_dim": index["dimension"],
+    }
+
 
 class FileOrganizer:
     """Manages file organization, storage, and retrieval"""
 
     def __init__(self):
-        # Initialize ChromaDB for vector storage
+        # ChromaDB is imported and opened on first use (or by the startup pre-warm)
+        self.chroma_client = None
+        self._collection = None
+        # Active vector index (searched) and the one being built by a re-embedding migration
+        self._index: Optional[Dict[str, Any]] = None
+        self._building: Optional[Dict[str, Any]] = None
+        self._building_collection = None
+        self._migration_owner: Optional[str] = None
+        self._migration_heartbeat = 0.0
+        self._vector_store_checked = False
+        self._vector_store_lock = threading.Lock()
+        # Background maintenance: rows deleted since the last compaction, running tasks
+        self._deleted_rows = 0
+        self._compaction: Optional[asyncio.Task] = None
+        self._compaction_pending = False
+        self._retention: Optional[asyncio.Task] = None
+        # Collections being staged by an analysis in this process, not yet finished or discarded
+        self._staging: set = set()
+        # Recently used neighbor graphs, by collection id
+        self._graphs: "OrderedDict[str, NeighborGraph]" = OrderedDict()
+
+    @property
+    def collection(self):
+        """The ChromaDB collection, or None when the vector store is unavailable (or _connect has not run)"""
+        return self._collection
+
+    async def _connect(self):
+        """
+        Open the vector store on first use. Connecting runs on a worker thread:
+        the pre-warm may hold the connect lock for seconds, and the event loop
+        must keep serving meanwhile.
+        """
+        if not self._vector_store_checked:
+            await asyncio.to_thread(self.connect_vector_store)
+
+    def connect_vector_store(self):
+        """Initialize ChromaDB for vector storage (idempotent, thread-safe)"""
+        with self._vector_store_lock:
+            if self._vector_store_checked:
+                return
+            with STARTUP.component("vector_store"):
+                try:
+                    import chromadb
+                    self.chroma_client = chromadb.PersistentClient(
+                        path=settings.CHROMA_PERSIST_DIR
+                    )
+                    self._index, self._building = self._load_vector_indexes()
+                    self._collection = self._open_index(self._index)
+                    if self._building:
+                        self._building_collection = self._open_index(self._building)
+                except Exception as e:
+                    log.warning("vector_store.unavailable", error=str(e))
+                    self.chroma_client = None
+                    self._collection = None
+            self._vector_store_checked = True
+
+    def _open_index(self, index: Dict[str, Any]):
+        return self.chroma_client.get_or_create_collection(
+            name=index["name"],
+            metadata={"description": "LUMINA organized files", "embedding_space": index["embedding_space"]},
+        )
+
+    def _load_vector_indexes(self):
+        """
+        (active, building) index records. A store created before indexes were
+        tracked is adopted as the active index in the configured embedding space.
+        """
+        from core.embeddings import embedding_space
+
+        session = get_session()
         try:
-            import chromadb
-            self.chroma_client = chromadb.PersistentClient(
-                path=settings.CHROMA_PERSIST_DIR
-            )
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="lumina_files",
-                metadata={"description": "LUMINA organized files"},
+            active = session.query(VectorIndex).filter(VectorIndex.state == "active").first()
+            if active is None:
+                active = VectorIndex(
+                    name="lumina_files",
+                    embedding_space=embedding_space(),
+                    state="active",
+                    activated_at=datetime.utcnow(),
+                )
+                session.add(active)
+                session.commit()
+                session.refresh(active)
+            building = session.query(VectorIndex).filter(VectorIndex.state == "building").first()
+            return _index_dict(active), _index_dict(building) if building else None
+        finally:
+            session.close()
+
+    def _target_index(self, space: Optional[str]):
+        """(chroma collection, index) that vectors of `space` belong in, or (None, None)"""
+        if not self.collection:
+            return None, None
+        if space is None or space == self._index["embedding_space"]:
+            return self._collection, self._index
+        if self._building and space == self._building["embedding_space"]:
+            return self._building_collection, self._building
+        return None, None
+
+    def _set_dimension(self, index: Dict[str, Any], dimension: int):
+        """Record an index's vector dimension, learned from the first vector stored"""
+        index["dimension"] = dimension
+        self._update_index_row(index["name"], dimension=dimension)
+
+    @staticmethod
+    def _update_index_row(name: str, **values):
+        session = get_session()
+        try:
+            session.query(VectorIndex).filter(VectorIndex.name == name).update(values)
+            session.commit()
+        finally:
+            session.close()
+
+    def _check_query_space(self, space: Optional[str], dimension: Optional[int] = None):
+        """Refuse a query that cannot be compared with the active index's vectors"""
+        index = self._index
+        if space is not None and space != index["embedding_space"]:
+            detail = f"index holds {index['embedding_space']} vectors, query is {space}"
+            if self._building and self._building["embedding_space"] == space:
+                detail += "; re-embedding in progress"
+            raise EmbeddingSpaceMismatch(detail)
+        if dimension is not None and index["dimension"] is not None and dimension != index["dimension"]:
+            raise EmbeddingSpaceMismatch(
+                f"index holds {index['dimension']}-dimensional vectors, query has {dimension}"
             )
-        except Exception as e:
-            print(f"Warning: ChromaDB not available: {e}")
-            self.chroma_client = None
-            self.collection = None
 
-    async def save_collection(
-        self, files: List[Dict[str, Any]], organized_structure: Dict[str, Any]
-    ) -> str:
-        """Save collection to database and vector store"""
-        collection_id = str(uuid.uuid4())
+    async def stage_files(
+        self, collection_id: str, files: List[Dict[str, Any]], embedding_space: Optional[str] = None
+    ) -> int:
+        """
+        Persist one chunk of a collection being analyzed: its file rows in one
+        bulk insert, and the canonical files' vectors (indexed only where
+        `embedding_space`, default the active index's, is stored). Files carrying
+        "category"/"subcategory"/"folder" are stored as placed; the others keep
+        their original path until place_files files them under the organized one.
+        The collection itself appears once finish_collection registers it.
+        """
+        if not files:
+            return 0
+        await self._connect()
+        self._staging.add(collection_id)
+        now = datetime.utcnow()
+        records = [
+            {
+                "file_id": file["id"],
+                "collection_id": collection_id,
+                "name": file["name"],
+                "path": file.get("path", ""),
+                "type": file["type"],
+                "size": file["size"],
+                "extracted_text": file.get("extractedText", ""),
+                "category": file.get("category"),
+                "subcategory": file.get("subcategory"),
+                "folder": file.get("folder"),
+                "duplicate_of": file.get("duplicate_of"),
+                "created_at": now,
+            }
+            for file in files
+        ]
+        try:
+            with stage_timer("sqlite"):
+                await asyncio.to_thread(self._insert_records, records)
+            if self.collection:
+                with stage_timer("vector_store"):
+                    await self._add_to_vector_store(files, collection_id, embedding_space)
+        except Exception as e:
+            log.error("collection.stage_failed", collection_id=collection_id, error=str(e))
+            raise
+        FILES_PROCESSED.labels("persist").inc(len(files))
+        return len(files)
 
+    @staticmethod
+    def _insert_records(records: List[Dict[str, Any]]):
+        session = get_session()
         try:
+            session.execute(insert(FileRecord), records)
+            session.commit()
+        finally:
+            session.close()
+
+    async def staged_records(self, collection_id: str, after_id: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Next file rows of a collection after row id `after_id`, with what placing
+        them needs (no text). Returns {"records", "last_id"}, last_id None once
+        the collection is exhausted.
+        """
+        fields = ("id", "file_id", "name", "path", "type", "size", "duplicate_of")
+
+        def fetch():
             session = get_session()
+            try:
+                return session.query(*(getattr(FileRecord, field) for field in fields)).filter(
+                    FileRecord.collection_id == collection_id, FileRecord.id > after_id
+                ).order_by(FileRecord.id).limit(limit).all()
+            finally:
+                session.close()
 
-            # Save collection metadata
-            categories = list(organized_structure.keys())
-            collection = Collection(
-                collection_id=collection_id,
-                total_files=len(files),
-                organized_structure=json.dumps(organized_structure),
-                categories=json.dumps(categories),
-            )
-            session.add(collection)
+        rows = await asyncio.to_thread(fetch)
+        records = [
+            {"row": row_id, "id": file_id, "name": name, "path": path, "type": file_type, "size": size,
+             "duplicate_of": duplicate_of}
+            for row_id, file_id, name, path, file_type, size, duplicate_of in rows
+        ]
+        return {"records": records, "last_id": rows[-1][0] if rows else None}
 
-            # Save individual files
-            for file in files:
-                # Find file location in organized structure
-                location = self._find_file_location(file, organized_structure)
+    async def place_files(
+        self,
+        collection_id: str,
+        placements: List[List[Any]],
+        duplicate_counts: Optional[Dict[str, int]] = None,
+    ) -> int:
+        """
+        Record where staged files were placed: placements are
+        [row id, file id, category, subcategory, folder]. The rows are updated in
+        one executemany and each stored vector's metadata gets the organized path
+        and its duplicate count.
+        """
+        if not placements:
+            return 0
+        duplicate_counts = duplicate_counts or {}
+        with stage_timer("sqlite"):
+            await asyncio.to_thread(self._update_locations, placements)
 
-                file_record = FileRecord(
-                    file_id=file["id"],
-                    collection_id=collection_id,
-                    name=file["name"],
-                    path=file.get("path", ""),
-                    type=file["type"],
-                    size=file["size"],
-                    extracted_text=file.get("extractedText", ""),
-                    category=location.get("category"),
-                    subcategory=location.get("subcategory"),
-                    folder=location.get("folder"),
-                )
-                session.add(file_record)
+        await self._update_vector_metadata(collection_id, {
+            file_id: {
+                "path": f"{category}/{subcategory}/{folder}",
+                "duplicate_count": duplicate_counts.get(file_id, 0),
+            }
+            for _, file_id, category, subcategory, folder in placements
+        })
+        return len(placements)
+
+    async def set_duplicate_counts(self, collection_id: str, duplicate_counts: Dict[str, int]) -> int:
+        """Record on the stored vectors how many duplicates each canonical file has"""
+        await self._update_vector_metadata(
+            collection_id, {file_id: {"duplicate_count": count} for file_id, count in duplicate_counts.items()}
+        )
+        return len(duplicate_counts)
 
+    async def _update_vector_metadata(self, collection_id: str, metadata: Dict[str, Dict[str, Any]]):
+        """Merge metadata (by file id) into the collection's vectors in the active and building indexes"""
+        await self._connect()
+        targets = [c for c in (self.collection, self._building_collection) if c is not None]
+        if not targets or not metadata:
+            return
+        with stage_timer("vector_store"):
+            by_id = {f"{collection_id}_{file_id}": values for file_id, values in metadata.items()}
+            for target in targets:
+                # Duplicates and files whose embedding failed have no vector
+                stored = await asyncio.to_thread(target.get, ids=list(by_id), include=[])
+                if stored["ids"]:
+                    await asyncio.to_thread(
+                        target.update, ids=stored["ids"], metadatas=[by_id[i] for i in stored["ids"]]
+                    )
+
+    @staticmethod
+    def _update_locations(placements: List[List[Any]]):
+        session = get_session()
+        try:
+            session.execute(
+                # Core UPDATE: an ORM update() with a parameter list means bulk update by primary key
+                update(FileRecord.__table__).where(FileRecord.__table__.c.id == bindparam("row_id")).values(
+                    category=bindparam("new_category"),
+                    subcategory=bindparam("new_subcategory"),
+                    folder=bindparam("new_folder"),
+                ),
+                [
+                    {"row_id": row, "new_category": category, "new_subcategory": subcategory, "new_folder": folder}
+                    for row, _, category, subcategory, folder in placements
+                ],
+            )
             session.commit()
+        finally:
             session.close()
 
-            # Add to vector store
-            if self.collection and files:
-                await self._add_to_vector_store(files, collection_id, organized_structure)
+    async def finish_collection(
+        self,
+        collection_id: str,
+        total_files: int,
+        organized_structure: Dict[str, Any],
+        duplicate_groups: Optional[List[Dict[str, Any]]] = None,
+    ) -> str:
+        """
+        Register a collection whose files were staged and placed. The stored
+        structure lists each placed file by its metadata only (no text or vectors,
+        which live in the file rows and the vector store).
+        """
+        def save():
+            session = get_session()
+            try:
+                session.add(Collection(
+                    collection_id=collection_id,
+                    total_files=total_files,
+                    organized_structure=json.dumps(organized_structure),
+                    categories=json.dumps(list(organized_structure.keys())),
+                    duplicate_groups=json.dumps(duplicate_groups or []),
+                ))
+                session.commit()
+            finally:
+                session.close()
 
-            print(f"✅ Saved collection {collection_id} with {len(files)} files")
-            return collection_id
+        with stage_timer("sqlite"):
+            await asyncio.to_thread(save)
 
-        except Exception as e:
-            print(f"Error saving collection: {e}")
-            raise
+        self._staging.discard(collection_id)
+        log.info("collection.saved", collection_id=collection_id, files=total_files)
+        self.schedule_retention()
+        return collection_id
 
-    def _find_file_location(
-        self, file: Dict[str, Any], structure: Dict[str, Any]
-    ) -> Dict[str, str]:
-        """Find where a file is located in the organized structure"""
-        for category, subcategories in structure.items():
-            for subcategory, folders in subcategories.items():
-                for folder, file_list in folders.items():
-                    if any(f["id"] == file["id"] for f in file_list):
-                        return {
-                            "category": category,
-                            "subcategory": subcategory,
-                            "folder": folder,
-                        }
-        return {}
-
-    async def _add_to_vector_store(self, files: List[Dict[str, Any]], collection_id: str, structure: Dict[str, Any]):
-        """Add files to ChromaDB vector store"""
-        if not self.collection:
+    async def discard_collection(self, collection_id: str) -> int:
+        """Remove the staged rows and vectors of a collection that was never finished"""
+        rows = await self._delete_files(collection_id)
+        self._staging.discard(collection_id)
+        log.info("collection.discarded", collection_id=collection_id, files=rows)
+        self._deleted_rows += rows
+        if self._deleted_rows >= settings.COMPACTION_MIN_DELETED_ROWS:
+            self.schedule_compaction()
+        return rows
+
+    async def _add_to_vector_store(
+        self,
+        files: List[Dict[str, Any]],
+        collection_id: str,
+        embedding_space: Optional[str] = None,
+    ):
+        """Add files to the ChromaDB index of their embedding space"""
+        await self._connect()
+        target, index = self._target_index(embedding_space)
+        if target is None:
+            # e.g. the model changed without a migration: keep the records, the
+            # re-embedding migration indexes them into the new space
+            if self.collection:
+                log.warning("vector_store.space_mismatch", collection_id=collection_id,
+                            space=embedding_space, active=self._index["embedding_space"])
             return
 
         try:
+            dimension = index["dimension"]
             # Prepare data for ChromaDB
             ids = []
             embeddings = []
             documents = []
             metadatas = []
 
+            # Duplicates share their canonical file's vector, so only canonicals are indexed
             for file in files:
-                if file.get("embedding"):
+                if file.get("embedding") and not file.get("duplicate_of"):
+                    if dimension is None:
+                        dimension = len(file["embedding"])
+                    elif len(file["embedding"]) != dimension:
+                        log.warning("vector_store.dimension_mismatch", file=file.get("name", "unknown"),
+                                    expected=dimension, got=len(file["embedding"]))
+                        continue
                     try:
                         ids.append(f"{collection_id}_{file['id']}")
                         embeddings.append(file["embedding"])
 
                         # Document text
-                        doc = f"{file['name']} {file.get('extractedText', '')[:500]}"
+                        doc = f"{file['name']} {(file.get('extractedText') or '')[:500]}"
                         documents.append(doc)
 
-                        # Find organized location for this file
-                        location = self._find_file_location(file, structure)
-                        organized_path = file.get("path", "")
-                        
-                        # If file is in organized structure, build the organized path
-                        if location:
-                            category = location.get('category', '')
-                            subcategory = location.get('subcategory', '')
-                            folder = location.get('folder', '')
-                            organized_path = f"{category}/{subcategory}/{folder}"
-
-                        # Metadata
+                        # Metadata (path is the organized one once placed; duplicate_count is set by place_files)
+                        placed = file.get("folder") is not None
                         metadatas.append(
                             {
                                 "collection_id": collection_id,
                                 "file_id": file["id"],
                                 "name": file["name"],
-                                "path": organized_path,
+                                "path": (
+                                    f"{file['category']}/{file['subcategory']}/{file['folder']}"
+                                    if placed else file.get("path", "")
+                                ),
                                 "original_path": file.get("path", ""),
                                 "type": file["type"],
                                 "size": file.get("size", 0),
+                                "duplicate_count": 0,
+                                "embedding_space": index["embedding_space"],
+                                "embedding_dim": dimension,
                             }
                         )
                     except Exception as e:
-                        print(f"Error processing file {file.get('name', 'unknown')}: {e}")
+                        log.warning("vector_store.file_skipped", file=file.get("name", "unknown"), error=str(e))
                         continue
 
             if ids:
-                self.collection.add(
+                if index["dimension"] is None:
+                    self._set_dimension(index, dimension)
+                await asyncio.to_thread(
+                    target.add,
                     ids=ids,
                     embeddings=embeddings,
                     documents=documents,
                     metadatas=metadatas,
                 )
-                print(f"Added {len(ids)} files to vector store")
+                log.info("vector_store.added", files=len(ids), index=index["name"], sampled=True)
 
         except Exception as e:
-            print(f"Error adding to vector store: {e}")
+            log.error("vector_store.add_failed", collection_id=collection_id, error=str(e))
 
-    async def semantic_search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Semantic search across all files"""
+    async def semantic_search(
+        self, query: str, limit: int = 10, embedding_engine=None
+    ) -> List[Dict[str, Any]]:
+        """
+        Semantic search across all files, embedding the query with the shared engine.
+        Raises EmbeddingSpaceMismatch if the engine's model is not the index's.
+        """
+        await self._connect()
         if not self.collection:
             return []
 
         try:
             # Generate query embedding
-            from core.embeddings import EmbeddingEngine
+            if embedding_engine is None:
+                from core.embeddings import EmbeddingEngine
+
+                embedding_engine = EmbeddingEngine()
+            self._check_query_space(embedding_engine.space)
+            with stage_timer("search_embedding"):
+                query_embedding = await embedding_engine.generate_embedding(query)
+
+            return await self.search_by_embedding(query_embedding, limit, embedding_engine.space)
+
+        except EmbeddingSpaceMismatch:
+            raise
+        except Exception as e:
+            log.error("search.failed", error=str(e))
+            return []
+
+    async def search_by_embedding(
+        self, query_embedding: Optional[List[float]], limit: int = 10, embedding_space: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Nearest files to an already computed query vector of `embedding_space`"""
+        await self._connect()
+        if not self.collection or not query_embedding:
+            return []
+        self._check_query_space(embedding_space, len(query_embedding))
 
-            embedding_engine = EmbeddingEngine()
-            query_embedding = await embedding_engine.generate_embedding(query)
+        # Search in ChromaDB; vectors of collections still being analyzed are skipped,
+        # asking for more neighbors while they crowd out the finished ones
+        n_results = limit
+        for _ in range(SEARCH_REFILL_ATTEMPTS):
+            with stage_timer("search_query"):
+                results = await asyncio.to_thread(
+                    self.collection.query, query_embeddings=[query_embedding], n_results=n_results
+                )
+            metadatas = results["metadatas"][0] if results and results["metadatas"] else []
+            finished = await asyncio.to_thread(
+                self._finished_collections, {m.get("collection_id") for m in metadatas}
+            )
+            metadatas = [m for m in metadatas if m.get("collection_id") in finished]
+            if len(metadatas) >= limit or len(results["ids"][0]) < n_results:
+                break
+            n_results *= 4
 
-            # Search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding], n_results=limit
+        # Format results
+        formatted_results = []
+        for metadata in metadatas[:limit]:
+            formatted_results.append(
+                {
+                    "id": metadata.get("file_id", ""),
+                    "name": metadata.get("name", "Unknown"),
+                    "path": metadata.get("path", ""),
+                    "type": metadata.get("type", "file"),
+                    "size": metadata.get("size", 0),
+                }
             )
 
-            # Format results
-            formatted_results = []
-            if results and results["metadatas"]:
-                for metadata in results["metadatas"][0]:
-                    formatted_results.append(
-                        {
-                            "id": metadata.get("file_id", ""),
-                            "name": metadata.get("name", "Unknown"),
-                            "path": metadata.get("path", ""),
-                            "type": metadata.get("type", "file"),
-                            "size": metadata.get("size", 0),
-                        }
-                    )
+        return formatted_results
 
-            return formatted_results
+    @staticmethod
+    def _finished_collections(collection_ids) -> set:
+        """Those of the given ids that have a collection row (finish_collection ran)"""
+        collection_ids = [cid for cid in collection_ids if cid]
+        if not collection_ids:
+            return set()
+        session = get_session()
+        try:
+            return set(session.execute(
+                select(Collection.collection_id).where(Collection.collection_id.in_(collection_ids))
+            ).scalars())
+        finally:
+            session.close()
 
-        except Exception as e:
-            print(f"Error in semantic search: {e}")
+    async def autocomplete(
+        self, query: str, limit: int = 10, collection_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Files whose name or original path contains every word of `query`, for
+        typeahead; never calls the embedding model. Words of 3+ characters are
+        looked up in the FTS5 trigram index and shorter words filter the hits.
+        Only the newest AUTOCOMPLETE_CANDIDATES hits in names and as many in
+        names or paths are ranked (name hits, then names starting with the
+        query, then shorter names), so common words cost no more than rare ones.
+        A query with no word long enough for the index, or a database without
+        it, scans FileRecord with LIKE instead. Only finished collections are
+        searched, optionally restricted to some of them.
+        """
+        terms = query.split()
+        if not terms or limit <= 0:
             return []
+        indexed = [t for t in terms if len(t) >= 3] if name_index_available() else []
+        params: Dict[str, Any] = {
+            "prefix": _like_pattern(query.strip()) + "%",
+            "limit": limit,
+            "candidates": max(limit, settings.AUTOCOMPLETE_CANDIDATES),
+        }
+        filters = []
+        for n, term in enumerate(terms):
+            if indexed and len(term) >= 3:
+                continue  # matched by the index
+            params[f"t{n}"] = f"%{_like_pattern(term)}%"
+            filters.append(f"(r.name LIKE :t{n} ESCAPE '\\' OR r.path LIKE :t{n} ESCAPE '\\')")
+        if collection_ids:
+            params["collections"] = list(collection_ids)
+            filters.append("r.collection_id IN :collections")
+        # Rows staged by an analysis that has not finished (or never will) are not listed
+        filters.append("EXISTS (SELECT 1 FROM collection AS c WHERE c.collection_id = r.collection_id)")
+        where = " AND ".join(filters)
+
+        if indexed:
+            # Each word is one quoted FTS5 string: a substring match, with no query syntax
+            words = " AND ".join('"' + t.replace('"', '""') + '"' for t in indexed)
+            params["in_name"] = f"name : ({words})"
+            params["anywhere"] = words
+            hits = f"""
+                SELECT id, MIN(field) AS field FROM (
+                    SELECT * FROM (
+                        SELECT r.id, 0 AS field FROM {NAME_INDEX} JOIN filerecord AS r ON r.id = {NAME_INDEX}.rowid
+                        WHERE {NAME_INDEX} MATCH :in_name AND {where}
+                        ORDER BY {NAME_INDEX}.rowid DESC LIMIT :candidates
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT r.id, 1 AS field FROM {NAME_INDEX} JOIN filerecord AS r ON r.id = {NAME_INDEX}.rowid
+                        WHERE {NAME_INDEX} MATCH :anywhere AND {where}
+                        ORDER BY {NAME_INDEX}.rowid DESC LIMIT :candidates
+                    )
+                ) GROUP BY id
+            """
+        else:
+            hits = f"""
+                SELECT r.id, 0 AS field FROM filerecord AS r
+                WHERE {where}
+                ORDER BY r.id DESC LIMIT :candidates
+            """
+        statement = text(f"""
+            SELECT f.file_id, f.collection_id, f.name, f.path, f.type, f.size,
+                   f.category, f.subcategory, f.folder
+            FROM ({hits}) AS hits
+            JOIN filerecord AS f ON f.id = hits.id
+            ORDER BY hits.field, f.name LIKE :prefix ESCAPE '\\' DESC, length(f.name), f.id DESC
+            LIMIT :limit
+        """)
+        if collection_ids:
+            statement = statement.bindparams(bindparam("collections", expanding=True))
+
+        def fetch():
+            session = get_session()
+            try:
+                return session.execute(statement, params).all()
+            finally:
+                session.close()
+
+        with stage_timer("autocomplete"):
+            rows = await asyncio.to_thread(fetch)
+
+        return [
+            {
+                "id": file_id,
+                "collection_id": collection_id,
+                "name": name,
+                "path": f"{category}/{subcategory}/{folder}" if category else path,
+                "original_path": path,
+                "type": file_type,
+                "size": size,
+            }
+            for file_id, collection_id, name, path, file_type, size, category, subcategory, folder in rows
+        ]
+
+    def _graph_path(self, collection_id: str) -> str:
+        return os.path.join(settings.NEIGHBOR_GRAPH_DIR, f"{collection_id}.npz")
+
+    async def _neighbor_graph(self, collection_id: str) -> Optional[NeighborGraph]:
+        """The collection's persisted neighbor graph (cached), or None if it was never built"""
+        graph = self._graphs.get(collection_id)
+        if graph is None:
+            path = self._graph_path(collection_id)
+            if not os.path.exists(path):
+                return None
+            graph = await asyncio.to_thread(NeighborGraph.load, path)
+            self._graphs[collection_id] = graph
+            while len(self._graphs) > settings.NEIGHBOR_GRAPH_CACHE_SIZE:
+                self._graphs.popitem(last=False)
+        self._graphs.move_to_end(collection_id)
+        return graph
+
+    def _file_summaries(self, collection_id: str, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Search-result shaped records (organized path) for some files of a collection"""
+        session = get_session()
+        records = session.query(FileRecord).filter(
+            FileRecord.collection_id == collection_id, FileRecord.file_id.in_(file_ids)
+        ).all()
+        session.close()
+        return {
+            r.file_id: {
+                "id": r.file_id,
+                "name": r.name,
+                "path": f"{r.category}/{r.subcategory}/{r.folder}" if r.category else r.path,
+                "type": r.type,
+                "size": r.size,
+            }
+            for r in records
+        }
+
+    async def build_neighbor_graph(self, collection_id: str, k: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Compute and persist the top-k neighbor graph of a collection's stored vectors
+        (duplicates have none; they resolve to their canonical file). The blocked
+        matrix multiplies run on the CPU pool, or a thread when there is none.
+        Returns a summary, or None if the collection does not exist.
+        """
+        import numpy as np
+
+        await self._connect()
+
+        k = k or settings.NEIGHBOR_GRAPH_K
+        if not await self.get_collection(collection_id):
+            return None
+        if not self.collection:
+            raise RuntimeError("vector store unavailable")
+
+        with stage_timer("neighbor_graph"):
+            def load():
+                file_ids: List[str] = []
+                vectors: List[Any] = []
+                for file_id, vector in self._iter_stored_vectors(collection_id):
+                    file_ids.append(file_id)
+                    vectors.append(vector)
+                return file_ids, np.asarray(vectors, dtype=np.float32)
+
+            file_ids, matrix = await asyncio.to_thread(load)
+
+            budget = settings.NEIGHBOR_GRAPH_MEMORY_MB * 1024 * 1024
+            if settings.CPU_WORKERS > 0:
+                neighbors, scores = await run_cpu(top_k_neighbors, matrix, k, budget)
+            else:
+                # NumPy releases the GIL inside matmul/partition, so a thread keeps the loop free
+                neighbors, scores = await asyncio.to_thread(top_k_neighbors, matrix, k, budget)
+
+            graph = NeighborGraph(file_ids, neighbors, scores)
+            graph.save(self._graph_path(collection_id))
+            self._graphs.pop(collection_id, None)
+
+        log.info("neighbors.built", collection_id=collection_id, files=len(file_ids), k=graph.k)
+        return {"collection_id": collection_id, "files": len(file_ids), "k": graph.k}
+
+    async def similar_files(self, collection_id: str, file_id: str, limit: int = 10) -> Optional[Dict[str, Any]]:
+        """
+        Files of the same collection most similar to `file_id`, from its stored vector
+        (no model call). Answered from the neighbor graph when one is built and
+        covers `limit`, otherwise by a vector store query. None if the file is unknown.
+        """
+        import numpy as np
+
+        await self._connect()
+
+        def fetch():
+            session = get_session()
+            try:
+                return session.query(FileRecord.duplicate_of).filter(
+                    FileRecord.collection_id == collection_id, FileRecord.file_id == file_id
+                ).first()
+            finally:
+                session.close()
+
+        record = await asyncio.to_thread(fetch)
+        if not record:
+            return None
+        # A duplicate has no vector of its own; it shares its canonical's
+        canonical = record.duplicate_of or file_id
+
+        graph = await self._neighbor_graph(collection_id)
+        if graph is not None and canonical in graph and limit <= graph.k:
+            source = "graph"
+            ranked = graph.neighbors_of(canonical, limit)
+        else:
+            source = "vector_store"
+            ranked = []
+            stored = await asyncio.to_thread(
+                self.collection.get, ids=[f"{collection_id}_{canonical}"], include=["embeddings"]
+            ) if self.collection else None
+            if stored and len(stored["embeddings"]):
+                query = np.asarray(stored["embeddings"][0], dtype=np.float32)
+                with stage_timer("search_query"):
+                    results = await asyncio.to_thread(
+                        self.collection.query,
+                        query_embeddings=[query],
+                        n_results=limit + 1,
+                        where={"collection_id": collection_id},
+                        include=["metadatas", "embeddings"],
+                    )
+                found = np.asarray(results["embeddings"][0], dtype=np.float32)
+                if len(found):
+                    norms = np.linalg.norm(found, axis=1) * np.linalg.norm(query)
+                    scores = found @ query / np.where(norms == 0, 1, norms)
+                    ranked = [
+                        (metadata["file_id"], float(score))
+                        for metadata, score in zip(results["metadatas"][0], scores.tolist())
+                        if metadata["file_id"] != canonical
+                    ][:limit]
+
+        summaries = await asyncio.to_thread(self._file_summaries, collection_id, [neighbor for neighbor, _ in ranked])
+        return {
+            "file_id": file_id,
+            "source": source,
+            "results": [
+                {**summaries[neighbor], "score": round(score, 4)}
+                for neighbor, score in ranked
+                if neighbor in summaries
+            ],
+        }
+
+    async def neighbor_duplicates(self, collection_id: str, threshold: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """Near-duplicate suggestions from the neighbor graph (None if it was not built)"""
+        graph = await self._neighbor_graph(collection_id)
+        if graph is None:
+            return None
+        return await asyncio.to_thread(graph.duplicate_suggestions, threshold or settings.NEIGHBOR_DUPLICATE_THRESHOLD)
+
+    async def neighbor_clusters(
+        self, collection_id: str, threshold: Optional[float] = None, min_size: int = 2
+    ) -> Optional[List[List[str]]]:
+        """Groups of mutually similar files from the neighbor graph (None if it was not built)"""
+        graph = await self._neighbor_graph(collection_id)
+        if graph is None:
+            return None
+        return await asyncio.to_thread(graph.clusters, threshold or settings.NEIGHBOR_CLUSTER_THRESHOLD, min_size)
 
     async def get_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a collection by ID"""
-        try:
+        def fetch():
             session = get_session()
             collection = session.query(Collection).filter(
                 Collection.collection_id == collection_id
@@ -211,16 +847,133 @@ class FileOrganizer:
                 "total_files": collection.total_files,
                 "organized_structure": json.loads(collection.organized_structure),
                 "categories": json.loads(collection.categories),
+                "duplicate_groups": json.loads(collection.duplicate_groups or "[]"),
                 "created_at": collection.created_at.isoformat(),
             }
 
+        try:
+            return await asyncio.to_thread(fetch)
+
+        except Exception as e:
+            log.error("collection.get_failed", collection_id=collection_id, error=str(e))
+            return None
+
+    async def get_collection_files(self, collection_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Get the placed file records of a collection"""
+        def fetch():
+            session = get_session()
+            exists = session.query(Collection.id).filter(
+                Collection.collection_id == collection_id
+            ).first()
+            records = session.query(FileRecord).filter(
+                FileRecord.collection_id == collection_id
+            ).all() if exists else []
+            session.close()
+
+            if not exists:
+                return None
+
+            return [
+                {
+                    "id": r.file_id,
+                    "name": r.name,
+                    "path": r.path,
+                    "type": r.type,
+                    "size": r.size,
+                    "category": r.category,
+                    "subcategory": r.subcategory,
+                    "folder": r.folder,
+                }
+                for r in records
+            ]
+
+        try:
+            return await asyncio.to_thread(fetch)
+
         except Exception as e:
-            print(f"Error getting collection: {e}")
+            log.error("collection.files_failed", collection_id=collection_id, error=str(e))
             return None
 
+    async def get_collection_stats(self, collection_id: str, top_n: int = 10) -> Optional[Dict[str, Any]]:
+        """
+        Collection statistics from SQL aggregates.
+        A single grouped scan over the covering index returns a handful of rows;
+        everything else is folded together from those. None if the collection
+        does not exist; database errors are raised.
+        """
+        def aggregate():
+            session = get_session()
+            try:
+                exists = session.query(Collection.id).filter(
+                    Collection.collection_id == collection_id
+                ).first()
+                if not exists:
+                    return None
+
+                # Grouping follows the covering index order, so no temporary sort is needed;
+                # the size histogram comes from cumulative "smaller than edge" counts
+                below_edges = [
+                    func.sum(case((FileRecord.size < edge, 1), else_=0)) for edge, _ in SIZE_BUCKETS
+                ]
+                rows = session.query(
+                    FileRecord.category,
+                    FileRecord.type,
+                    func.count(),
+                    func.coalesce(func.sum(FileRecord.size), 0),
+                    *below_edges,
+                ).filter(
+                    FileRecord.collection_id == collection_id
+                ).group_by(FileRecord.category, FileRecord.type).all()
+            finally:
+                session.close()
+
+            stats = {
+                "collection_id": collection_id,
+                "total_files": 0,
+                "total_size": 0,
+                "categories": {},
+                "category_sizes": {},
+                "file_types": {},
+                "top_extensions": [],
+                "size_histogram": {},
+            }
+            histogram = [0] * len(SIZE_BUCKET_LABELS)
+            extensions: Dict[str, List[int]] = {}
+            for category, file_type, count, total, *below in rows:
+                category = category or "Unplaced"
+                file_type = (file_type or "").lower() or "no_extension"
+                stats["total_files"] += count
+                stats["total_size"] += total
+                stats["categories"][category] = stats["categories"].get(category, 0) + count
+                stats["category_sizes"][category] = stats["category_sizes"].get(category, 0) + total
+                kind = FileScanner.EXTENSION_CATEGORY.get(file_type, "other")
+                stats["file_types"][kind] = stats["file_types"].get(kind, 0) + count
+                previous = 0
+                for i, cumulative in enumerate(below + [count]):
+                    histogram[i] += (cumulative or 0) - previous
+                    previous = cumulative or 0
+                ext = extensions.setdefault(file_type, [0, 0])
+                ext[0] += count
+                ext[1] += total
+
+            stats["size_histogram"] = dict(zip(SIZE_BUCKET_LABELS, histogram))
+            top = sorted(extensions.items(), key=lambda item: -item[1][0])[:top_n]
+            stats["top_extensions"] = [
+                {"extension": ext, "count": count, "total_size": total}
+                for ext, (count, total) in top
+            ]
+            return stats
+
+        try:
+            return await asyncio.to_thread(aggregate)
+
+        except Exception as e:
+            log.error("collection.stats_failed", collection_id=collection_id, error=str(e))
+            raise
+
     async def get_all_collections(self) -> List[Dict[str, Any]]:
         """Get all collections"""
-        try:
+        def fetch():
             session = get_session()
             collections = session.query(Collection).order_by(
                 Collection.created_at.desc()
@@ -237,6 +990,705 @@ class FileOrganizer:
                 for c in collections
             ]
 
+        try:
+            return await asyncio.to_thread(fetch)
+
         except Exception as e:
-            print(f"Error getting all collections: {e}")
+            log.error("collections.list_failed", error=str(e))
             return []
+
+    async def delete_collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Delete a collection with its file rows and vectors. The collection row goes
+        first so it disappears from lookups at once; file rows follow in
+        DELETE_BATCH_SIZE transactions, yielding to other requests in between, and
+        vectors are removed by their collection_id metadata.
+        Returns the number of deleted file rows, or None if the collection does not exist.
+        """
+        try:
+            with stage_timer("delete"):
+                if not await asyncio.to_thread(self._delete_collection_row, collection_id):
+                    return None
+                rows = await self._delete_files(collection_id)
+                self._graphs.pop(collection_id, None)
+                if os.path.exists(self._graph_path(collection_id)):
+                    os.unlink(self._graph_path(collection_id))
+
+        except Exception as e:
+            log.error("collection.delete_failed", collection_id=collection_id, error=str(e))
+            raise
+
+        log.info("collection.deleted", collection_id=collection_id, files=rows)
+        self._deleted_rows += rows
+        if self._deleted_rows >= settings.COMPACTION_MIN_DELETED_ROWS:
+            self.schedule_compaction()
+        return {"collection_id": collection_id, "files": rows}
+
+    @staticmethod
+    def _delete_collection_row(collection_id: str) -> bool:
+        session = get_session()
+        try:
+            deleted = session.query(Collection).filter(Collection.collection_id == collection_id).delete()
+            session.commit()
+        finally:
+            session.close()
+        return bool(deleted)
+
+    async def _delete_files(self, collection_id: str) -> int:
+        """
+        Delete a collection's vectors, then its file rows in DELETE_BATCH_SIZE
+        transactions. In that order an interrupted delete always leaves rows
+        behind, which sweep_unfinished finds again.
+        """
+        await self._connect()
+        if self.collection:
+            await asyncio.to_thread(self.collection.delete, where={"collection_id": collection_id})
+        if self._building_collection is not None:
+            await asyncio.to_thread(self._building_collection.delete, where={"collection_id": collection_id})
+
+        def delete_batch() -> int:
+            session = get_session()
+            try:
+                batch = select(FileRecord.id).where(
+                    FileRecord.collection_id == collection_id
+                ).limit(settings.DELETE_BATCH_SIZE)
+                deleted = session.execute(
+                    delete(FileRecord).where(FileRecord.id.in_(batch)),
+                    execution_options={"synchronize_session": False},
+                ).rowcount
+                session.commit()
+                return deleted
+            finally:
+                session.close()
+
+        rows = 0
+        while True:
+            deleted = await asyncio.to_thread(delete_batch)
+            rows += deleted
+            if deleted < settings.DELETE_BATCH_SIZE:
+                return rows
+
+    async def sweep_unfinished(self) -> List[str]:
+        """
+        Remove the file rows and vectors of collections that have no collection
+        row and are not being analyzed by this process: analyses cut off by a
+        crash or restart, and deletes interrupted after the collection row went.
+        Returns the swept collection ids.
+        """
+        def fetch():
+            session = get_session()
+            try:
+                return session.execute(
+                    select(FileRecord.collection_id).distinct().where(
+                        ~select(Collection.id).where(Collection.collection_id == FileRecord.collection_id).exists()
+                    )
+                ).scalars().all()
+            finally:
+                session.close()
+
+        orphans = await asyncio.to_thread(fetch)
+
+        swept = [cid for cid in orphans if cid not in self._staging]
+        rows = 0
+        for collection_id in swept:
+            rows += await self._delete_files(collection_id)
+        if swept:
+            log.info("collections.swept", collections=len(swept), files=rows)
+            self._deleted_rows += rows
+            if self._deleted_rows >= settings.COMPACTION_MIN_DELETED_ROWS:
+                self.schedule_compaction()
+        return swept
+
+    def schedule_sweep(self):
+        """Run sweep_unfinished in the background (at startup)"""
+        asyncio.get_running_loop().create_task(self._run_sweep())
+
+    async def _run_sweep(self):
+        try:
+            await self.sweep_unfinished()
+        except Exception as e:
+            log.warning("collections.sweep_failed", error=str(e))
+
+    async def apply_retention(
+        self,
+        keep_last: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+        dry_run: bool = False,
+    ) -> List[str]:
+        """
+        Delete collections outside the retention policies (settings unless given;
+        0 disables a policy): everything but the newest `keep_last`, and everything
+        created more than `max_age_days` ago. Oldest are deleted first.
+        Returns the expired collection ids, newest first.
+        """
+        keep_last = settings.RETENTION_KEEP_LAST if keep_last is None else keep_last
+        max_age_days = settings.RETENTION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+
+        def fetch():
+            session = get_session()
+            try:
+                return session.query(Collection.collection_id, Collection.created_at).order_by(
+                    Collection.created_at.desc()
+                ).all()
+            finally:
+                session.close()
+
+        collections = await asyncio.to_thread(fetch)
+
+        expired = set()
+        if keep_last > 0:
+            expired.update(cid for cid, _ in collections[keep_last:])
+        if max_age_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+            expired.update(cid for cid, created_at in collections if created_at < cutoff)
+        expired_ids = [cid for cid, _ in collections if cid in expired]
+
+        if not dry_run:
+            for collection_id in reversed(expired_ids):
+                await self.delete_collection(collection_id)
+        if expired_ids:
+            log.info("retention.applied", expired=len(expired_ids), dry_run=dry_run,
+                     keep_last=keep_last, max_age_days=max_age_days)
+        return expired_ids
+
+    def schedule_retention(self):
+        """Apply the configured retention policies in the background (no-op when none is set)"""
+        if settings.RETENTION_KEEP_LAST <= 0 and settings.RETENTION_MAX_AGE_DAYS <= 0:
+            return
+        if self._retention and not self._retention.done():
+            return
+        self._retention = asyncio.get_running_loop().create_task(self._run_retention())
+
+    async def _run_retention(self):
+        try:
+            await self.apply_retention()
+        except Exception as e:
+            log.warning("retention.failed", error=str(e))
+
+    def schedule_compaction(self):
+        """
+        Compact SQLite on a worker thread. Asking again while a compaction runs
+        queues exactly one more pass, for the rows deleted in the meantime.
+        """
+        if self._compaction and not self._compaction.done():
+            self._compaction_pending = True
+            return
+        self._compaction = asyncio.get_running_loop().create_task(self._compact())
+
+    async def _compact(self):
+        while True:
+            self._compaction_pending = False
+            self._deleted_rows = 0
+            try:
+                with stage_timer("compaction"):
+                    result = await asyncio.to_thread(compact_database, settings.COMPACTION_PAGES_PER_STEP)
+                log.info("database.compacted", **result)
+            except Exception as e:
+                log.warning("database.compaction_failed", error=str(e))
+            if not self._compaction_pending:
+                return
+
+    async def create_taxonomy(
+        self,
+        name: str,
+        structure: Dict[str, Any],
+        folder_vectors: Optional[List[List[float]]] = None,
+        embedding_space: Optional[str] = None,
+        source_collection_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Save a taxonomy template; folder_vectors follow core.taxonomy.folder_paths order"""
+        row = Taxonomy(
+            taxonomy_id=str(uuid.uuid4()),
+            name=name,
+            structure=json.dumps(structure),
+            source_collection_id=source_collection_id,
+            embedding_space=embedding_space if folder_vectors else None,
+            folder_vectors=json.dumps(folder_vectors) if folder_vectors else None,
+        )
+        def save():
+            session = get_session()
+            try:
+                session.add(row)
+                session.commit()
+                session.refresh(row)
+                return _taxonomy_dict(row)
+            finally:
+                session.close()
+
+        taxonomy = await asyncio.to_thread(save)
+        log.info("taxonomy.saved", taxonomy_id=taxonomy["taxonomy_id"], folders=taxonomy["folders"],
+                 embedded=taxonomy["embedding_space"] is not None)
+        return taxonomy
+
+    async def get_taxonomy(self, taxonomy_id: str, with_vectors: bool = False) -> Optional[Dict[str, Any]]:
+        """A taxonomy template, with its folder vectors on request"""
+        def fetch():
+            session = get_session()
+            try:
+                row = session.query(Taxonomy).filter(Taxonomy.taxonomy_id == taxonomy_id).first()
+                return _taxonomy_dict(row, with_vectors) if row else None
+            finally:
+                session.close()
+
+        return await asyncio.to_thread(fetch)
+
+    async def get_all_taxonomies(self) -> List[Dict[str, Any]]:
+        def fetch():
+            session = get_session()
+            try:
+                return [_taxonomy_dict(row) for row in session.query(Taxonomy).order_by(Taxonomy.created_at.desc()).all()]
+            finally:
+                session.close()
+
+        return await asyncio.to_thread(fetch)
+
+    async def set_taxonomy_vectors(self, taxonomy_id: str, folder_vectors: List[List[float]], embedding_space: str) -> bool:
+        """Replace a template's folder vectors (e.g. recomputed for a new embedding model)"""
+        def save() -> bool:
+            session = get_session()
+            try:
+                row = session.query(Taxonomy).filter(Taxonomy.taxonomy_id == taxonomy_id).first()
+                if not row:
+                    return False
+                row.folder_vectors = json.dumps(folder_vectors)
+                row.embedding_space = embedding_space
+                row.updated_at = datetime.utcnow()
+                session.commit()
+                return True
+            finally:
+                session.close()
+
+        if not await asyncio.to_thread(save):
+            return False
+        log.info("taxonomy.embedded", taxonomy_id=taxonomy_id, space=embedding_space)
+        return True
+
+    async def delete_taxonomy(self, taxonomy_id: str) -> bool:
+        def delete_row() -> int:
+            session = get_session()
+            try:
+                deleted = session.query(Taxonomy).filter(Taxonomy.taxonomy_id == taxonomy_id).delete()
+                session.commit()
+                return deleted
+            finally:
+                session.close()
+
+        deleted = await asyncio.to_thread(delete_row)
+        if deleted:
+            log.info("taxonomy.deleted", taxonomy_id=taxonomy_id)
+        return bool(deleted)
+
+    async def export_snapshot(self, collection_id: str, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Write a collection to a binary snapshot at `path` (see core.snapshot).
+        Vectors come from the vector store, or from the stored structure when it
+        is unavailable. Returns a summary, or None if the collection does not exist.
+        """
+        await self._connect()
+
+        def export():
+            session = get_session()
+            collection = session.query(Collection).filter(
+                Collection.collection_id == collection_id
+            ).first()
+            if not collection:
+                session.close()
+                return None
+            fields = [getattr(FileRecord, field) for field, _, _ in SNAPSHOT_COLUMNS]
+            records = [
+                dict(zip((field for field, _, _ in SNAPSHOT_COLUMNS), row))
+                for row in session.query(*fields).filter(
+                    FileRecord.collection_id == collection_id
+                ).order_by(FileRecord.id).all()
+            ]
+            session.close()
+
+            structure = json.loads(collection.organized_structure)
+            writer = SnapshotWriter(
+                {
+                    "collection_id": collection.collection_id,
+                    "total_files": collection.total_files,
+                    "categories": json.loads(collection.categories),
+                    "duplicate_groups": json.loads(collection.duplicate_groups or "[]"),
+                    "created_at": collection.created_at.isoformat(),
+                    "embedding_space": self._index["embedding_space"] if self.collection else None,
+                },
+                records,
+            )
+            writer.add_columns()
+            writer.set_structure(structure)
+            file_ids, vectors = self._snapshot_vectors(collection_id, structure, writer.rows)
+            writer.set_embeddings(file_ids, vectors)
+            size = writer.write(path)
+            return {"collection_id": collection_id, "files": len(records), "vectors": len(file_ids), "bytes": size}
+
+        try:
+            with stage_timer("snapshot_export"):
+                summary = await asyncio.to_thread(export)
+            if summary is None:
+                return None
+
+            log.info("snapshot.exported", collection_id=collection_id, files=summary["files"],
+                     vectors=summary["vectors"], bytes=summary["bytes"])
+            return summary
+
+        except Exception as e:
+            log.error("snapshot.export_failed", collection_id=collection_id, error=str(e))
+            raise
+
+    def _iter_stored_vectors(self, collection_id: str):
+        """(file id, vector) of every vector stored for a collection, read in SNAPSHOT_BATCH_SIZE pages"""
+        prefix = f"{collection_id}_"
+        offset = 0
+        while True:
+            page = self.collection.get(
+                where={"collection_id": collection_id},
+                include=["embeddings"],
+                limit=settings.SNAPSHOT_BATCH_SIZE,
+                offset=offset,
+            )
+            for vector_id, vector in zip(page["ids"], page["embeddings"]):
+                yield vector_id[len(prefix):], vector
+            if len(page["ids"]) < settings.SNAPSHOT_BATCH_SIZE:
+                return
+            offset += len(page["ids"])
+
+    def _snapshot_vectors(self, collection_id: str, structure: Dict[str, Any], rows: Dict[str, int]):
+        """(file ids, float32 matrix) of the collection's stored vectors"""
+        import numpy as np
+
+        file_ids: List[str] = []
+        vectors: List[Any] = []
+        if self.collection:
+            for file_id, vector in self._iter_stored_vectors(collection_id):
+                if file_id in rows:
+                    file_ids.append(file_id)
+                    vectors.append(vector)
+        else:
+            for subcategories in structure.values():
+                for folders in subcategories.values():
+                    for placed in folders.values():
+                        for file in placed:
+                            if file.get("embedding") and not file.get("duplicate_of") and file.get("id") in rows:
+                                file_ids.append(file["id"])
+                                vectors.append(file["embedding"])
+        return file_ids, np.asarray(vectors, dtype=np.float32)
+
+    async def import_snapshot(self, path: str, keep_id: bool = True) -> Dict[str, Any]:
+        """
+        Restore a collection from a snapshot with bulk inserts: one executemany for
+        the file rows and vector store adds straight from the memory-mapped matrix,
+        so nothing is re-embedded. keep_id=False restores under a new collection id.
+        """
+        await self._connect()
+        with Snapshot(path) as snapshot:
+            meta = snapshot.collection
+            collection_id = meta["collection_id"] if keep_id else str(uuid.uuid4())
+
+            def restore():
+                records = snapshot.records()
+                files = snapshot.files(records)
+                structure = snapshot.structure(files)
+
+                session = get_session()
+                try:
+                    exists = session.query(Collection.id).filter(
+                        Collection.collection_id == collection_id
+                    ).first()
+                    if exists:
+                        raise SnapshotError(f"collection {collection_id} already exists")
+                    session.add(Collection(
+                        collection_id=collection_id,
+                        total_files=meta["total_files"],
+                        organized_structure=json.dumps(structure),
+                        categories=json.dumps(meta["categories"]),
+                        duplicate_groups=json.dumps(meta.get("duplicate_groups") or []),
+                        created_at=datetime.fromisoformat(meta["created_at"]),
+                    ))
+                    if records:
+                        for record in records:
+                            record["collection_id"] = collection_id
+                        session.execute(insert(FileRecord), records)
+                    session.commit()
+                finally:
+                    session.close()
+
+                vectors = len(snapshot.embedding_rows)
+                if self.collection and vectors:
+                    # Snapshots predating embedding spaces are assumed to be in the active one
+                    target, index = self._target_index(meta.get("embedding_space"))
+                    dimension = snapshot.embeddings.shape[1]
+                    if target is None or index["dimension"] not in (None, dimension):
+                        log.warning("snapshot.vectors_skipped", collection_id=collection_id,
+                                    space=meta.get("embedding_space"), dimension=dimension,
+                                    active=self._index["embedding_space"])
+                        vectors = 0
+                    else:
+                        self._restore_vectors(snapshot, records, collection_id, target, index)
+                return records, vectors
+
+            try:
+                with stage_timer("snapshot_import"):
+                    records, vectors = await asyncio.to_thread(restore)
+            except Exception as e:
+                log.error("snapshot.import_failed", collection_id=collection_id, error=str(e))
+                raise
+
+        FILES_PROCESSED.labels("persist").inc(len(records))
+        log.info("snapshot.imported", collection_id=collection_id, files=len(records), vectors=vectors)
+        return {"collection_id": collection_id, "files": len(records), "vectors": vectors}
+
+    def _restore_vectors(
+        self,
+        snapshot: Snapshot,
+        records: List[Dict[str, Any]],
+        collection_id: str,
+        target,
+        index: Dict[str, Any],
+    ):
+        """Vector store entries rebuilt from the file rows, in SNAPSHOT_BATCH_SIZE adds"""
+        duplicate_counts: Dict[str, int] = {}
+        for record in records:
+            if record["duplicate_of"]:
+                duplicate_counts[record["duplicate_of"]] = duplicate_counts.get(record["duplicate_of"], 0) + 1
+
+        rows = snapshot.embedding_rows.tolist()
+        matrix = snapshot.embeddings
+        if index["dimension"] is None:
+            self._set_dimension(index, matrix.shape[1])
+        batch = min(settings.SNAPSHOT_BATCH_SIZE, self.chroma_client.get_max_batch_size())
+        for start in range(0, len(rows), batch):
+            placed = [records[row] for row in rows[start : start + batch]]
+            target.add(
+                ids=[f"{collection_id}_{r['file_id']}" for r in placed],
+                embeddings=matrix[start : start + batch],
+                documents=[f"{r['name']} {(r['extracted_text'] or '')[:500]}" for r in placed],
+                metadatas=[_record_metadata(r, duplicate_counts, index) for r in placed],
+            )
+
+    async def vector_index_status(self) -> Dict[str, Any]:
+        """Active vector index and the re-embedding migration building its replacement, if any"""
+        await self._connect()
+        if not self.collection:
+            return {"available": False, "active": None, "building": None}
+        return {"available": True, "active": dict(self._index), "building": dict(self._building) if self._building else None}
+
+    async def claim_migration(self, owner: str) -> bool:
+        """
+        Make `owner` the one migration runner (API workers each have one in
+        multi-process mode). Claims expire after MIGRATION_CLAIM_TIMEOUT without progress.
+        """
+        now = time.monotonic()
+        if self._migration_owner in (None, owner) or now - self._migration_heartbeat > MIGRATION_CLAIM_TIMEOUT:
+            self._migration_owner = owner
+            self._migration_heartbeat = now
+            return True
+        return False
+
+    async def release_migration(self, owner: str):
+        if self._migration_owner == owner:
+            self._migration_owner = None
+
+    async def begin_migration(self, embedding_space: str) -> Optional[Dict[str, Any]]:
+        """
+        Start (or resume) building an index in `embedding_space` next to the active
+        one. Returns the building index, or None when the active index already is
+        in that space (a migration to another space is then abandoned).
+        """
+        await self._connect()
+        if not self.collection:
+            return None
+        if embedding_space == self._index["embedding_space"]:
+            if self._building:
+                await self.cancel_migration()
+            return None
+        if self._building:
+            if self._building["embedding_space"] == embedding_space:
+                return dict(self._building)
+            await self.cancel_migration()
+
+        def create():
+            session = get_session()
+            try:
+                total = session.query(func.count(FileRecord.id)).filter(FileRecord.duplicate_of.is_(None)).scalar()
+                row = VectorIndex(
+                    name=f"lumina_files_{uuid.uuid4().hex[:8]}",
+                    embedding_space=embedding_space,
+                    state="building",
+                    total=total,
+                )
+                session.add(row)
+                session.commit()
+                session.refresh(row)
+                return _index_dict(row)
+            finally:
+                session.close()
+
+        building = await asyncio.to_thread(create)
+        self._building_collection = await asyncio.to_thread(self._open_index, building)
+        self._building = building
+        log.info("vector_index.migration_started", index=building["name"], space=embedding_space,
+                 previous=self._index["embedding_space"], files=building["total"])
+        return dict(building)
+
+    async def pending_migration_records(self, name: str, after_id: int = 0, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Next canonical file rows after row id `after_id` that the building index
+        `name` does not hold yet (files saved in the new space go there directly).
+        Returns {"records", "last_id"}, last_id None once the table is exhausted;
+        None if `name` is no longer being built.
+        """
+        await self._connect()
+        if not self._building or self._building["name"] != name:
+            return None
+        fields = ("id", "file_id", "collection_id", "name", "path", "type", "size",
+                  "extracted_text", "category", "subcategory", "folder")
+
+        def fetch():
+            session = get_session()
+            try:
+                return session.query(*(getattr(FileRecord, field) for field in fields)).filter(
+                    FileRecord.id > after_id, FileRecord.duplicate_of.is_(None)
+                ).order_by(FileRecord.id).limit(limit).all()
+            finally:
+                session.close()
+
+        rows = await asyncio.to_thread(fetch)
+        records = [dict(zip(fields, row)) for row in rows]
+        if records:
+            stored = await asyncio.to_thread(
+                self._building_collection.get,
+                ids=[f"{r['collection_id']}_{r['file_id']}" for r in records],
+                include=[],
+            )
+            stored_ids = set(stored["ids"])
+            records = [r for r in records if f"{r['collection_id']}_{r['file_id']}" not in stored_ids]
+        return {"records": records, "last_id": rows[-1][0] if rows else None}
+
+    async def add_migrated_vectors(
+        self, name: str, records: List[Dict[str, Any]], failed: Optional[int] = None, owner: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Store re-embedded rows (pending_migration_records entries with an "embedding")
+        in the building index `name`; `failed` replaces the count of files the run
+        could not embed so far (None keeps it). Rows deleted meanwhile are dropped.
+        Returns the index progress, or None if `name` is no longer being built.
+        """
+        await self._connect()
+        building = self._building
+        if not building or building["name"] != name:
+            return None
+        if owner is not None and owner == self._migration_owner:
+            self._migration_heartbeat = time.monotonic()
+
+        records = [r for r in records if r.get("embedding")]
+        if building["dimension"] is not None:
+            records = [r for r in records if len(r["embedding"]) == building["dimension"]]
+        if records:
+            def lookup():
+                session = get_session()
+                try:
+                    live = {
+                        row_id for (row_id,) in session.query(FileRecord.id).filter(
+                            FileRecord.id.in_([r["id"] for r in records])
+                        )
+                    }
+                    duplicate_counts: Dict[str, int] = {}
+                    for collection_id, canonical, count in session.query(
+                        FileRecord.collection_id, FileRecord.duplicate_of, func.count(FileRecord.id)
+                    ).filter(
+                        FileRecord.duplicate_of.in_({r["file_id"] for r in records})
+                    ).group_by(FileRecord.collection_id, FileRecord.duplicate_of):
+                        duplicate_counts[f"{collection_id}_{canonical}"] = count
+                    return live, duplicate_counts
+                finally:
+                    session.close()
+
+            live, duplicate_counts = await asyncio.to_thread(lookup)
+            records = [r for r in records if r["id"] in live]
+
+        if records:
+            if building["dimension"] is None:
+                self._set_dimension(building, len(records[0]["embedding"]))
+            await asyncio.to_thread(
+                self._building_collection.upsert,
+                ids=[f"{r['collection_id']}_{r['file_id']}" for r in records],
+                embeddings=[r["embedding"] for r in records],
+                documents=[f"{r['name']} {(r['extracted_text'] or '')[:500]}" for r in records],
+                metadatas=[
+                    _record_metadata(
+                        r, {r["file_id"]: duplicate_counts.get(f"{r['collection_id']}_{r['file_id']}", 0)}, building
+                    )
+                    for r in records
+                ],
+            )
+
+        building["done"] += len(records)
+        if failed is not None:
+            building["failed"] = failed
+        await asyncio.to_thread(self._update_index_row, name, done=building["done"], failed=building["failed"])
+        return dict(building)
+
+    async def complete_migration(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Cut over to the building index `name`: one transaction retires the active
+        index and activates the new one, searches switch with it, and the old
+        vectors and neighbor graphs (built from them) are dropped afterwards.
+        """
+        await self._connect()
+        building = self._building
+        if not building or building["name"] != name:
+            return None
+        old = self._index
+        now = datetime.utcnow()
+
+        def activate():
+            session = get_session()
+            try:
+                session.query(VectorIndex).filter(VectorIndex.name == old["name"]).update({"state": "retired"})
+                session.query(VectorIndex).filter(VectorIndex.name == name).update(
+                    {"state": "active", "activated_at": now}
+                )
+                session.commit()
+            finally:
+                session.close()
+
+        await asyncio.to_thread(activate)
+
+        old_collection = self._collection
+        building.update(state="active", activated_at=now.isoformat())
+        self._index, self._collection = building, self._building_collection
+        self._building, self._building_collection = None, None
+        self._migration_owner = None
+        old["state"] = "retired"
+
+        self._graphs.clear()
+        if os.path.isdir(settings.NEIGHBOR_GRAPH_DIR):
+            for entry in os.listdir(settings.NEIGHBOR_GRAPH_DIR):
+                if entry.endswith(".npz"):
+                    os.unlink(os.path.join(settings.NEIGHBOR_GRAPH_DIR, entry))
+        try:
+            await asyncio.to_thread(self.chroma_client.delete_collection, old_collection.name)
+        except Exception as e:
+            log.warning("vector_index.retire_failed", index=old["name"], error=str(e))
+
+        log.info("vector_index.activated", index=name, space=building["embedding_space"],
+                 previous=old["embedding_space"], files=building["done"], failed=building["failed"])
+        return dict(building)
+
+    async def cancel_migration(self) -> Optional[Dict[str, Any]]:
+        """Abandon the index being built and drop its vectors; the active index is untouched"""
+        await self._connect()
+        building = self._building
+        if not building:
+            return None
+        self._building, self._migration_owner = None, None
+        await asyncio.to_thread(self._update_index_row, building["name"], state="cancelled")
+        building_collection, self._building_collection = self._building_collection, None
+        try:
+            await asyncio.to_thread(self.chroma_client.delete_collection, building_collection.name)
+        except Exception as e:
+            log.warning("vector_index.drop_failed", index=building["name"], error=str(e))
+        building["state"] = "cancelled"
+        log.info("vector_index.migration_cancelled", index=building["name"], space=building["embedding_space"])
+        return building
@@ -0,0 +1,256 @@
+"""
+Analyze Pipeline - Bounded-memory embed → persist → place flow behind /api/analyze
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import uuid
+
+from config import settings
+from core.dedupe import DuplicateDetector
+from core.filetable import FileTable, RunningStats
+from core.metrics import stage_timer, FILES_PROCESSED
+from core.log import get_logger
+from core.prompt import SamplePool
+from core.responses import compact_structure
+from core.taxonomy import TaxonomyPlacer
+from core.thinker import StructureMapper, drop_empty, map_files_offloaded, structure_skeleton
+from core.workers import should_offload
+
+log = get_logger("pipeline")
+
+# What the stored organized structure keeps of each placed file besides id and name
+STORED_FIELDS = ("path", "type", "size", "duplicate_of")
+_ENTRY_FIELDS = ("id", "name") + STORED_FIELDS
+
+
+async def iter_list(files: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the files of an in-memory list, dropping the list's reference to each one as it goes"""
+    for i in range(len(files)):
+        file, files[i] = files[i], None
+        yield file
+
+
+class AnalyzePipeline:
+    """
+    Organizes a stream of files without holding all of them:
+
+    1. Files flow through embedding and are persisted PIPELINE_CHUNK_SIZE at a
+       time (file rows plus vectors, see FileOrganizer.stage_files) through a
+       queue of PIPELINE_QUEUE_DEPTH chunks, so embedding never waits on the
+       database and at most a few chunks are in memory. Only running statistics
+       and a bounded sample pool are kept for the organization prompt.
+    2. The LLM designs the structure from those. While it streams, the first
+       page of stored files is matched by name against each category as it
+       completes.
+    3. The stored files are read back page by page (names and types only),
+       placed, and their rows and vector metadata updated.
+
+    With a taxonomy template (TaxonomyPlacer) steps 2 and 3 are skipped: each
+    chunk is placed against the template by vector similarity before it is
+    persisted, and the LLM is never called.
+
+    retain_files keeps the processed file dicts (text, embeddings) for responses
+    that return them; otherwise placed files are listed by their metadata.
+    A failed run removes whatever it had staged.
+    """
+
+    def __init__(
+        self,
+        services,
+        organizer,
+        detector: Optional[DuplicateDetector] = None,
+        retain_files: bool = False,
+        taxonomy: Optional[TaxonomyPlacer] = None,
+    ):
+        self.embedding_engine = services.embedding_engine
+        self.thinker = services.ai_thinker
+        self.organizer = organizer
+        self.detector = detector
+        self.retain_files = retain_files
+        self.taxonomy = taxonomy
+        self._organized = structure_skeleton(taxonomy.structure) if taxonomy else None
+        self.collection_id = str(uuid.uuid4())
+        self.stats = RunningStats()
+        self.sample: Optional[SamplePool] = (
+            None if taxonomy else SamplePool(settings.PROMPT_SAMPLE_POOL, settings.PROMPT_PREVIEW_CHARS)
+        )
+        self._files: Dict[str, Dict[str, Any]] = {}  # retained files by id
+
+    async def run(self, files: AsyncIterator[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Organize and save the files. Returns {"collection_id", "organized_structure",
+        "categories", "duplicate_groups"}, or None when no file came through.
+        """
+        try:
+            await self._persist(files)
+            if not self.stats.total_files:
+                await self._discard()
+                return None
+
+            duplicate_counts = self._duplicate_counts()
+            if self.taxonomy:
+                organized = drop_empty(self._organized)
+                if duplicate_counts:
+                    await self.organizer.set_duplicate_counts(self.collection_id, duplicate_counts)
+            else:
+                structure, first_page, mapper = await self._plan()
+                self.sample = None
+                organized = await self._place(structure, duplicate_counts, first_page, mapper)
+            if self.retain_files and self.detector and self.detector.groups:
+                # Duplicates were skipped by the embedding stage; give them their canonical's vector
+                DuplicateDetector.share_embeddings(list(self._files.values()))
+
+            duplicate_groups = self.detector.groups if self.detector else []
+            await self.organizer.finish_collection(
+                self.collection_id,
+                self.stats.total_files,
+                compact_structure(organized, STORED_FIELDS),
+                duplicate_groups,
+            )
+        except BaseException:
+            await self._discard()
+            raise
+
+        return {
+            "collection_id": self.collection_id,
+            "organized_structure": organized,
+            "categories": list(organized.keys()),
+            "duplicate_groups": duplicate_groups,
+        }
+
+    async def _persist(self, files: AsyncIterator[Dict[str, Any]]):
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_DEPTH)
+
+        async def produce():
+            # Errors travel through the queue so the consumer never waits on a dead producer
+            try:
+                chunk: List[Dict[str, Any]] = []
+                async for batch in self.embedding_engine.iter_embedded(files):
+                    chunk.extend(batch)
+                    if len(chunk) >= settings.PIPELINE_CHUNK_SIZE:
+                        await chunks.put(chunk)
+                        chunk = []
+                if chunk:
+                    await chunks.put(chunk)
+                await chunks.put(None)
+            except Exception as e:
+                await chunks.put(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                self.stats.add(FileTable.from_files(chunk))
+                if self.taxonomy:
+                    self._place_by_taxonomy(chunk)
+                for file in chunk:
+                    if self.sample is not None:
+                        self.sample.add(file)
+                    if self.retain_files:
+                        self._files[file["id"]] = file
+                await self.organizer.stage_files(self.collection_id, chunk, self.embedding_engine.space)
+                log.debug("pipeline.persisted", collection_id=self.collection_id, files=self.stats.total_files,
+                          sampled=True)
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    def _duplicate_counts(self) -> Dict[str, int]:
+        return {
+            group["canonical"]: len(group["members"]) - 1 for group in (self.detector.groups if self.detector else [])
+        }
+
+    async def _fallback_structure(self) -> Optional[Dict[str, Any]]:
+        """Structure of the TAXONOMY_FALLBACK_ID template, used when the model gives none"""
+        if not settings.TAXONOMY_FALLBACK_ID:
+            return None
+        template = await self.organizer.get_taxonomy(settings.TAXONOMY_FALLBACK_ID)
+        if template is None:
+            log.warning("pipeline.fallback_taxonomy_missing", taxonomy_id=settings.TAXONOMY_FALLBACK_ID)
+            return None
+        return template["structure"]
+
+    def _place_by_taxonomy(self, chunk: List[Dict[str, Any]]):
+        """Place a chunk against the template; stage_files stores the files as placed"""
+        with stage_timer("mapping"):
+            paths = self.taxonomy.place(chunk)
+            for file, (category, subcategory, folder) in zip(chunk, paths):
+                file["category"], file["subcategory"], file["folder"] = category, subcategory, folder
+                entry = file if self.retain_files else {key: file.get(key) for key in _ENTRY_FIELDS}
+                self._organized[category][subcategory][folder].append(entry)
+        FILES_PROCESSED.labels("mapping").inc(len(chunk))
+
+    async def _plan(self) -> Tuple[Dict[str, Any], Dict[str, Any], Optional[StructureMapper]]:
+        """
+        Structure from the LLM, with the first page of stored files already
+        matched by name against each category as it streams in. Returns the
+        structure, that page and its mapper; the mapper is None when the
+        structure is not the streamed one (generation failed midway and a
+        fallback was used), so the page is mapped afresh.
+        """
+        first_page = await self.organizer.staged_records(self.collection_id, 0, settings.PIPELINE_CHUNK_SIZE)
+        mapper = StructureMapper(first_page["records"])
+        streamed: List[Tuple[str, Any]] = []
+
+        def on_category(category: str, subcategories: Any):
+            streamed.append((category, subcategories))
+            mapper.add_category(category, subcategories)
+
+        structure = await self.thinker.plan_structure(
+            self.sample.files(), self.stats, await self._fallback_structure(), on_category
+        )
+        if list(structure.items())[: len(streamed)] != streamed:
+            mapper = None
+        return structure, first_page, mapper
+
+    async def _place(
+        self,
+        structure: Dict[str, Any],
+        duplicate_counts: Dict[str, int],
+        page: Dict[str, Any],
+        mapper: Optional[StructureMapper] = None,
+    ) -> Dict[str, Any]:
+        """
+        Place the stored files page by page, starting from `page`; returns the
+        organized structure. `mapper` holds that page with categories already added.
+        """
+        organized = structure_skeleton(structure)
+        while page["records"]:
+            records = page["records"]
+            with stage_timer("mapping"):
+                if mapper is not None:
+                    mapped = mapper.finish(structure)
+                elif should_offload(len(records)):
+                    mapped = await map_files_offloaded(records, structure)
+                else:
+                    mapped = StructureMapper(records).finish(structure)
+            mapper = None
+            FILES_PROCESSED.labels("mapping").inc(len(records))
+
+            placements = []
+            for category, subcategories in mapped.items():
+                for subcategory, folders in subcategories.items():
+                    for folder, placed in folders.items():
+                        target = organized[category][subcategory][folder]
+                        for record in placed:
+                            placements.append([record["row"], record["id"], category, subcategory, folder])
+                            if self.retain_files:
+                                target.append(self._files.get(record["id"], record))
+                            else:
+                                target.append({key: record[key] for key in _ENTRY_FIELDS})
+            await self.organizer.place_files(self.collection_id, placements, duplicate_counts)
+            page = await self.organizer.staged_records(
+                self.collection_id, page["last_id"], settings.PIPELINE_CHUNK_SIZE
+            )
+
+        return drop_empty(organized)
+
+    async def _discard(self):
+        try:
+            await self.organizer.discard_collection(self.collection_id)
+        except Exception as e:
+            log.error("pipeline.discard_failed", collection_id=self.collection_id, error=str(e))
@@ -0,0 +1,236 @@
+"""
+Prompt Builder - Compact, token-budgeted file samples for the organization prompt
+"""
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple, Union
+import heapq
+import math
+import random
+import re
+
+import numpy as np
+
+from core.filetable import FileTable, RunningStats
+from core.scanner import FileScanner
+
+# Rough characters per token for mixed English/path text; errs towards overestimating
+CHARS_PER_TOKEN = 3.5
+# Random hyperplanes for embedding clusters (2**bits clusters) and the seed drawing them
+CLUSTER_BITS = 4
+_SEED = 42
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count estimate, without a model-specific tokenizer"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _clean(text: str, limit: int) -> str:
+    """One line, no column separators, at most `limit` characters"""
+    text = _WHITESPACE.sub(" ", text).replace("|", "/").strip()
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def encode_stats(table: Union[FileTable, RunningStats], top_n: int) -> str:
+    """Collection statistics as a few compact lines instead of indented JSON"""
+    summary = table.summary()
+    categories = sorted(summary["categories"].items(), key=lambda item: -item[1])
+    extensions = table.top_extensions(top_n)
+    lines = [
+        f"files={summary['total_files']} total_size={summary['total_size']}B",
+        "categories: " + ", ".join(f"{name} {count}" for name, count in categories),
+        "top extensions: " + ", ".join(f"{e['extension']} {e['count']}" for e in extensions),
+    ]
+    others = len(table.extensions) - len(extensions)
+    if others > 0:
+        lines[-1] += f" (+{others} more)"
+    return "\n".join(lines)
+
+
+def encode_file(file: Dict[str, Any], preview_chars: int) -> str:
+    """One sample line: path (or name) | type | text preview"""
+    parts = [_clean(file.get("path") or file["name"], 120), _clean(file.get("type") or "", 12)]
+    if file.get("extractedText") and preview_chars > 0:
+        parts.append(_clean(file["extractedText"], preview_chars))
+    return " | ".join(parts)
+
+
+def _path_prefix(file: Dict[str, Any]) -> str:
+    path = file.get("path") or ""
+    head, sep, _ = path.strip("/").partition("/")
+    return head.lower() if sep else ""
+
+
+def embedding_clusters(files: List[Dict[str, Any]], bits: int = CLUSTER_BITS) -> Optional[List[int]]:
+    """
+    Coarse cluster per file from the signs of its embedding's projections onto
+    `bits` fixed random hyperplanes (similar vectors tend to share a cluster).
+    None unless every file has an embedding of the same dimension.
+    """
+    vectors = [file.get("embedding") for file in files]
+    if not vectors or any(v is None or len(v) == 0 for v in vectors):
+        return None
+    dimension = len(vectors[0])
+    if any(len(v) != dimension for v in vectors):
+        return None
+    planes = np.random.default_rng(_SEED).standard_normal((dimension, bits)).astype(np.float32)
+    signs = np.asarray(vectors, dtype=np.float32) @ planes > 0
+    return (signs @ (1 << np.arange(bits))).tolist()
+
+
+def candidate_pool(files: List[Dict[str, Any]], table: FileTable, size: int) -> List[int]:
+    """
+    Indices of at most ~`size` canonical files to sample from: an evenly spaced
+    subset of the collection plus the first file of every extension/path-prefix
+    group, so small groups are never lost in a huge collection.
+    """
+    canonical = [i for i, file in enumerate(files) if not file.get("duplicate_of")]
+    if len(canonical) <= size:
+        return canonical
+    step = len(canonical) / size
+    pool = {canonical[int(k * step)] for k in range(size)}
+    seen = set()
+    for i in canonical:
+        key = (int(table.ext_codes[i]), _path_prefix(files[i]))
+        if key not in seen:
+            seen.add(key)
+            pool.add(i)
+    return sorted(pool)
+
+
+class SamplePool:
+    """
+    Streaming counterpart of candidate_pool for files that are not kept: a seeded
+    reservoir of `size` canonical files plus the first file of every
+    extension/path-prefix group (at most `size` groups). Files are held as slim
+    copies (text cut to what a sample line shows, embedding as float32), so the
+    pool stays small however many files pass through.
+    """
+
+    def __init__(self, size: int, preview_chars: int):
+        self.size = size
+        self.preview_chars = preview_chars
+        self.seen = 0
+        self._reservoir: List[Tuple[int, Dict[str, Any]]] = []
+        self._firsts: Dict[Tuple[str, str], Tuple[int, Dict[str, Any]]] = {}
+        self._rng = random.Random(_SEED)
+
+    def _slim(self, file: Dict[str, Any]) -> Dict[str, Any]:
+        embedding = file.get("embedding")
+        return {
+            "name": file["name"],
+            "path": file.get("path") or "",
+            "type": file.get("type") or "",
+            "size": file.get("size") or 0,
+            # Whitespace is collapsed when the line is encoded; keep some slack for it
+            "extractedText": (file.get("extractedText") or "")[: self.preview_chars * 4],
+            "embedding": np.asarray(embedding, dtype=np.float32) if embedding else None,
+        }
+
+    def add(self, file: Dict[str, Any]):
+        if file.get("duplicate_of"):
+            return
+        order = self.seen
+        self.seen += 1
+        group = (FileScanner.get_extension(file["name"]), _path_prefix(file))
+        if group not in self._firsts and len(self._firsts) < self.size:
+            self._firsts[group] = (order, self._slim(file))
+        elif len(self._reservoir) < self.size:
+            self._reservoir.append((order, self._slim(file)))
+        else:
+            slot = self._rng.randrange(order + 1)
+            if slot < self.size:
+                self._reservoir[slot] = (order, self._slim(file))
+
+    def files(self) -> List[Dict[str, Any]]:
+        """Pooled files in arrival order"""
+        return [file for _, file in sorted([*self._reservoir, *self._firsts.values()], key=lambda item: item[0])]
+
+
+def stratified_sample(strata: List[Tuple[Hashable, ...]]) -> Iterator[int]:
+    """
+    Yield item indices so that every prefix covers the strata as evenly as
+    possible. Each item is described by a tuple of attributes (e.g. category,
+    extension, path prefix, embedding cluster); the next pick is always from the
+    group whose attribute values are least represented so far, weighted by the
+    group's share of the items. Greedy with lazy re-scoring: scores only ever
+    decrease as coverage grows.
+    """
+    groups: Dict[Tuple[Hashable, ...], List[int]] = {}
+    for i, key in enumerate(strata):
+        groups.setdefault(key, []).append(i)
+    if not groups:
+        return
+    rng = random.Random(_SEED)
+    for members in groups.values():
+        rng.shuffle(members)  # spread picks over the group instead of taking the first files
+
+    total = len(strata)
+    dimensions = len(next(iter(groups)))
+    covered: List[Dict[Hashable, int]] = [{} for _ in range(dimensions)]
+    taken: Dict[Tuple[Hashable, ...], int] = {key: 0 for key in groups}
+
+    def score(key: Tuple[Hashable, ...]) -> float:
+        novelty = sum(1.0 / (1 + covered[d].get(value, 0)) for d, value in enumerate(key))
+        return novelty + len(groups[key]) / total / (1 + taken[key])
+
+    heap = [(-score(key), n, key) for n, key in enumerate(groups)]
+    heapq.heapify(heap)
+    while heap:
+        _, n, key = heapq.heappop(heap)
+        current = -score(key)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, n, key))  # stale score, re-queue
+            continue
+        yield groups[key][taken[key]]
+        taken[key] += 1
+        for d, value in enumerate(key):
+            covered[d][value] = covered[d].get(value, 0) + 1
+        if taken[key] < len(groups[key]):
+            heapq.heappush(heap, (-score(key), n, key))
+
+
+def build_sample(
+    files: List[Dict[str, Any]],
+    table: FileTable,
+    budget: int,
+    preview_chars: int,
+    pool_size: int,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Sample lines filling at most `budget` estimated tokens, stratified across
+    extension category, extension, top-level folder and embedding cluster
+    (when the files carry embeddings). Returns (lines, sampling info for logs).
+    """
+    pool = candidate_pool(files, table, pool_size)
+    pooled = [files[i] for i in pool]
+    clusters = embedding_clusters(pooled)
+    strata = [
+        (
+            table.category(i),
+            int(table.ext_codes[i]),
+            _path_prefix(files[i]),
+            clusters[n] if clusters is not None else 0,
+        )
+        for n, i in enumerate(pool)
+    ]
+
+    lines: List[str] = []
+    used = 0
+    for n in stratified_sample(strata):
+        line = encode_file(pooled[n], preview_chars)
+        cost = estimate_tokens(line) + 1  # newline
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+
+    info = {
+        "sample_files": len(lines),
+        "pool": len(pool),
+        "strata": len(set(strata)),
+        "clusters": clusters is not None,
+        "sample_tokens": used,
+    }
+    return lines, info
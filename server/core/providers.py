@@ -0,0 +1,203 @@
+"""
+Provider Registry - Shared pooled model clients and atomic provider hot-swap
+"""
+from typing import Dict, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import threading
+
+from config import settings
+from core.log import get_logger
+from core.startup import STARTUP
+
+log = get_logger("providers")
+
+
+def http_limits():
+    """
+    Connection pool sized for the embedding fan-out: keep-alive slots match the
+    connection cap so a batch's connections are reused by the next batch instead
+    of being closed and reopened.
+    """
+    import httpx
+
+    return httpx.Limits(
+        max_connections=settings.PROVIDER_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.PROVIDER_MAX_CONNECTIONS,
+        keepalive_expiry=settings.PROVIDER_KEEPALIVE_EXPIRY,
+    )
+
+
+def request_timeout(read: float):
+    """Per-call timeout: `read` for the model, short connect, generous pool wait"""
+    import httpx
+
+    return httpx.Timeout(
+        read,
+        connect=settings.PROVIDER_CONNECT_TIMEOUT,
+        pool=settings.PROVIDER_POOL_TIMEOUT,
+    )
+
+
+class ProviderSet:
+    """
+    One generation of model services (embedding engine + thinker).
+    Requests lease the set they started with; a swap waits for those leases to end.
+    """
+
+    def __init__(self, provider: str, embedding_engine, ai_thinker):
+        self.provider = provider
+        self.embedding_engine = embedding_engine
+        self.ai_thinker = ai_thinker
+        self.inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def http_clients(self):
+        """Pooled HTTP clients this set's services send requests through"""
+        for service in (self.embedding_engine, self.ai_thinker):
+            yield from getattr(service.client, "clients", ())
+
+    def acquire(self):
+        self.inflight += 1
+        self._idle.clear()
+
+    def release(self):
+        self.inflight -= 1
+        if self.inflight <= 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait until no request is using this set; False if it timed out"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class ProviderRegistry:
+    """
+    Owns the HTTP clients shared by every model service, keyed by base URL, the
+    ProviderRouter over them, and the current ProviderSet. Swapping providers installs the new set atomically,
+    drains requests still holding the old one, then closes clients nobody uses.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, object] = {}
+        self._current: Optional[ProviderSet] = None
+        self._retiring: Dict[ProviderSet, asyncio.Task] = {}
+        self._router = None
+        self._build_lock = threading.Lock()
+
+    def http_client(self, base_url: str):
+        """Shared pooled AsyncClient for a base URL"""
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            import httpx
+
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                limits=http_limits(),
+                timeout=request_timeout(settings.PROVIDER_READ_TIMEOUT),
+            )
+            self._clients[base_url] = client
+            log.info("providers.client_created", base_url=base_url,
+                     max_connections=settings.PROVIDER_MAX_CONNECTIONS)
+        return client
+
+    def router(self):
+        """Router over the primary Ollama server and its replicas; breakers and latency stats persist across swaps"""
+        from core.routing import ProviderRouter
+
+        urls = [settings.OLLAMA_BASE_URL, *settings.OLLAMA_REPLICA_URLS]
+        if self._router is None or any(client.is_closed for client in self._router.clients):
+            self._router = ProviderRouter([self.http_client(url) for url in urls])
+        return self._router
+
+    def _build(self) -> ProviderSet:
+        from core.embeddings import EmbeddingEngine
+        from core.thinker import AIThinker
+
+        provider = settings.AI_PROVIDER.lower()
+        router = self.router() if provider == "ollama" else None
+        return ProviderSet(
+            provider,
+            EmbeddingEngine(router=router),
+            AIThinker(router=router),
+        )
+
+    def start(self):
+        """Build the first ProviderSet (imports provider SDKs); safe to call from a worker thread"""
+        with self._build_lock:
+            if self._current is None:
+                with STARTUP.component("providers"):
+                    self._current = self._build()
+
+    @property
+    def current(self) -> ProviderSet:
+        """The current ProviderSet; builds it if needed, so off the event loop only until start() ran"""
+        if self._current is None:
+            self.start()
+        return self._current
+
+    @asynccontextmanager
+    async def lease(self):
+        """Pin the current ProviderSet for the duration of a request"""
+        if self._current is None:
+            # Build on a worker thread: the pre-warm may hold the build lock while it imports SDKs
+            await asyncio.to_thread(self.start)
+        services = self._current
+        services.acquire()
+        try:
+            yield services
+        finally:
+            services.release()
+
+    async def swap(self) -> ProviderSet:
+        """
+        Rebuild services from current settings (on a worker thread, like start()).
+        New requests get the new set immediately; the old one is retired in the
+        background once drained.
+        """
+        old = await asyncio.to_thread(self._replace)
+        log.info("providers.swapped", provider=self._current.provider,
+                 previous=old.provider if old else None)
+        if old is not None:
+            self._retiring[old] = asyncio.create_task(self._retire(old))
+        return self._current
+
+    def _replace(self) -> Optional[ProviderSet]:
+        with self._build_lock:
+            old = self._current
+            self._current = self._build()
+        return old
+
+    async def _retire(self, old: ProviderSet):
+        drained = await old.drain(settings.PROVIDER_DRAIN_TIMEOUT)
+        if not drained:
+            log.warning("providers.drain_timeout", provider=old.provider, inflight=old.inflight)
+        self._retiring.pop(old, None)
+        await self._close_unused()
+
+    async def _close_unused(self):
+        in_use = set()
+        for services in [self._current, *self._retiring]:
+            if services is not None:
+                in_use.update(id(client) for client in services.http_clients())
+        for base_url, client in list(self._clients.items()):
+            if id(client) not in in_use:
+                del self._clients[base_url]
+                await client.aclose()
+                log.info("providers.client_closed", base_url=base_url)
+
+    async def aclose(self):
+        """Shutdown: let in-flight requests finish, then close every client"""
+        if self._current is not None:
+            await self._current.drain(settings.PROVIDER_DRAIN_TIMEOUT)
+        if self._retiring:
+            await asyncio.gather(*self._retiring.values(), return_exceptions=True)
+        self._current = None
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
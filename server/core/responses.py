@@ -0,0 +1,118 @@
+"""
+Responses - Fast JSON serialization, compact collection views and negotiated compression
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+import asyncio
+import gzip
+import importlib.util
+
+import orjson
+from fastapi import Response
+
+from config import settings
+from core.metrics import stage_timer
+
+# Always present in compact views; the rest are opt-in via `fields`
+COMPACT_FIELDS = ("id", "name")
+OPTIONAL_FIELDS = ("path", "type", "size", "extractedText", "duplicate_of", "embedding")
+
+# Server preference when the client rates several encodings equally
+_PREFERENCE = ("br", "zstd", "gzip")
+# Optional package providing each coding besides gzip
+_MODULES = {"br": "brotli", "zstd": "zstandard"}
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Comma-separated opt-in fields; raises ValueError on unknown names"""
+    if not fields:
+        return ()
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in OPTIONAL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(unknown)} (available: {', '.join(OPTIONAL_FIELDS)})")
+    return requested
+
+
+def compact_structure(structure: Dict[str, Any], fields: Iterable[str] = ()) -> Dict[str, Any]:
+    """Organized structure with each file reduced to its id, name and the requested fields"""
+    keys = COMPACT_FIELDS + tuple(fields)
+    return {
+        category: {
+            subcategory: {
+                folder: [{key: file.get(key) for key in keys} for file in placed]
+                for folder, placed in folders.items()
+            }
+            for subcategory, folders in subcategories.items()
+        }
+        for category, subcategories in structure.items()
+    }
+
+
+def _available(encoding: str) -> bool:
+    if encoding == "gzip":
+        return True
+    module = _MODULES.get(encoding)
+    return module is not None and importlib.util.find_spec(module) is not None
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Best content coding for an Accept-Encoding header, or None for identity:
+    highest q-value first, then br > zstd > gzip; q=0 excludes a coding and
+    "*" stands for any coding not listed. br/zstd need the brotli/zstandard packages.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    wildcard = weights.get("*")
+    candidates = []
+    for rank, encoding in enumerate(_PREFERENCE):
+        q = weights.get(encoding, wildcard)
+        if q and q > 0 and _available(encoding):
+            candidates.append((-q, rank, encoding))
+    return min(candidates)[2] if candidates else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=settings.RESPONSE_ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+async def json_response(payload: Any, accept_encoding: Optional[str] = None, status_code: int = 200) -> Response:
+    """
+    JSON response serialized with orjson (no response_model validation pass),
+    compressed with the client's preferred coding once it reaches
+    RESPONSE_COMPRESSION_MIN_BYTES. Compression runs on a worker thread.
+    """
+    with stage_timer("serialize"):
+        body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding:
+            with stage_timer("compress"):
+                body = await asyncio.to_thread(compress, body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
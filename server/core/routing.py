@@ -0,0 +1,328 @@
+"""
+Provider Routing - Hedged requests, jittered retries and circuit-broken failover across endpoints
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+from collections import deque
+import asyncio
+import json
+import random
+import time
+
+from config import settings
+from core.admission import PriorityGate
+from core.metrics import PROVIDER_HEDGES, PROVIDER_HEDGE_WINS, PROVIDER_RETRIES, CIRCUIT_OPEN
+from core.log import get_logger
+
+log = get_logger("routing")
+
+# Successful calls observed before the hedge delay is trusted
+MIN_LATENCY_SAMPLES = 20
+
+
+class ProviderUnavailable(Exception):
+    """Every endpoint's circuit is open"""
+
+
+class RetryableStatus(Exception):
+    """Endpoint answered 429/5xx"""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f"{url} returned {status_code}")
+        self.status_code = status_code
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transport errors, timeouts and overloaded/broken endpoints are worth another try"""
+    import httpx
+
+    return isinstance(error, (httpx.TransportError, RetryableStatus, ProviderUnavailable))
+
+
+class LatencyWindow:
+    """Recent successful call latencies; the quantile is recomputed every few samples"""
+
+    def __init__(self, size: int = 256, refresh: int = 16):
+        self._samples = deque(maxlen=size)
+        self._refresh = refresh
+        self._since_refresh = 0
+        self._cache: Dict[float, float] = {}
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self._since_refresh += 1
+        if self._since_refresh >= self._refresh:
+            self._cache.clear()
+            self._since_refresh = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._samples) < MIN_LATENCY_SAMPLES:
+            return None
+        value = self._cache.get(q)
+        if value is None:
+            ordered = sorted(self._samples)
+            value = self._cache[q] = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return value
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout`, letting a single probe through;
+    the probe's outcome closes or re-opens the circuit. A probe ending without
+    an outcome (cancelled, or a 4xx that says nothing about the endpoint's
+    health) must call release_probe() so the next call can probe again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    @property
+    def probing(self) -> bool:
+        return self.state == self.HALF_OPEN and self._probing
+
+    def release_probe(self):
+        self._probing = False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            log.info("routing.circuit_closed", endpoint=self.name)
+            CIRCUIT_OPEN.labels(self.name).set(0)
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            CIRCUIT_OPEN.labels(self.name).set(1)
+            log.warning("routing.circuit_open", endpoint=self.name, failures=self.failures)
+
+
+class Endpoint:
+    """One replica: its pooled client and circuit breaker"""
+
+    def __init__(self, client):
+        self.client = client
+        self.name = str(client.base_url)
+        self.breaker = CircuitBreaker(
+            self.name, settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_TIMEOUT
+        )
+
+
+class ProviderRouter:
+    """
+    Sends a JSON POST to one of several equivalent endpoints (Ollama replicas serving
+    the same models, so embeddings stay in one vector space):
+    - failover: endpoints are tried in configured order, skipping open circuits;
+      a failed call moves on to the next endpoint immediately.
+    - hedging: if the call is still running after the operation's recent p95
+      latency, a duplicate goes to the next healthy endpoint (the same one when
+      there is no other) and the first answer wins. Hedges are capped at ROUTER_HEDGE_BUDGET
+      of requests so a slow provider is not hit with double load.
+    - retries: when every endpoint failed, the whole round is retried with
+      full-jitter exponential backoff.
+    - priority: at most PROVIDER_MAX_CONNECTIONS calls run at once; when they
+      queue, interactive requests (search, similar files) go before bulk ingestion.
+    """
+
+    def __init__(self, clients: List[Any], owns_clients: bool = False):
+        self.endpoints = [Endpoint(client) for client in clients]
+        self.gate = PriorityGate(settings.PROVIDER_MAX_CONNECTIONS)
+        self._owns_clients = owns_clients
+        self._latency: Dict[str, LatencyWindow] = {}
+        self._requests = 0
+        self._hedges = 0
+
+    @classmethod
+    def from_urls(cls, urls: List[str]) -> "ProviderRouter":
+        """Standalone router owning its own pooled clients"""
+        import httpx
+        from core.providers import http_limits
+
+        return cls([httpx.AsyncClient(base_url=url, limits=http_limits()) for url in urls], owns_clients=True)
+
+    @property
+    def clients(self) -> List[Any]:
+        return [endpoint.client for endpoint in self.endpoints]
+
+    async def aclose(self):
+        if self._owns_clients:
+            for client in self.clients:
+                await client.aclose()
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        if not settings.ROUTER_HEDGE_ENABLED:
+            return None
+        window = self._latency.get(operation)
+        p = window.quantile(settings.ROUTER_HEDGE_QUANTILE) if window else None
+        return None if p is None else max(p, settings.ROUTER_HEDGE_MIN_DELAY)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(settings.ROUTER_BACKOFF_MAX, settings.ROUTER_BACKOFF_BASE * 2 ** attempt))
+
+    async def post_json(self, operation: str, path: str, payload: Dict[str, Any], timeout=None) -> Dict[str, Any]:
+        """POST `payload` and return the decoded JSON answer of whichever endpoint answered first"""
+        self._requests += 1
+        async with self.gate.slot():
+            for attempt in range(settings.ROUTER_MAX_RETRIES + 1):
+                try:
+                    return await self._round(operation, path, payload, timeout)
+                except Exception as e:
+                    if attempt == settings.ROUTER_MAX_RETRIES or not is_retryable(e):
+                        raise
+                    PROVIDER_RETRIES.labels(operation).inc()
+                    delay = self._backoff(attempt)
+                    log.debug("routing.retry", operation=operation, attempt=attempt + 1,
+                              delay=round(delay, 3), error=str(e), sampled=True)
+                    await asyncio.sleep(delay)
+
+    async def stream_json_lines(
+        self, operation: str, path: str, payload: Dict[str, Any], timeout=None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        POST and yield each line of an NDJSON streamed answer.
+        Failover and retries only apply until the first line arrives; a stream is
+        never hedged. Closing the iterator early closes the connection, which makes
+        Ollama stop generating.
+        """
+        self._requests += 1
+        async with self.gate.slot():
+            last_error: Optional[BaseException] = None
+            for attempt in range(settings.ROUTER_MAX_RETRIES + 1):
+                for endpoint in self.endpoints:
+                    if not endpoint.breaker.allow():
+                        continue
+                    probe = endpoint.breaker.probing
+                    started = False
+                    try:
+                        async with endpoint.client.stream("POST", path, json=payload, timeout=timeout) as response:
+                            if response.status_code == 429 or response.status_code >= 500:
+                                raise RetryableStatus(response.status_code, endpoint.name)
+                            if response.status_code >= 400:
+                                await response.aread()
+                                response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.strip():
+                                    continue
+                                if not started:
+                                    started = True
+                                    endpoint.breaker.record_success()
+                                yield json.loads(line)
+                        return
+                    except Exception as e:
+                        if not is_retryable(e):
+                            raise
+                        endpoint.breaker.record_failure()
+                        if started:
+                            raise
+                        last_error = e
+                    finally:
+                        if probe:
+                            endpoint.breaker.release_probe()
+                if attempt < settings.ROUTER_MAX_RETRIES:
+                    PROVIDER_RETRIES.labels(operation).inc()
+                    await asyncio.sleep(self._backoff(attempt))
+            raise last_error or ProviderUnavailable(f"no healthy endpoint for {operation}")
+
+    async def _round(self, operation, path, payload, timeout) -> Dict[str, Any]:
+        """One pass over the endpoints: primary, failover on error, hedge on straggling"""
+        candidates = iter(self.endpoints)
+        tasks: Dict[asyncio.Task, Endpoint] = {}
+        hedge_delay = self.hedge_delay(operation)
+        hedged = False
+        hedges = set()
+        last_error: Optional[BaseException] = None
+
+        def launch(endpoint: Optional[Endpoint] = None) -> bool:
+            probe = False
+            if endpoint is None:
+                endpoint = next((e for e in candidates if e.breaker.allow()), None)
+                if endpoint is None:
+                    return False
+                probe = endpoint.breaker.probing
+            task = asyncio.ensure_future(self._send(endpoint, operation, path, payload, timeout, probe))
+            tasks[task] = endpoint
+            return True
+
+        if not launch():
+            raise ProviderUnavailable(f"no healthy endpoint for {operation}")
+
+        try:
+            while tasks:
+                wait = hedge_delay if not hedged else None
+                done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    if self._hedges < settings.ROUTER_HEDGE_BUDGET * self._requests:
+                        # Next healthy replica, or the straggler's own endpoint when none is left
+                        if launch() or launch(next(iter(tasks.values()))):
+                            hedges.add(list(tasks)[-1])
+                            self._hedges += 1
+                            PROVIDER_HEDGES.labels(operation).inc()
+                    continue
+                for task in done:
+                    tasks.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if task in hedges:
+                            PROVIDER_HEDGE_WINS.labels(operation).inc()
+                        return task.result()
+                    last_error = error
+                    if not is_retryable(error):
+                        raise error
+                if not tasks and not launch():
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise last_error or ProviderUnavailable(f"no healthy endpoint for {operation}")
+
+    async def _send(
+        self, endpoint: Endpoint, operation, path, payload, timeout, probe: bool = False
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            response = await endpoint.client.post(path, json=payload, timeout=timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise RetryableStatus(response.status_code, endpoint.name)
+            response.raise_for_status()
+            data = response.json()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                endpoint.breaker.record_failure()
+            raise
+        finally:
+            # Cancelled (lost hedge, client gone) or a 4xx: no verdict, let the next call probe
+            if probe:
+                endpoint.breaker.release_probe()
+        endpoint.breaker.record_success()
+        self._latency.setdefault(operation, LatencyWindow()).observe(time.perf_counter() - start)
+        return data
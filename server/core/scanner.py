@@ -2,7 +2,6 @@
 File Scanner - Analyzes and categorizes files by type
 """
 from typing import List, Dict, Any
-from pathlib import Path
 
 
 class FileScanner:
@@ -51,34 +50,27 @@ class FileScanner:
         "executables": ["exe", "dmg", "app", "deb", "rpm"],
     }
 
+    # Precomputed extension -> category lookup
+    EXTENSION_CATEGORY = {
+        ext: category for category, extensions in CATEGORIES.items() for ext in extensions
+    }
+
+    @staticmethod
+    def get_extension(filename: str) -> str:
+        """Lowercase extension without the dot (same rules as Path.suffix)"""
+        dot = filename.rfind(".")
+        if dot <= 0 or dot == len(filename) - 1 or filename[dot - 1] in "/\\":
+            return ""
+        return filename[dot + 1 :].lower()
+
     @staticmethod
     def get_file_category(filename: str) -> str:
         """Determine file category based on extension"""
-        ext = Path(filename).suffix.lstrip(".").lower()
-
-        for category, extensions in FileScanner.CATEGORIES.items():
-            if ext in extensions:
-                return category
-
-        return "other"
+        return FileScanner.EXTENSION_CATEGORY.get(FileScanner.get_extension(filename), "other")
 
     @staticmethod
     def analyze_files(files: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze file collection and return statistics"""
-        stats = {
-            "total_files": len(files),
-            "total_size": sum(f.get("size", 0) for f in files),
-            "categories": {},
-            "extensions": {},
-        }
-
-        for file in files:
-            # Category
-            category = FileScanner.get_file_category(file["name"])
-            stats["categories"][category] = stats["categories"].get(category, 0) + 1
-
-            # Extension
-            ext = Path(file["name"]).suffix.lstrip(".").lower() or "no_extension"
-            stats["extensions"][ext] = stats["extensions"].get(ext, 0) + 1
+        from core.filetable import FileTable
 
-        return stats
+        return FileTable.from_files(files).summary()
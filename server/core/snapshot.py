@@ -0,0 +1,271 @@
+"""
+Collection Snapshot - Compact binary export/import of one collection
+
+Layout of a snapshot file:
+    b"LUMSNAP" + format version byte
+    u64 little-endian header length, then a JSON header
+    zero padding up to ALIGN, then the data section: every buffer starts on an
+    ALIGN boundary, with the float32 embedding matrix last
+
+The header describes the collection (with its duplicate groups and their
+exact/near kind), one entry per file column and the organized structure with
+each file replaced by its row number. Columns are stored as flat arrays:
+integers as int64, repeated strings (type, category, subcategory, folder) as
+int32 codes into a value list kept in the header, free text as one UTF-8 blob
+plus int64 offsets, and duplicate_of as the row of the canonical file. Embeddings are one contiguous (rows, dim) float32 matrix
+plus the row of the file each vector belongs to, so a loaded snapshot hands
+out zero-copy views of the memory-mapped file instead of parsing anything.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import mmap
+import struct
+
+import numpy as np
+
+MAGIC = b"LUMSNAP"
+VERSION = 1
+ALIGN = 64
+_LENGTH = struct.Struct("<Q")
+
+# (record field, file dict key, encoding) in column order
+COLUMNS: List[Tuple[str, str, str]] = [
+    ("file_id", "id", "str"),
+    ("name", "name", "str"),
+    ("path", "path", "str"),
+    ("type", "type", "dict"),
+    ("size", "size", "int"),
+    ("extracted_text", "extractedText", "str"),
+    ("category", "category", "dict"),
+    ("subcategory", "subcategory", "dict"),
+    ("folder", "folder", "dict"),
+    ("duplicate_of", "duplicate_of", "ref"),
+]
+
+
+class SnapshotError(Exception):
+    """The snapshot file is malformed or cannot be restored"""
+
+
+def _padding(offset: int) -> int:
+    return -offset % ALIGN
+
+
+class SnapshotWriter:
+    """
+    Builds a snapshot from file records (dicts keyed by FileRecord field names),
+    the collection metadata and the organized structure, then writes it in one pass.
+    """
+
+    def __init__(self, collection: Dict[str, Any], records: List[Dict[str, Any]]):
+        self.collection = collection
+        self.records = records
+        self.rows = {record["file_id"]: i for i, record in enumerate(records)}
+        self._buffers: List[np.ndarray] = []
+        self._size = 0
+        self._columns: Dict[str, Dict[str, Any]] = {}
+        self._structure: Dict[str, Any] = {}
+        self._embeddings: Optional[Dict[str, Any]] = None
+
+    def _add_buffer(self, array: np.ndarray) -> Dict[str, Any]:
+        array = np.ascontiguousarray(array)
+        self._size += _padding(self._size)
+        ref = {"offset": self._size, "dtype": array.dtype.str, "shape": list(array.shape)}
+        self._buffers.append(array)
+        self._size += array.nbytes
+        return ref
+
+    def add_columns(self):
+        for field, _, kind in COLUMNS:
+            values = [record.get(field) for record in self.records]
+            if kind == "int":
+                column = {"data": self._add_buffer(np.array([v or 0 for v in values], dtype="<i8"))}
+            elif kind == "dict":
+                codes: Dict[str, int] = {}
+                encoded = np.array(
+                    [-1 if v is None else codes.setdefault(v, len(codes)) for v in values], dtype="<i4"
+                )
+                column = {"codes": self._add_buffer(encoded), "values": list(codes)}
+            elif kind == "ref":
+                encoded = np.array([self.rows.get(v, -1) if v else -1 for v in values], dtype="<i4")
+                column = {"rows": self._add_buffer(encoded)}
+            else:
+                encoded_values = [(v or "").encode("utf-8") for v in values]
+                offsets = np.zeros(len(values) + 1, dtype="<i8")
+                np.cumsum([len(v) for v in encoded_values], out=offsets[1:])
+                column = {
+                    "offsets": self._add_buffer(offsets),
+                    "data": self._add_buffer(np.frombuffer(b"".join(encoded_values), dtype=np.uint8)),
+                }
+                nulls = [v is None for v in values]
+                if any(nulls):
+                    column["nulls"] = self._add_buffer(np.packbits(np.array(nulls, dtype=bool)))
+            column["kind"] = kind
+            self._columns[field] = column
+
+    def set_structure(self, structure: Dict[str, Any]):
+        """Organized structure with each placed file replaced by its row"""
+        self._structure = {
+            category: {
+                subcategory: {
+                    folder: [self.rows[f["id"]] for f in placed if f.get("id") in self.rows]
+                    for folder, placed in folders.items()
+                }
+                for subcategory, folders in subcategories.items()
+            }
+            for category, subcategories in structure.items()
+        }
+
+    def set_embeddings(self, file_ids: List[str], vectors: np.ndarray):
+        """Vectors of the files that have one (duplicates share their canonical's)"""
+        if not file_ids:
+            return
+        vectors = np.asarray(vectors, dtype="<f4")
+        if vectors.ndim != 2 or vectors.shape[0] != len(file_ids):
+            raise SnapshotError(f"expected {len(file_ids)} embeddings, got shape {vectors.shape}")
+        rows = self._add_buffer(np.array([self.rows[i] for i in file_ids], dtype="<i4"))
+        self._embeddings = {"rows": rows, "dim": int(vectors.shape[1])}
+        # Added last so the matrix is the tail of the file
+        self._embeddings["matrix"] = self._add_buffer(vectors)
+
+    def write(self, path: str) -> int:
+        """Write the snapshot; returns its size in bytes"""
+        header = json.dumps({
+            "version": VERSION,
+            "collection": self.collection,
+            "rows": len(self.records),
+            "columns": self._columns,
+            "structure": self._structure,
+            "embeddings": self._embeddings,
+        }, separators=(",", ":")).encode("utf-8")
+        preamble = len(MAGIC) + 1 + _LENGTH.size + len(header)
+        with open(path, "wb") as f:
+            f.write(MAGIC + bytes([VERSION]))
+            f.write(_LENGTH.pack(len(header)))
+            f.write(header)
+            f.write(b"\0" * _padding(preamble))
+            written = 0
+            for array in self._buffers:
+                f.write(b"\0" * _padding(written))
+                written += _padding(written)
+                f.write(memoryview(array).cast("B"))
+                written += array.nbytes
+            return f.tell()
+
+
+class Snapshot:
+    """
+    A snapshot file opened read-only through mmap. Column and embedding
+    accessors return NumPy views of the mapping; only the header is parsed.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:  # empty file
+            self._file.close()
+            raise SnapshotError(f"not a snapshot: {e}")
+        try:
+            self._load_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _load_header(self):
+        prefix = len(MAGIC) + 1
+        if len(self._mmap) < prefix + _LENGTH.size or self._mmap[: len(MAGIC)] != MAGIC:
+            raise SnapshotError("not a snapshot (bad magic)")
+        if self._mmap[len(MAGIC)] != VERSION:
+            raise SnapshotError(f"unsupported snapshot version {self._mmap[len(MAGIC)]}")
+        (length,) = _LENGTH.unpack_from(self._mmap, prefix)
+        start = prefix + _LENGTH.size
+        try:
+            self.header = json.loads(self._mmap[start : start + length])
+        except ValueError as e:
+            raise SnapshotError(f"corrupt snapshot header: {e}")
+        preamble = start + length
+        self._data_start = preamble + _padding(preamble)
+        self.collection: Dict[str, Any] = self.header["collection"]
+        self.rows: int = self.header["rows"]
+
+    def _view(self, ref: Dict[str, Any]) -> np.ndarray:
+        dtype = np.dtype(ref["dtype"])
+        shape = tuple(ref["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        offset = self._data_start + ref["offset"]
+        if offset + count * dtype.itemsize > len(self._mmap):
+            raise SnapshotError("snapshot is truncated")
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    def validate(self):
+        """Check that every buffer the header points at lies inside the file"""
+        refs = [ref for column in self.header["columns"].values() for ref in column.values() if isinstance(ref, dict)]
+        if self.header.get("embeddings"):
+            refs += [self.header["embeddings"]["rows"], self.header["embeddings"]["matrix"]]
+        for ref in refs:
+            self._view(ref)
+
+    def column(self, field: str) -> List[Any]:
+        """Decoded values of one column"""
+        column = self.header["columns"][field]
+        kind = column["kind"]
+        if kind == "int":
+            return self._view(column["data"]).tolist()
+        if kind == "dict":
+            values = column["values"]
+            return [values[code] if code >= 0 else None for code in self._view(column["codes"]).tolist()]
+        if kind == "ref":
+            ids = self.column("file_id")
+            return [ids[row] if row >= 0 else None for row in self._view(column["rows"]).tolist()]
+        offsets = self._view(column["offsets"]).tolist()
+        data = self._view(column["data"]).tobytes()
+        values = [data[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(self.rows)]
+        if "nulls" in column:
+            nulls = np.unpackbits(self._view(column["nulls"]), count=self.rows).astype(bool)
+            values = [None if null else value for value, null in zip(values, nulls.tolist())]
+        return values
+
+    def records(self) -> List[Dict[str, Any]]:
+        """One dict per file keyed by FileRecord field names"""
+        columns = {field: self.column(field) for field, _, _ in COLUMNS}
+        return [{field: columns[field][i] for field in columns} for i in range(self.rows)]
+
+    def files(self, records: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """The same rows as file dicts, in the shape the analyze pipeline uses"""
+        records = records if records is not None else self.records()
+        return [{key: record[field] for field, key, _ in COLUMNS} for record in records]
+
+    def structure(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            category: {
+                subcategory: {folder: [files[row] for row in placed] for folder, placed in folders.items()}
+                for subcategory, folders in subcategories.items()
+            }
+            for category, subcategories in self.header["structure"].items()
+        }
+
+    @property
+    def embedding_rows(self) -> np.ndarray:
+        meta = self.header.get("embeddings")
+        return self._view(meta["rows"]) if meta else np.empty(0, dtype="<i4")
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """(vectors, dim) float32 view of the memory-mapped matrix"""
+        meta = self.header.get("embeddings")
+        return self._view(meta["matrix"]) if meta else np.empty((0, 0), dtype="<f4")
+
+    def close(self):
+        # Views handed out keep the mapping alive; it is unmapped once they are gone
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,87 @@
+"""
+Startup Report - Per-component initialization timings and background pre-warm
+"""
+from typing import Any, Callable, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import time
+
+from core.metrics import STARTUP_SECONDS
+from core.log import get_logger
+
+log = get_logger("startup")
+
+# "startup" until the app is serving, then "prewarm" inside pre-warm tasks, else "first_use"
+_phase: ContextVar[Optional[str]] = ContextVar("startup_phase", default=None)
+
+
+class StartupReport:
+    """
+    Records how long each component took to initialize and when: during startup,
+    in the background pre-warm, or lazily on the first request that needed it.
+    """
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.ready_seconds: Optional[float] = None
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.prewarm_done = False
+
+    @property
+    def phase(self) -> str:
+        return _phase.get() or ("startup" if self.ready_seconds is None else "first_use")
+
+    @contextmanager
+    def component(self, name: str):
+        """Time one component's initialization (only the first one is recorded)"""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, error)
+
+    def record(self, name: str, seconds: float, error: Optional[str] = None):
+        if name in self.components:
+            return
+        self.components[name] = {"seconds": round(seconds, 4), "phase": self.phase}
+        if error:
+            self.components[name]["error"] = error
+        STARTUP_SECONDS.labels(name).set(seconds)
+        log.info("startup.component", component=name, seconds=round(seconds, 4), phase=self.phase)
+
+    def ready(self):
+        """The app is about to serve requests"""
+        self.ready_seconds = time.perf_counter() - self.created
+        STARTUP_SECONDS.labels("total").set(self.ready_seconds)
+        log.info("startup.complete", seconds=round(self.ready_seconds, 4),
+                 components=lambda: {k: v["seconds"] for k, v in self.components.items()})
+
+    async def prewarm(self, steps: List[Callable[[], Any]]):
+        """Run blocking initializers one by one on a worker thread"""
+        token = _phase.set("prewarm")
+        try:
+            for step in steps:
+                try:
+                    await asyncio.to_thread(step)
+                except Exception as e:
+                    log.warning("startup.prewarm_failed", step=getattr(step, "__name__", str(step)), error=str(e))
+            self.prewarm_done = True
+            log.info("startup.prewarm_complete",
+                     seconds=round(time.perf_counter() - self.created - (self.ready_seconds or 0), 4))
+        finally:
+            _phase.reset(token)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready_seconds": round(self.ready_seconds, 4) if self.ready_seconds is not None else None,
+            "prewarm_done": self.prewarm_done,
+            "components": self.components,
+        }
+
+
+STARTUP = StartupReport()
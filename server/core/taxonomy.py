@@ -0,0 +1,139 @@
+"""
+Taxonomy Templates - Reusable category structures placed against by folder-path embeddings
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+
+import numpy as np
+
+from core.embeddings import EmbeddingEngine
+from core.log import get_logger
+from core.thinker import StructureMapper
+
+log = get_logger("taxonomy")
+
+
+def normalize_structure(structure: Any) -> Dict[str, Dict[str, List[str]]]:
+    """
+    { Category: { Subcategory: [folders] } } from either that form or an
+    organized structure (folders mapping to placed files, as stored with a
+    collection). Raises ValueError when it is neither or holds no folder.
+    """
+    if not isinstance(structure, dict):
+        raise ValueError("structure must map categories to subcategories")
+    normalized: Dict[str, Dict[str, List[str]]] = {}
+    for category, subcategories in structure.items():
+        if not isinstance(subcategories, dict):
+            raise ValueError(f"Category '{category}' must map subcategories to folders")
+        for subcategory, folders in subcategories.items():
+            if not isinstance(folders, (dict, list)):
+                raise ValueError(f"Subcategory '{category}/{subcategory}' must list its folders")
+            names = [str(folder).strip() for folder in folders if str(folder).strip()]
+            if names:
+                normalized.setdefault(str(category), {})[str(subcategory)] = list(dict.fromkeys(names))
+    if not normalized:
+        raise ValueError("structure has no folders")
+    return normalized
+
+
+def folder_paths(structure: Dict[str, Dict[str, List[str]]]) -> List[Tuple[str, str, str]]:
+    """(category, subcategory, folder) of every folder, in structure order"""
+    return [
+        (category, subcategory, folder)
+        for category, subcategories in structure.items()
+        for subcategory, folders in subcategories.items()
+        for folder in folders
+    ]
+
+
+async def embed_folder_paths(
+    engine: EmbeddingEngine, structure: Dict[str, Dict[str, List[str]]]
+) -> Optional[List[List[float]]]:
+    """One vector per folder path ("Category / Subcategory / Folder"); None if any failed"""
+    vectors = await asyncio.gather(*(
+        engine.generate_embedding(" / ".join(path)) for path in folder_paths(structure)
+    ))
+    if not all(vectors) or len({len(v) for v in vectors}) != 1:
+        log.warning("taxonomy.embedding_failed", folders=len(vectors), embedded=sum(1 for v in vectors if v))
+        return None
+    return [list(map(float, v)) for v in vectors]
+
+
+class TaxonomyPlacer:
+    """
+    Places files into a fixed structure without the LLM: each file goes to the
+    folder whose path embedding is most similar to its own (cosine, one matrix
+    product per chunk). Duplicates follow their canonical file; files without a
+    usable vector (embedding failed, other dimension, or no folder vectors at
+    all) are placed by name and type as the LLM path's StructureMapper does.
+    """
+
+    def __init__(self, structure: Dict[str, Dict[str, List[str]]], vectors: Optional[List[List[float]]] = None):
+        self.structure = structure
+        self.paths = folder_paths(structure)
+        self._matrix: Optional[np.ndarray] = None
+        if vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            self._matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self._placed: Dict[str, int] = {}  # canonical file id -> folder index
+
+    @property
+    def uses_vectors(self) -> bool:
+        return self._matrix is not None
+
+    def place(self, files: List[Dict[str, Any]]) -> List[Tuple[str, str, str]]:
+        """(category, subcategory, folder) for each file, in order"""
+        slots: List[Optional[int]] = [None] * len(files)
+        canonicals = [i for i, file in enumerate(files) if not file.get("duplicate_of")]
+
+        embedded = [i for i in canonicals if self._usable(files[i].get("embedding"))]
+        if embedded:
+            vectors = np.asarray([files[i]["embedding"] for i in embedded], dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            for i, slot in zip(embedded, (vectors @ self._matrix.T).argmax(axis=1).tolist()):
+                slots[i] = slot
+        self._place_by_name(files, [i for i in canonicals if slots[i] is None], slots)
+        for i in canonicals:
+            self._placed[files[i]["id"]] = slots[i]
+
+        # Duplicates follow their canonical (placed in this chunk or an earlier one)
+        orphans = []
+        for i, file in enumerate(files):
+            if slots[i] is None:
+                slot = self._placed.get(file["duplicate_of"])
+                if slot is None:
+                    orphans.append(i)
+                slots[i] = slot
+        self._place_by_name(files, orphans, slots)
+        return [self.paths[slot] for slot in slots]
+
+    def _usable(self, embedding: Any) -> bool:
+        return self._matrix is not None and embedding is not None and len(embedding) == self._matrix.shape[1]
+
+    def _place_by_name(self, files: List[Dict[str, Any]], indices: List[int], slots: List[Optional[int]]):
+        if not indices:
+            return
+        index = {path: n for n, path in enumerate(self.paths)}
+        mapper = StructureMapper([{"name": files[i]["name"], "type": files[i]["type"], "i": i} for i in indices])
+        for category, subcategories in mapper.finish(self.structure).items():
+            for subcategory, folders in subcategories.items():
+                for folder, placed in folders.items():
+                    for file in placed:
+                        slots[file["i"]] = index[(category, subcategory, folder)]
+
+
+async def load_placer(organizer, taxonomy_id: str, engine: EmbeddingEngine) -> Optional[TaxonomyPlacer]:
+    """
+    Placer for a stored template, None if it does not exist. Folder vectors
+    missing or from another embedding model than `engine` are recomputed and
+    stored first; if that fails, files are placed by name and type.
+    """
+    template = await organizer.get_taxonomy(taxonomy_id, with_vectors=True)
+    if template is None:
+        return None
+    vectors = template["folder_vectors"]
+    if not vectors or template["embedding_space"] != engine.space:
+        vectors = await embed_folder_paths(engine, template["structure"])
+        if vectors:
+            await organizer.set_taxonomy_vectors(taxonomy_id, vectors, engine.space)
+    return TaxonomyPlacer(template["structure"], vectors)
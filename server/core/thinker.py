@@ -1,108 +1,147 @@
 """
 AI Thinker - The brain that creates perfect organization
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 import json
+import time
 from config import settings
-from core.scanner import FileScanner
+from core.filetable import FileTable, RunningStats
+from core.metrics import stage_timer, provider_call, FALLBACKS, PROMPT_TOKENS
+from core.log import get_logger
+from core.providers import request_timeout
+from core.routing import ProviderRouter
+from core.jsonstream import StructureStreamParser
+from core.prompt import build_sample, encode_stats, estimate_tokens
+from core.workers import run_cpu
+
+log = get_logger("thinker")
 
 
 class AIThinker:
     """Uses LLM to create intelligent file organization"""
 
-    def __init__(self):
+    def __init__(self, router=None):
+        """
+        router: shared ProviderRouter (pooled clients to every Ollama replica) from
+        the ProviderRegistry. Without one the engine creates and owns its own,
+        closed by `aclose()`.
+        """
         self.provider = settings.AI_PROVIDER.lower()
         self.client = None
         self.model = None
+        self._owns_client = False
 
         if self.provider == "ollama":
             # Ollama setup
             try:
-                import httpx
-                self.client = httpx.AsyncClient(base_url=settings.OLLAMA_BASE_URL)
+                if router is None:
+                    router = ProviderRouter.from_urls([settings.OLLAMA_BASE_URL, *settings.OLLAMA_REPLICA_URLS])
+                    self._owns_client = True
+                self.client = router
                 self.model = settings.OLLAMA_MODEL
-                print(f"✅ Ollama LLM client initialized: {self.model}")
+                log.info("thinker.client_ready", provider="ollama", model=self.model)
             except Exception as e:
-                print(f"Warning: Ollama not available: {e}")
+                log.warning("thinker.provider_unavailable", provider="ollama", error=str(e))
         
         elif self.provider == "gemini":
             # Gemini setup
             try:
                 import google.generativeai as genai
                 if not settings.GEMINI_API_KEY:
-                    print("⚠️ Warning: GEMINI_API_KEY not set")
+                    log.warning("thinker.missing_api_key", provider="gemini")
                 else:
                     genai.configure(api_key=settings.GEMINI_API_KEY)
                     self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
                     self.client = genai
-                    print(f"✅ Gemini LLM client initialized: {settings.GEMINI_MODEL}")
+                    log.info("thinker.client_ready", provider="gemini", model=settings.GEMINI_MODEL)
             except Exception as e:
-                print(f"Warning: Gemini not available: {e}")
+                log.warning("thinker.provider_unavailable", provider="gemini", error=str(e))
         
         else:
-            print(f"⚠️ Unknown AI provider: {self.provider}. Using Ollama as default.")
+            log.warning("thinker.unknown_provider", provider=self.provider, fallback="ollama")
             self.provider = "ollama"
 
-    async def organize_files(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def aclose(self):
+        """Close the router's clients if this instance created them"""
+        if self._owns_client and self.client is not None:
+            await self.client.aclose()
+
+    async def plan_structure(
+        self,
+        sample: List[Dict[str, Any]],
+        stats: RunningStats,
+        fallback: Optional[Dict[str, Any]] = None,
+        on_category: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
         """
-        Use AI to create perfect organization structure
-        Returns: { Category: { Subcategory: { Folder: [files] } } }
+        Category structure ({ Category: { Subcategory: [folders] } }) for a
+        collection known only by its running statistics and a pool of sampled
+        files (see core.pipeline). When the model gives none: `fallback` (a
+        taxonomy template's structure), else the rule-based structure. Files are
+        placed against it separately; with streaming, `on_category` receives each
+        category of the model's structure as soon as it is complete.
         """
-        print(f"🧠 AI Thinker analyzing {len(files)} files...")
-
-        # Analyze file collection
-        stats = FileScanner.analyze_files(files)
-
-        # Create file summary for AI (reduced for speed)
-        file_summaries = []
-        for file in files[:100]:  # Reduced from 500 to 100 for faster AI processing
-            summary = {
-                "name": file["name"],
-                "type": file["type"],
-                "category": FileScanner.get_file_category(file["name"]),
-                "has_text": bool(file.get("extractedText")),
-            }
-            if file.get("extractedText"):
-                summary["preview"] = file["extractedText"][:100]  # Reduced from 200
-            file_summaries.append(summary)
-
-        # Build prompt for LLM
-        prompt = self._build_organization_prompt(file_summaries, stats)
-
-        # Get AI response
-        # Get AI response
+        log.info("thinker.start", files=len(stats), sample_files=len(sample))
+        with stage_timer("prompt"):
+            prompt = self._build_organization_prompt(sample, FileTable.from_files(sample), stats)
+
         structure = {}
         if self.client:
-            print("🤖 Sending request to AI model...")
-            structure = await self._get_ai_organization(prompt)
+            log.debug("thinker.llm_request", provider=self.provider, prompt_chars=len(prompt))
+            with stage_timer("llm"):
+                structure = await self._get_ai_organization(prompt, on_category)
             if structure:
-                print(f"🤖 AI Response Structure: {json.dumps(structure, indent=2)}")
+                log.debug("thinker.llm_structure", structure=structure)
             else:
-                print("⚠️ AI returned empty structure, using fallback...")
-        
-        if not structure:
-            print("⚠️ Using fallback rule-based organization...")
-            structure = self._fallback_organization(files)
-
-        # Map files to structure
-        organized = self._map_files_to_structure(files, structure)
-        print(f"📦 Final Organized Structure: {json.dumps(organized, indent=2)}")
+                log.warning("thinker.empty_structure", provider=self.provider)
 
-        return organized
+        if not structure and fallback:
+            log.info("thinker.fallback_taxonomy")
+            FALLBACKS.labels("taxonomy_organization").inc()
+            structure = fallback
+        if not structure:
+            log.info("thinker.fallback_organization")
+            FALLBACKS.labels("rule_based_organization").inc()
+            structure = self._fallback_organization(sample)
+        return structure
 
     def _build_organization_prompt(
-        self, file_summaries: List[Dict], stats: Dict
+        self, files: List[Dict[str, Any]], table: FileTable, collection_stats: Optional[RunningStats] = None
     ) -> str:
-        """Build prompt for AI organization"""
+        """
+        Build prompt for AI organization within PROMPT_TOKEN_BUDGET (estimated):
+        the instructions and statistics are fixed, the rest of the budget is filled
+        with one line per sampled file, stratified across the collection.
+        `collection_stats` describes the whole collection when `files` is only a sample of it.
+        """
+        source = collection_stats if collection_stats is not None else table
+        total_files = len(source)
+        stats = encode_stats(source, settings.PROMPT_TOP_EXTENSIONS)
+        fixed = estimate_tokens(self._organization_prompt(total_files, stats, ""))
+        lines, info = build_sample(
+            files,
+            table,
+            budget=max(0, settings.PROMPT_TOKEN_BUDGET - fixed),
+            preview_chars=settings.PROMPT_PREVIEW_CHARS,
+            pool_size=settings.PROMPT_SAMPLE_POOL,
+        )
+        prompt = self._organization_prompt(total_files, stats, "\n".join(lines))
+        tokens = estimate_tokens(prompt)
+        PROMPT_TOKENS.observe(tokens)
+        log.info("thinker.prompt", tokens=tokens, budget=settings.PROMPT_TOKEN_BUDGET, **info)
+        return prompt
+
+    @staticmethod
+    def _organization_prompt(total_files: int, stats: str, sample: str) -> str:
         return f"""You are LUMINA, an AI that creates perfect file organization.
 
-Analyze these {stats['total_files']} files and create a beautiful, intuitive 3-level folder structure.
+Analyze these {total_files} files and create a beautiful, intuitive 3-level folder structure.
 
 File Statistics:
-{json.dumps(stats, indent=2)}
+{stats}
 
-Sample Files (first 30):
-{json.dumps(file_summaries[:30], indent=2)}
+Sample Files (path | type | text preview), spread across the whole collection:
+{sample}
 
 Your task:
 1. Create 3-7 main categories (e.g., "Work", "Personal", "Creative", "Finance", "Education")
@@ -133,39 +172,46 @@ Return ONLY valid JSON in this exact format:
 
 Be creative and thoughtful. Make it beautiful."""
 
-    async def _get_ai_organization(self, prompt: str) -> Dict[str, Any]:
+    async def _get_ai_organization(
+        self, prompt: str, on_category: Optional[Callable[[str, Any], None]] = None
+    ) -> Dict[str, Any]:
         """Get organization structure from AI"""
         try:
+            if self.provider == "ollama" and settings.LLM_STREAMING:
+                return await self._stream_ai_organization(prompt, on_category)
+
             if self.provider == "ollama":
                 # Ollama - optimized for speed
-                response = await self.client.post(
-                    "/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "format": "json",
-                        "options": {
-                            "num_predict": 1000,
-                            "temperature": 0.7,
-                            "top_k": 40,
-                            "top_p": 0.9,
-                        }
-                    },
-                    timeout=60.0,
-                )
-                data = response.json()
+                with provider_call("ollama", "generate"):
+                    data = await self.client.post_json(
+                        "generate",
+                        "/api/generate",
+                        {
+                            "model": self.model,
+                            "prompt": prompt,
+                            "stream": False,
+                            "format": "json",
+                            "options": {
+                                "num_predict": settings.LLM_TOKEN_BUDGET,
+                                "temperature": 0.7,
+                                "top_k": 40,
+                                "top_p": 0.9,
+                            }
+                        },
+                        timeout=request_timeout(60.0),
+                    )
                 content = data.get("response", "{}")
             
             elif self.provider == "gemini":
                 # Gemini API
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config={
-                        "temperature": 0.7,
-                        "max_output_tokens": 1000,
-                    }
-                )
+                with provider_call("gemini", "generate"):
+                    response = self.model.generate_content(
+                        prompt,
+                        generation_config={
+                            "temperature": 0.7,
+                            "max_output_tokens": settings.LLM_TOKEN_BUDGET,
+                        }
+                    )
                 content = response.text
             
             else:
@@ -182,16 +228,78 @@ Be creative and thoughtful. Make it beautiful."""
                     result = json.loads(content)
                     return result.get("structure", {})
                 else:
-                    print("❌ No JSON object found in response")
+                    log.warning("thinker.no_json", response_chars=len(content))
                     return {}
             except json.JSONDecodeError as e:
-                print(f"❌ JSON Decode Error: {e}")
+                log.warning("thinker.json_decode_error", error=str(e))
                 return {}
 
         except Exception as e:
-            print(f"Error getting AI organization: {e}")
+            log.error("thinker.llm_failed", provider=self.provider, error=str(e))
             return {}
 
+    async def _stream_ai_organization(
+        self, prompt: str, on_category: Optional[Callable[[str, Any], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Stream tokens from Ollama and hand each category to `on_category` as soon as
+        it is complete. Generation is cut off once the structure object closes
+        (trailing "rules" and junk are never generated) or LLM_TOKEN_BUDGET is
+        spent, in which case the categories completed so far are used.
+        """
+        parser = StructureStreamParser()
+        tokens = 0
+        first_category = None
+        stop_reason = "end_of_stream"
+        start = time.perf_counter()
+        stream = self.client.stream_json_lines(
+            "generate",
+            "/api/generate",
+            {
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True,
+                "format": "json",
+                "options": {
+                    "num_predict": settings.LLM_TOKEN_BUDGET,
+                    "temperature": 0.7,
+                    "top_k": 40,
+                    "top_p": 0.9,
+                }
+            },
+            timeout=request_timeout(60.0),
+        )
+        try:
+            with provider_call("ollama", "generate"):
+                async for chunk in stream:
+                    if "error" in chunk:
+                        log.warning("thinker.stream_error", error=chunk["error"])
+                        break
+                    tokens += 1
+                    for category, subcategories in parser.feed(chunk.get("response", "")):
+                        if first_category is None:
+                            first_category = time.perf_counter() - start
+                        if on_category:
+                            on_category(category, subcategories)
+                    if parser.done:
+                        stop_reason = "structure_closed"
+                        break
+                    if chunk.get("done"):
+                        break
+                    if tokens >= settings.LLM_TOKEN_BUDGET:
+                        stop_reason = "token_budget"
+                        log.warning("thinker.token_budget_exhausted", tokens=tokens,
+                                    categories=len(parser.categories))
+                        break
+        finally:
+            await stream.aclose()
+
+        log.debug("thinker.llm_stream", tokens=tokens, stop=stop_reason, categories=len(parser.categories),
+                  first_category_seconds=round(first_category, 3) if first_category is not None else None)
+        if not parser.categories:
+            log.warning("thinker.no_json", response_chars=len(parser.text))
+        return parser.categories
+
     def _fallback_organization(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Fallback rule-based organization"""
         structure = {
@@ -218,67 +326,82 @@ Be creative and thoughtful. Make it beautiful."""
         }
         return structure
 
-    def _map_files_to_structure(
-        self, files: List[Dict[str, Any]], structure: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Map actual files to the structure"""
-        organized = {}
 
-        # Initialize structure
+class StructureMapper:
+    """
+    Maps files into the structure one category at a time, so placement can start
+    while the LLM is still streaming later categories. The result equals mapping
+    against the complete structure: name matches are tried category by category in
+    order, and the extension heuristics and first-folder fallback only run in
+    `finish()` for files no name matched.
+    """
+
+    def __init__(self, files: List[Dict[str, Any]]):
+        self.organized: Dict[str, Any] = {}
+        self._unplaced = [(file, file["name"].lower()) for file in files]
+
+    def add_category(self, category: str, subcategories: Any):
+        """Initialize one category and place files whose name matches it"""
+        if category in self.organized or not isinstance(subcategories, dict):
+            return
+        self.organized[category] = {}
+        targets = []
+        for subcategory, folders in subcategories.items():
+            self.organized[category][subcategory] = {}
+            for folder in folders:
+                self.organized[category][subcategory][folder] = []
+        for subcategory, folders in self.organized[category].items():
+            for folder, file_list in folders.items():
+                targets.append((file_list, folder.lower(), subcategory.lower(), category.lower()))
+
+        # 1. Try to match based on AI structure names
+        # Check if folder/subcategory/category name is in filename
+        # e.g. "invoice" in "invoice_2024.pdf" -> Finance/Invoices
+        unplaced = []
+        for file, file_name in self._unplaced:
+            for file_list, folder, subcategory, category_name in targets:
+                if folder in file_name or subcategory in file_name or category_name in file_name:
+                    file_list.append(file)
+                    break
+            else:
+                unplaced.append((file, file_name))
+        self._unplaced = unplaced
+
+    def finish(self, structure: Dict[str, Any]) -> Dict[str, Any]:
+        """Add any categories not streamed yet, place the remaining files, drop empty folders"""
         for category, subcategories in structure.items():
-            organized[category] = {}
-            for subcategory, folders in subcategories.items():
-                organized[category][subcategory] = {}
-                for folder in folders:
-                    organized[category][subcategory][folder] = []
-
-        # Smart file mapping
-        for file in files:
-            file_name = file["name"].lower()
+            self.add_category(category, subcategories)
+        organized = self.organized
+
+        for file, file_name in self._unplaced:
             file_ext = file["type"].lower()
             placed = False
 
-            # 1. Try to match based on AI structure names
+            # 2. Not matched by name: try to match based on extension/type
             for category in organized:
                 if placed: break
                 for subcategory in organized[category]:
                     if placed: break
                     for folder in organized[category][subcategory]:
-                        # Check if folder/subcategory/category name is in filename
-                        # e.g. "invoice" in "invoice_2024.pdf" -> Finance/Invoices
-                        if (folder.lower() in file_name or 
-                            subcategory.lower() in file_name or 
-                            category.lower() in file_name):
+                        # Heuristic matching
+                        target = f"{category} {subcategory} {folder}".lower()
+                        
+                        if "code" in target and file_ext in ["js", "ts", "jsx", "tsx", "py", "html", "css"]:
+                            organized[category][subcategory][folder].append(file)
+                            placed = True
+                            break
+                        elif "image" in target and file_ext in ["jpg", "png", "jpeg", "svg"]:
+                            organized[category][subcategory][folder].append(file)
+                            placed = True
+                            break
+                        elif "finance" in target and ("invoice" in file_name or "receipt" in file_name):
+                            organized[category][subcategory][folder].append(file)
+                            placed = True
+                            break
+                        elif "syllabus" in target and "syllabus" in file_name:
                             organized[category][subcategory][folder].append(file)
                             placed = True
                             break
-
-            # 2. If not placed, try to match based on extension/type
-            if not placed:
-                for category in organized:
-                    if placed: break
-                    for subcategory in organized[category]:
-                        if placed: break
-                        for folder in organized[category][subcategory]:
-                            # Heuristic matching
-                            target = f"{category} {subcategory} {folder}".lower()
-                            
-                            if "code" in target and file_ext in ["js", "ts", "jsx", "tsx", "py", "html", "css"]:
-                                organized[category][subcategory][folder].append(file)
-                                placed = True
-                                break
-                            elif "image" in target and file_ext in ["jpg", "png", "jpeg", "svg"]:
-                                organized[category][subcategory][folder].append(file)
-                                placed = True
-                                break
-                            elif "finance" in target and ("invoice" in file_name or "receipt" in file_name):
-                                organized[category][subcategory][folder].append(file)
-                                placed = True
-                                break
-                            elif "syllabus" in target and "syllabus" in file_name:
-                                organized[category][subcategory][folder].append(file)
-                                placed = True
-                                break
 
             # 3. Fallback: Put in first available folder of appropriate category if possible
             if not placed and organized:
@@ -291,22 +414,56 @@ Be creative and thoughtful. Make it beautiful."""
                             first_folder = list(organized[first_cat][first_sub].keys())[0]
                             organized[first_cat][first_sub][first_folder].append(file)
                 except (IndexError, KeyError) as e:
-                    print(f"Error placing file in fallback: {e}")
-
-        # Remove empty folders
-        cleaned = {}
-        for category, subcategories in organized.items():
-            cleaned[category] = {}
-            for subcategory, folders in subcategories.items():
-                cleaned[category][subcategory] = {}
-                for folder, file_list in folders.items():
-                    if file_list:
-                        cleaned[category][subcategory][folder] = file_list
-                # Remove empty subcategories
-                if not cleaned[category][subcategory]:
-                    del cleaned[category][subcategory]
-            # Remove empty categories
-            if not cleaned[category]:
-                del cleaned[category]
-
-        return cleaned
+                    log.warning("thinker.placement_failed", error=str(e))
+
+        return drop_empty(organized)
+
+
+def structure_skeleton(structure: Dict[str, Any]) -> Dict[str, Any]:
+    """{ Category: { Subcategory: { Folder: [] } } } in structure order, as StructureMapper lays it out"""
+    mapper = StructureMapper([])
+    for category, subcategories in structure.items():
+        mapper.add_category(category, subcategories)
+    return mapper.organized
+
+
+def drop_empty(organized: Dict[str, Any]) -> Dict[str, Any]:
+    """Organized structure without empty folders, subcategories and categories"""
+    # Remove empty folders
+    cleaned = {}
+    for category, subcategories in organized.items():
+        cleaned[category] = {}
+        for subcategory, folders in subcategories.items():
+            cleaned[category][subcategory] = {}
+            for folder, file_list in folders.items():
+                if file_list:
+                    cleaned[category][subcategory][folder] = file_list
+            # Remove empty subcategories
+            if not cleaned[category][subcategory]:
+                del cleaned[category][subcategory]
+        # Remove empty categories
+        if not cleaned[category]:
+            del cleaned[category]
+
+    return cleaned
+
+
+def _map_slim_files(slim_files: List[Dict[str, Any]], structure: Dict[str, Any]) -> Dict[str, Any]:
+    """Process pool entry point for map_files_offloaded"""
+    return StructureMapper(slim_files).finish(structure)
+
+
+async def map_files_offloaded(files: List[Dict[str, Any]], structure: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    StructureMapper on a CPU worker process. Only name/type/position are sent
+    (not text or embeddings); the result is rebuilt around the original dicts.
+    """
+    slim_files = [{"name": f["name"], "type": f["type"], "i": i} for i, f in enumerate(files)]
+    organized = await run_cpu(_map_slim_files, slim_files, structure)
+    return {
+        category: {
+            subcategory: {folder: [files[f["i"]] for f in placed] for folder, placed in folders.items()}
+            for subcategory, folders in subcategories.items()
+        }
+        for category, subcategories in organized.items()
+    }
@@ -0,0 +1,53 @@
+"""
+CPU Workers - Process pool for CPU-heavy pipeline stages
+"""
+from typing import Any, Callable, Optional
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import threading
+
+from config import settings
+from core.log import get_logger
+
+log = get_logger("workers")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def should_offload(items: int) -> bool:
+    """Offload only when a pool is configured and the batch outweighs the pickling cost"""
+    return settings.CPU_WORKERS > 0 and items >= settings.CPU_OFFLOAD_MIN_FILES
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process pool created on first use. Spawned, not forked: the parent runs an event loop and threads."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.CPU_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            log.info("workers.pool_started", processes=settings.CPU_WORKERS)
+        return _pool
+
+
+async def run_cpu(fn: Callable[..., Any], *args) -> Any:
+    """
+    Run a picklable module-level function on the process pool, keeping the event
+    loop free. Without a pool (CPU_WORKERS=0) it runs inline.
+    """
+    if settings.CPU_WORKERS <= 0:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), fn, *args)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
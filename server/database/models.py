@@ -1,7 +1,9 @@
 from sqlmodel import SQLModel, Field, create_engine, Session
+from sqlalchemy import Index, inspect, text
 from typing import Optional, Dict, Any
 from datetime import datetime
 import json
+import time
 
 
 class Collection(SQLModel, table=True):
@@ -10,11 +12,17 @@ class Collection(SQLModel, table=True):
     total_files: int
     organized_structure: str  # JSON string
     categories: str  # JSON string (list)
+    duplicate_groups: Optional[str] = None  # JSON string (list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class FileRecord(SQLModel, table=True):
+    # Covering index so per-collection statistics never touch the table rows
+    __table_args__ = (
+        Index("ix_filerecord_stats", "collection_id", "category", "type", "size"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     file_id: str = Field(index=True)
     collection_id: str = Field(index=True)
@@ -26,11 +34,40 @@ class FileRecord(SQLModel, table=True):
     category: Optional[str] = None
     subcategory: Optional[str] = None
     folder: Optional[str] = None
+    duplicate_of: Optional[str] = None  # file_id of the canonical copy
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class VectorIndex(SQLModel, table=True):
+    """A ChromaDB collection holding the vectors of one embedding space"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(index=True, unique=True)  # ChromaDB collection name
+    embedding_space: str  # "<provider>:<model>", see core.embeddings.embedding_space
+    dimension: Optional[int] = None  # Known once the first vector is stored
+    state: str = Field(default="active", index=True)  # active | building | retired | cancelled
+    total: int = 0  # Files to re-embed while building
+    done: int = 0
+    failed: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    activated_at: Optional[datetime] = None
+
+
+class Taxonomy(SQLModel, table=True):
+    """A reusable category structure with the embeddings of its folder paths"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    taxonomy_id: str = Field(index=True, unique=True)
+    name: str
+    structure: str  # JSON string { Category: { Subcategory: [folders] } }
+    source_collection_id: Optional[str] = None  # Collection the structure was taken from
+    embedding_space: Optional[str] = None  # Space of folder_vectors, None until they are computed
+    folder_vectors: Optional[str] = None  # JSON string, one vector per folder path in structure order
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 # Database engine
 engine = None
+_name_index = False
 
 
 def init_db():
@@ -40,8 +77,132 @@ def init_db():
 
     engine = create_engine(settings.DATABASE_URL, echo=False)
     SQLModel.metadata.create_all(engine)
+    _upgrade_schema()
+    _create_name_index()
+    _enable_incremental_vacuum()
+
+
+def _upgrade_schema():
+    """Add nullable columns and indexes introduced after a database was created (create_all never alters tables)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+# FTS5 trigram index over FileRecord name/path (external content: it stores no copy of the text)
+NAME_INDEX = "filerecord_names"
+
+_NAME_INDEX_DDL = (
+    f"""CREATE VIRTUAL TABLE {NAME_INDEX} USING fts5(
+        name, path, collection_id UNINDEXED,
+        content='filerecord', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER {NAME_INDEX}_ai AFTER INSERT ON filerecord BEGIN
+        INSERT INTO {NAME_INDEX}(rowid, name, path, collection_id)
+        VALUES (new.id, new.name, new.path, new.collection_id);
+    END""",
+    f"""CREATE TRIGGER {NAME_INDEX}_ad AFTER DELETE ON filerecord BEGIN
+        INSERT INTO {NAME_INDEX}({NAME_INDEX}, rowid, name, path, collection_id)
+        VALUES ('delete', old.id, old.name, old.path, old.collection_id);
+    END""",
+    f"""CREATE TRIGGER {NAME_INDEX}_au AFTER UPDATE OF name, path, collection_id ON filerecord BEGIN
+        INSERT INTO {NAME_INDEX}({NAME_INDEX}, rowid, name, path, collection_id)
+        VALUES ('delete', old.id, old.name, old.path, old.collection_id);
+        INSERT INTO {NAME_INDEX}(rowid, name, path, collection_id)
+        VALUES (new.id, new.name, new.path, new.collection_id);
+    END""",
+)
+
+
+def _create_name_index():
+    """
+    Create the filename/path index and the triggers keeping it in sync with
+    FileRecord (SQLite with FTS5 trigram support, i.e. 3.34+). An existing
+    database is indexed once, when the index is first created.
+    """
+    global _name_index
+    _name_index = False
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": NAME_INDEX}
+            ).first()
+            if not exists:
+                for statement in _NAME_INDEX_DDL:
+                    conn.execute(text(statement))
+                conn.execute(text(f"INSERT INTO {NAME_INDEX}({NAME_INDEX}) VALUES ('rebuild')"))
+        _name_index = True
+    except Exception as e:
+        # Autocomplete falls back to LIKE scans without it
+        from core.log import get_logger
+
+        get_logger("database").warning("database.name_index_unavailable", error=str(e))
+
+
+def name_index_available() -> bool:
+    """Whether the FTS5 filename/path index exists (set by init_db)"""
+    return _name_index
+
+
+def _enable_incremental_vacuum():
+    """
+    Switch SQLite to incremental auto-vacuum so compact_database can free pages
+    in small steps. An existing database needs one full VACUUM for that, run
+    here before any request is served; instant on a new or converted one.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+                return
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+        # Pooled connections opened before the VACUUM still report the old mode
+        engine.dispose()
+    except Exception as e:
+        # compact_database skips until a later start converts the database
+        from core.log import get_logger
+
+        get_logger("database").warning("database.auto_vacuum_unavailable", error=str(e))
 
 
 def get_session():
     """Get database session"""
     return Session(engine)
+
+
+def compact_database(pages_per_step: int = 1000, pause: float = 0.05) -> Dict[str, Any]:
+    """
+    Give the pages freed by deleted rows back to the filesystem (SQLite only; blocking).
+    Pages are released `pages_per_step` at a time with a pause in between, so
+    each write lock is short and requests keep going. Never runs a full VACUUM:
+    a database init_db could not switch to incremental auto-vacuum is skipped.
+    """
+    if engine is None or engine.dialect.name != "sqlite":
+        return {"mode": "skipped", "freed_pages": 0}
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            return {"mode": "skipped", "freed_pages": 0}
+        free_before = conn.execute(text("PRAGMA freelist_count")).scalar()
+        while conn.execute(text("PRAGMA freelist_count")).scalar():
+            conn.execute(text(f"PRAGMA incremental_vacuum({int(pages_per_step)})"))
+            time.sleep(pause)
+        if name_index_available():
+            # Merge the index's b-trees after the batched deletes
+            conn.execute(text(f"INSERT INTO {NAME_INDEX}({NAME_INDEX}) VALUES ('optimize')"))
+        conn.execute(text("PRAGMA optimize"))
+        freed = free_before - conn.execute(text("PRAGMA freelist_count")).scalar()
+    return {"mode": "incremental", "freed_pages": freed}
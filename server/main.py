@@ -1,35 +1,89 @@
-from fastapi import FastAPI, HTTPException
+from core.startup import STARTUP  # first, so the startup report covers the imports below
+from fastapi import FastAPI, HTTPException, Request, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ValidationError
 from typing import List, Dict, Any, Optional
 import uvicorn
+import asyncio
+import os
+import re
+import tempfile
+import time
 from contextlib import asynccontextmanager
 
 from core.scanner import FileScanner
 from core.extractor import TextExtractor
-from core.embeddings import EmbeddingEngine
-from core.thinker import AIThinker
-from core.organizer import FileOrganizer
+from core.providers import ProviderRegistry, ProviderSet
+from core.organizer import FileOrganizer, EmbeddingSpaceMismatch
+from core.migration import ReembeddingMigration
+from core.exporter import ZipExporter
+from core.ingest import UploadIngest, IngestError, is_streaming_upload
+from core.dedupe import DuplicateDetector
+from core.pipeline import AnalyzePipeline, iter_list
+from core.taxonomy import embed_folder_paths, folder_paths, load_placer, normalize_structure
+from core.snapshot import Snapshot, SnapshotError
+from core.admission import AdmissionController, AdmissionRejected, Ticket
+from core.responses import compact_structure, json_response, parse_fields
+from core.indexservice import RemoteOrganizer
+from core.workers import should_offload
+from core import workers as cpu_workers
+from core.metrics import REGISTRY, MetricsMiddleware, HTTP_REQUEST_BYTES, stage_timer
+from core.log import configure_logging, get_logger
 from database.models import init_db
 from config import settings
 
+configure_logging()
+log = get_logger("api")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize services on startup"""
-    # Initialize database
-    init_db()
-    
-    # Initialize AI services
-    app.state.embedding_engine = EmbeddingEngine()
-    app.state.ai_thinker = AIThinker()
-    app.state.organizer = FileOrganizer()
-    
-    print("LUMINA Backend initialized successfully")
+    """
+    Initialize services on startup. Only the database is set up eagerly; provider
+    SDKs/clients and the vector store are created on first use, or warmed up in
+    the background right after the server starts accepting requests.
+    """
+    STARTUP.record("imports", time.perf_counter() - STARTUP.created)
+
+    # AI services (shared pooled provider clients) and vector store are lazy
+    app.state.providers = ProviderRegistry()
+    app.state.admission = AdmissionController()
+    if settings.INDEX_SERVICE_SOCKET:
+        # Multi-process mode: the index service owns the database and vector store
+        app.state.organizer = RemoteOrganizer(settings.INDEX_SERVICE_SOCKET)
+    else:
+        # Initialize database
+        with STARTUP.component("database"):
+            init_db()
+        app.state.organizer = FileOrganizer()
+        app.state.organizer.schedule_sweep()
+        app.state.organizer.schedule_retention()
+
+    STARTUP.ready()
+    prewarm = None
+    if settings.PREWARM:
+        prewarm = asyncio.create_task(STARTUP.prewarm([
+            app.state.organizer.connect_vector_store,
+            app.state.providers.start,
+        ]))
+    # Re-embeds stored files when the embedding model no longer matches the index
+    app.state.migration = ReembeddingMigration(app.state.organizer, app.state.providers, app.state.admission)
+    if settings.VECTOR_MIGRATION_AUTO:
+        app.state.migration.start()
     yield
     
-    # Cleanup
-    print("LUMINA Backend shutting down")
+    # Cleanup: finish in-flight model calls, then close pooled connections
+    log.info("shutdown")
+    if prewarm and not prewarm.done():
+        prewarm.cancel()
+    await app.state.migration.stop()
+    await app.state.providers.aclose()
+    if isinstance(app.state.organizer, RemoteOrganizer):
+        await app.state.organizer.aclose()
+    cpu_workers.shutdown()
 
 
 app = FastAPI(
@@ -49,6 +103,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Request counters, latency histograms and the optional Server-Timing breakdown
+app.add_middleware(MetricsMiddleware)
+
 
 # Request/Response Models
 class FileItem(BaseModel):
@@ -70,6 +127,13 @@ class AnalyzeResponse(BaseModel):
     organized_structure: Dict[str, Any]
     total_files: int
     categories: List[str]
+    duplicate_groups: List[Dict[str, Any]] = []
+
+
+class TaxonomyRequest(BaseModel):
+    name: str
+    structure: Optional[Dict[str, Any]] = None  # { Category: { Subcategory: [folders] } }
+    collection_id: Optional[str] = None  # ...or take the structure of this collection
 
 
 class SearchRequest(BaseModel):
@@ -83,6 +147,7 @@ class SearchResponse(BaseModel):
 
 class SettingsRequest(BaseModel):
     ai_provider: str
+    embedding_model: Optional[str] = None  # Embedding model of the selected provider
 
 
 class SettingsResponse(BaseModel):
@@ -99,65 +164,322 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request, stage and provider metrics"""
+    if not REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/health")
 async def health_check():
+    # Must not touch lazily initialized services
     return {"status": "healthy", "service": "lumina-api"}
 
 
-@app.post("/api/analyze", response_model=AnalyzeResponse)
-async def analyze_files(request: AnalyzeRequest):
+@app.get("/api/health/startup")
+async def startup_report():
+    """How long each component took to initialize, and whether it happened at startup, in pre-warm or on first use"""
+    return STARTUP.to_dict()
+
+
+# The analyze body is read manually so it can also be streamed; document both shapes
+ANALYZE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "files": {"type": "array", "items": {"$ref": "#/components/schemas/FileItem"}}
+                    },
+                    "required": ["files"],
+                }
+            },
+            "application/x-ndjson": {"schema": {"type": "string", "format": "binary"}},
+            "application/msgpack": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+async def provider_services(request: Request):
+    """Pin the current model services for one request so a provider swap drains it"""
+    async with request.app.state.providers.lease() as services:
+        yield services
+
+
+async def admit_bulk(request: Request):
     """
-    Main endpoint: Analyze files and create organized structure
+    Admission for bulk endpoints, before their body is read: queued while the
+    server is saturated, refused with 429 + Retry-After (or 413 over a cap,
+    400 for a malformed Content-Length)
     """
+    length = request.headers.get("content-length")
+    if length is not None:
+        if not (length.isascii() and length.isdigit()):
+            raise HTTPException(status_code=400, detail="Malformed Content-Length")
+        length = int(length)
     try:
-        if not request.files:
-            raise HTTPException(status_code=400, detail="No files provided")
-
-        # Convert to dict format
-        files_data = [file.model_dump() for file in request.files]
+        async with request.app.state.admission.admit(length) as ticket:
+            yield ticket
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
+
+@app.post("/api/analyze", response_model=AnalyzeResponse, openapi_extra=ANALYZE_REQUEST_BODY)
+async def analyze_files(
+    request: Request,
+    view: Optional[str] = None,
+    fields: Optional[str] = None,
+    taxonomy_id: Optional[str] = None,
+    ticket: Ticket = Depends(admit_bulk),
+    services: ProviderSet = Depends(provider_services),
+):
+    """
+    Main endpoint: Analyze files and create organized structure
 
-        # Step 1: Generate embeddings for files
-        embedding_engine = app.state.embedding_engine
-        files_with_embeddings = await embedding_engine.generate_embeddings(files_data)
+    Accepts either a JSON `AnalyzeRequest` body or a stream of file records as
+    NDJSON (application/x-ndjson) or MessagePack (application/msgpack), optionally
+    gzip/deflate/zstd compressed via Content-Encoding. Streamed records are decoded
+    and embedded as they arrive.
 
-        # Step 2: Use AI to create intelligent organization structure
-        ai_thinker = app.state.ai_thinker
-        organized_structure = await ai_thinker.organize_files(files_with_embeddings)
+    view=compact (default: ANALYZE_RESPONSE_VIEW) returns each placed file as
+    {id, name} plus the comma-separated `fields` requested (path, type, size,
+    extractedText, duplicate_of, embedding); view=full returns the file dicts as
+    processed. The response is gzip/br/zstd compressed per Accept-Encoding.
 
-        # Step 3: Save to database and vector store
-        organizer = app.state.organizer
-        collection_id = await organizer.save_collection(
-            files_with_embeddings, organized_structure
+    taxonomy_id places the files into a saved taxonomy template by similarity to
+    its folder-path embeddings instead of asking the model for a structure.
+    """
+    try:
+        view = view or settings.ANALYZE_RESPONSE_VIEW
+        if view not in ("full", "compact"):
+            raise HTTPException(status_code=400, detail="view must be 'full' or 'compact'")
+        try:
+            extra_fields = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        taxonomy = None
+        if taxonomy_id:
+            taxonomy = await load_placer(app.state.organizer, taxonomy_id, services.embedding_engine)
+            if taxonomy is None:
+                raise HTTPException(status_code=404, detail="Taxonomy not found")
+
+        detector = DuplicateDetector() if settings.DEDUPE_ENABLED else None
+        # The full view (or a compact one with text/vectors) returns processed files, so they are kept
+        retain_files = view == "full" or any(f in ("extractedText", "embedding") for f in extra_fields)
+        pipeline = AnalyzePipeline(
+            services, app.state.organizer, detector, retain_files=retain_files, taxonomy=taxonomy
         )
 
-        # Get categories
-        categories = list(organized_structure.keys())
+        if is_streaming_upload(request.headers.get("content-type")):
+            ingest = UploadIngest(
+                content_type=request.headers.get("content-type"),
+                content_encoding=request.headers.get("content-encoding"),
+                max_files=settings.MAX_FILES_PER_BATCH,
+                max_record_size=settings.MAX_FILE_SIZE,
+                model=FileItem,
+            )
+            files_stream = ticket.count_files(ingest.iter_files(ticket.stream(request.stream())))
+            if detector:
+                files_stream = detector.iter_marked(files_stream)
+
+            # Embed, persist, then organize while the upload is still being decoded
+            result = await pipeline.run(files_stream)
+            total_files = ingest.count
+            if "content-length" not in request.headers:
+                HTTP_REQUEST_BYTES.labels("/api/analyze").observe(ingest.bytes_received)
+        else:
+            try:
+                payload = AnalyzeRequest.model_validate_json(await ticket.read_body(request.stream()))
+            except ValidationError as e:
+                raise RequestValidationError(e.errors())
+            total_files = len(payload.files)
+            ticket.add_files(total_files)
+            if not total_files:
+                raise HTTPException(status_code=400, detail="No files provided")
+
+            # Convert to dict format
+            files_data = [file.model_dump() for file in payload.files]
+            del payload
+
+            if detector:
+                with stage_timer("dedupe"):
+                    if should_offload(len(files_data)):
+                        await detector.mark_all_offloaded(files_data)
+                    else:
+                        detector.mark_all(files_data)
+
+            result = await pipeline.run(iter_list(files_data))
+
+        if not total_files or result is None:
+            raise HTTPException(status_code=400, detail="No files provided")
 
-        return AnalyzeResponse(
-            collection_id=collection_id,
-            organized_structure=organized_structure,
-            total_files=len(request.files),
-            categories=categories,
+        organized_structure = result["organized_structure"]
+        if view == "compact":
+            organized_structure = compact_structure(organized_structure, extra_fields)
+        return await json_response(
+            {
+                "collection_id": result["collection_id"],
+                "organized_structure": organized_structure,
+                "total_files": total_files,
+                "categories": result["categories"],
+                "duplicate_groups": result["duplicate_groups"],
+            },
+            request.headers.get("accept-encoding"),
         )
 
+    except (HTTPException, RequestValidationError):
+        raise
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
     except Exception as e:
-        print(f"Error in analyze_files: {e}")
+        log.error("analyze.failed", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/search", response_model=SearchResponse)
-async def search_files(query: str, limit: int = 10):
+async def search_files(
+    query: str, limit: int = 10, services: ProviderSet = Depends(provider_services)
+):
     """
     Semantic search across all collections
     """
     try:
         organizer = app.state.organizer
-        results = await organizer.semantic_search(query, limit)
+        results = await organizer.semantic_search(query, limit, services.embedding_engine)
 
         return SearchResponse(results=results)
 
+    except EmbeddingSpaceMismatch as e:
+        # Stored vectors come from another embedding model; see /api/vector-index
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        log.error("search.failed", error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/autocomplete")
+async def autocomplete_files(
+    q: str, limit: Optional[int] = None, collection_id: Optional[List[str]] = Query(None)
+):
+    """
+    Filename/path typeahead from the SQLite full-text index (no model call).
+    Repeat `collection_id` to restrict matches to some collections.
+    """
+    if len(q) > settings.AUTOCOMPLETE_MAX_QUERY_LENGTH:
+        raise HTTPException(
+            status_code=400, detail=f"Query too long (max {settings.AUTOCOMPLETE_MAX_QUERY_LENGTH} characters)"
+        )
+    limit = min(max(1, limit or settings.AUTOCOMPLETE_DEFAULT_LIMIT), settings.AUTOCOMPLETE_MAX_LIMIT)
+
+    try:
+        organizer = app.state.organizer
+        results = await organizer.autocomplete(q, limit, collection_id)
+
+        return {"query": q, "results": results}
+
+    except Exception as e:
+        log.error("autocomplete.failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/collections/{collection_id}/files/{file_id}/similar")
+async def similar_files(
+    collection_id: str, file_id: str, limit: int = Query(10, ge=1, le=settings.NEIGHBOR_MAX_LIMIT)
+):
+    """
+    "More like this": files of the collection closest to a file, from its stored
+    vector (no model call). Uses the neighbor graph when one has been built.
+    """
+    try:
+        organizer = app.state.organizer
+        similar = await organizer.similar_files(collection_id, file_id, limit)
+
+        if similar is None:
+            raise HTTPException(status_code=404, detail="File not found")
+
+        return similar
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("similar.failed", collection_id=collection_id, file_id=file_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/collections/{collection_id}/neighbors")
+async def build_neighbor_graph(
+    collection_id: str,
+    k: Optional[int] = Query(None, ge=1, le=settings.NEIGHBOR_MAX_LIMIT),
+    ticket: Ticket = Depends(admit_bulk),
+):
+    """
+    Compute and persist the collection's top-k neighbor graph (default NEIGHBOR_GRAPH_K)
+    """
+    try:
+        organizer = app.state.organizer
+        summary = await organizer.build_neighbor_graph(collection_id, k)
+
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Collection not found")
+
+        return summary
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("neighbors.build_failed", collection_id=collection_id, error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/collections/{collection_id}/neighbors/duplicates")
+async def neighbor_duplicates(collection_id: str, threshold: Optional[float] = Query(None, ge=-1.0, le=1.0)):
+    """
+    Near-duplicate suggestions: file pairs whose similarity is at least `threshold`
+    """
+    try:
+        organizer = app.state.organizer
+        pairs = await organizer.neighbor_duplicates(collection_id, threshold)
+
+        if pairs is None:
+            raise HTTPException(status_code=404, detail="Neighbor graph not built")
+
+        return {"collection_id": collection_id, "pairs": pairs}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("neighbors.duplicates_failed", collection_id=collection_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/collections/{collection_id}/neighbors/clusters")
+async def neighbor_clusters(
+    collection_id: str, threshold: Optional[float] = Query(None, ge=-1.0, le=1.0), min_size: int = Query(2, ge=1)
+):
+    """
+    Clusters of files linked by neighbor similarities of at least `threshold`
+    """
+    try:
+        organizer = app.state.organizer
+        clusters = await organizer.neighbor_clusters(collection_id, threshold, min_size)
+
+        if clusters is None:
+            raise HTTPException(status_code=404, detail="Neighbor graph not built")
+
+        return {"collection_id": collection_id, "clusters": clusters}
+
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in search_files: {e}")
+        log.error("neighbors.clusters_failed", collection_id=collection_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -178,10 +500,216 @@ async def get_collection(collection_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_collection: {e}")
+        log.error("collection.get_failed", collection_id=collection_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/api/collections/{collection_id}")
+async def delete_collection(collection_id: str):
+    """
+    Delete a collection, its file records and its vectors.
+    Freed database space is compacted in the background.
+    """
+    try:
+        organizer = app.state.organizer
+        result = await organizer.delete_collection(collection_id)
+
+        if result is None:
+            raise HTTPException(status_code=404, detail="Collection not found")
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("collection.delete_failed", collection_id=collection_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/collections/retention")
+async def apply_retention(
+    keep_last: Optional[int] = None,
+    max_age_days: Optional[float] = None,
+    dry_run: bool = False,
+):
+    """
+    Delete collections outside the retention policies: all but the newest `keep_last`
+    and/or those older than `max_age_days` (defaults: RETENTION_* settings; 0 disables).
+    dry_run=true only lists what would be deleted.
+    """
+    try:
+        organizer = app.state.organizer
+        expired = await organizer.apply_retention(keep_last, max_age_days, dry_run)
+
+        return {"deleted": expired, "dry_run": dry_run}
+
+    except Exception as e:
+        log.error("retention.failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/collections/{collection_id}/stats")
+async def get_collection_stats(collection_id: str, top_n: int = Query(10, ge=1, le=settings.STATS_MAX_TOP_N)):
+    """
+    File statistics for a saved collection (counts, sizes, size histogram, top extensions)
+    """
+    try:
+        organizer = app.state.organizer
+        stats = await organizer.get_collection_stats(collection_id, top_n)
+
+        if stats is None:
+            raise HTTPException(status_code=404, detail="Collection not found")
+
+        return stats
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("collection.stats_failed", collection_id=collection_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/collections/{collection_id}/export")
+async def export_collection(
+    collection_id: str,
+    request: Request,
+    store_only: bool = False,
+):
+    """
+    Stream a collection as a Category/Subcategory/Folder ZIP built from the source files
+    under EXPORT_SOURCE_ROOT (paths resolving outside it are skipped as missing).
+    store_only=true skips compression entirely, which also makes the size known up front
+    so interrupted downloads can resume with a Range request.
+    """
+    try:
+        # Only the server decides where sources are read from; stored paths are client-supplied
+        root = settings.EXPORT_SOURCE_ROOT
+        if not root:
+            raise HTTPException(status_code=503, detail="Export is not configured (set EXPORT_SOURCE_ROOT)")
+
+        organizer = app.state.organizer
+        files = await organizer.get_collection_files(collection_id)
+        if files is None:
+            raise HTTPException(status_code=404, detail="Collection not found")
+
+        exporter = await asyncio.to_thread(
+            ZipExporter, files, root, store_only, settings.EXPORT_CHUNK_SIZE
+        )
+        if not exporter.entries:
+            raise HTTPException(status_code=404, detail="No source files found under EXPORT_SOURCE_ROOT")
+
+        total = exporter.content_length
+        etag = exporter.etag
+        headers = {
+            "Content-Disposition": f'attachment; filename="lumina-{collection_id}.zip"',
+            "ETag": etag,
+            "Accept-Ranges": "bytes" if total is not None else "none",
+            "X-Lumina-Missing-Files": str(len(exporter.missing)),
+        }
+
+        # Resume support: single byte ranges, only when the archive size is known
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header or "")
+        if total is not None and match and (not if_range or if_range == etag):
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), total - 1) if last else total - 1
+            elif last:
+                start, end = max(total - int(last), 0), total - 1
+            else:
+                start, end = 0, total - 1
+            if start >= total or start > end:
+                raise HTTPException(
+                    status_code=416, detail="Range not satisfiable",
+                    headers={"Content-Range": f"bytes */{total}"},
+                )
+            headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                exporter.iter_bytes(start, end), status_code=206,
+                media_type="application/zip", headers=headers,
+            )
+
+        if total is not None:
+            headers["Content-Length"] = str(total)
+        return StreamingResponse(exporter.iter_bytes(), media_type="application/zip", headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("collection.export_failed", collection_id=collection_id, error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/collections/{collection_id}/snapshot")
+async def export_collection_snapshot(collection_id: str):
+    """
+    Download a collection (file rows, structure and vectors) as a binary snapshot
+    that POST /api/collections/import restores without re-embedding
+    """
+    fd, path = tempfile.mkstemp(prefix="lumina-snapshot-", suffix=".lsnap")
+    os.close(fd)
+    try:
+        organizer = app.state.organizer
+        summary = await organizer.export_snapshot(collection_id, path)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Collection not found")
+
+        return FileResponse(
+            path,
+            media_type="application/octet-stream",
+            filename=f"lumina-{collection_id}.lsnap",
+            background=BackgroundTask(os.unlink, path),
+        )
+
+    except HTTPException:
+        os.unlink(path)
+        raise
+    except Exception as e:
+        os.unlink(path)
+        log.error("snapshot.export_failed", collection_id=collection_id, error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/collections/import")
+async def import_collection_snapshot(
+    request: Request, keep_id: bool = True, ticket: Ticket = Depends(admit_bulk)
+):
+    """
+    Restore a collection from a snapshot sent as the raw request body.
+    keep_id=false restores it under a new collection id (e.g. next to the original).
+    """
+    fd, path = tempfile.mkstemp(prefix="lumina-snapshot-", suffix=".lsnap")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in ticket.stream(request.stream()):
+                f.write(chunk)
+
+        try:
+            with Snapshot(path) as snapshot:
+                snapshot.validate()
+                collection_id = snapshot.collection["collection_id"]
+        except (SnapshotError, KeyError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        organizer = app.state.organizer
+        if keep_id and await organizer.get_collection(collection_id):
+            raise HTTPException(status_code=409, detail=f"Collection {collection_id} already exists")
+
+        return await organizer.import_snapshot(path, keep_id)
+
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+    except Exception as e:
+        log.error("snapshot.import_failed", error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.unlink(path)
+
+
 @app.get("/api/collections")
 async def get_all_collections():
     """
@@ -194,7 +722,153 @@ async def get_all_collections():
         return {"collections": collections}
 
     except Exception as e:
-        print(f"Error in get_all_collections: {e}")
+        log.error("collections.list_failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/taxonomies")
+async def create_taxonomy(request: TaxonomyRequest, services: ProviderSet = Depends(provider_services)):
+    """
+    Save a taxonomy template from a structure or a previous collection's
+    organization; its folder paths are embedded now so analyses placing files
+    against it (/api/analyze?taxonomy_id=) skip the model's structure call
+    """
+    try:
+        if (request.structure is None) == (request.collection_id is None):
+            raise HTTPException(status_code=400, detail="Provide either structure or collection_id")
+
+        organizer = app.state.organizer
+        structure = request.structure
+        if request.collection_id:
+            collection = await organizer.get_collection(request.collection_id)
+            if not collection:
+                raise HTTPException(status_code=404, detail="Collection not found")
+            structure = collection["organized_structure"]
+        try:
+            structure = normalize_structure(structure)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if len(folder_paths(structure)) > settings.TAXONOMY_MAX_FOLDERS:
+            raise HTTPException(
+                status_code=400, detail=f"Too many folders (max {settings.TAXONOMY_MAX_FOLDERS} per taxonomy)"
+            )
+
+        # Stored without vectors if the model is down; they are computed on first use
+        engine = services.embedding_engine
+        vectors = await embed_folder_paths(engine, structure)
+        return await organizer.create_taxonomy(
+            request.name, structure, vectors, engine.space, source_collection_id=request.collection_id
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("taxonomy.create_failed", error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/taxonomies")
+async def get_all_taxonomies():
+    """
+    List taxonomy templates
+    """
+    try:
+        organizer = app.state.organizer
+        return {"taxonomies": await organizer.get_all_taxonomies()}
+
+    except Exception as e:
+        log.error("taxonomies.list_failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/taxonomies/{taxonomy_id}")
+async def get_taxonomy(taxonomy_id: str):
+    """
+    Retrieve a taxonomy template
+    """
+    try:
+        organizer = app.state.organizer
+        taxonomy = await organizer.get_taxonomy(taxonomy_id)
+
+        if not taxonomy:
+            raise HTTPException(status_code=404, detail="Taxonomy not found")
+
+        return taxonomy
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("taxonomy.get_failed", taxonomy_id=taxonomy_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/api/taxonomies/{taxonomy_id}")
+async def delete_taxonomy(taxonomy_id: str):
+    """
+    Delete a taxonomy template (collections organized with it are kept)
+    """
+    try:
+        organizer = app.state.organizer
+        if not await organizer.delete_taxonomy(taxonomy_id):
+            raise HTTPException(status_code=404, detail="Taxonomy not found")
+
+        return {"taxonomy_id": taxonomy_id, "deleted": True}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("taxonomy.delete_failed", taxonomy_id=taxonomy_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/vector-index")
+async def get_vector_index():
+    """
+    Active vector index (embedding model and dimension) and the progress of any
+    re-embedding migration building its replacement
+    """
+    try:
+        return await app.state.migration.status()
+
+    except Exception as e:
+        log.error("vector_index.status_failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/vector-index/migrate")
+async def start_vector_index_migration():
+    """
+    Re-embed all stored files with the current embedding model in the background,
+    then switch searches over to the new index. No-op when the index is current.
+    """
+    try:
+        migration = app.state.migration
+        started = migration.start()
+
+        return {"started": started, **await migration.status()}
+
+    except Exception as e:
+        log.error("vector_index.migrate_failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/api/vector-index/migration")
+async def cancel_vector_index_migration():
+    """
+    Stop the running re-embedding migration and drop the index it was building
+    """
+    try:
+        cancelled = await app.state.migration.cancel()
+
+        if cancelled is None:
+            raise HTTPException(status_code=404, detail="No migration in progress")
+
+        return cancelled
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error("vector_index.cancel_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -229,7 +903,12 @@ async def update_settings(request: SettingsRequest):
             )
         
         # Update settings in memory
-        settings.AI_PROVIDER = request.ai_provider
+        updates = {"AI_PROVIDER": request.ai_provider}
+        if request.embedding_model:
+            model_key = "GEMINI_EMBEDDING_MODEL" if request.ai_provider == "gemini" else "OLLAMA_EMBEDDING_MODEL"
+            updates[model_key] = request.embedding_model
+        for key, value in updates.items():
+            setattr(settings, key, value)
         
         # Save to .env file
         env_path = Path(__file__).parent / ".env"
@@ -240,37 +919,38 @@ async def update_settings(request: SettingsRequest):
             with open(env_path, 'r') as f:
                 env_lines = f.readlines()
         
-        # Update AI_PROVIDER
-        updated_provider = False
+        # Update existing keys in place
+        pending = dict(updates)
         for i, line in enumerate(env_lines):
-            if line.startswith('AI_PROVIDER='):
-                env_lines[i] = f'AI_PROVIDER={request.ai_provider}\n'
-                updated_provider = True
-                break
+            key = line.split('=', 1)[0]
+            if key in pending:
+                env_lines[i] = f'{key}={pending.pop(key)}\n'
         
-        # Add if not found
-        if not updated_provider:
-            env_lines.append(f'AI_PROVIDER={request.ai_provider}\n')
+        # Add the ones not found
+        for key, value in pending.items():
+            env_lines.append(f'{key}={value}\n')
         
         # Write back to .env
         with open(env_path, 'w') as f:
             f.writelines(env_lines)
         
-        # Reinitialize AI services with new settings
-        app.state.embedding_engine = EmbeddingEngine()
-        app.state.ai_thinker = AIThinker()
+        # Swap AI services atomically; requests already running finish on the old ones
+        await app.state.providers.swap()
+
+        # A different embedding model makes the stored vectors incomparable: re-embed them
+        if settings.VECTOR_MIGRATION_AUTO:
+            app.state.migration.start()
         
         return {"status": "success", "message": f"Switched to {request.ai_provider.upper()} successfully"}
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating settings: {e}")
+        log.error("settings.update_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
 if __name__ == "__main__":
-    import os
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(
         "main:app",
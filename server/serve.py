@@ -0,0 +1,72 @@
+"""
+Multi-process launcher - One index service process plus N uvicorn API workers
+
+The index service is the only process that opens SQLite for writing and the
+persistent ChromaDB store; API workers reach it over a Unix socket. Each worker
+keeps its own provider clients and, with --cpu-workers, its own process pool for
+mapping and duplicate detection.
+
+Usage (from the server directory):
+    python serve.py --workers 4 --cpu-workers 2 --port 8000
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import uvicorn
+
+from config import settings
+from core.indexservice import run_index_service
+
+
+def wait_for_socket(path: str, process: multiprocessing.Process, timeout: float = 120.0):
+    """Block until the index service accepts connections"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"index service exited with code {process.exitcode}")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(path)
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"index service did not start listening on {path} within {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run LUMINA with several API worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="API worker processes")
+    parser.add_argument("--cpu-workers", type=int, default=0,
+                        help="Process pool size per API worker for mapping/dedupe (0 = inline)")
+    parser.add_argument("--socket", help="Index service Unix socket path (default: a temp path)")
+    args = parser.parse_args()
+
+    socket_path = args.socket or os.path.join(tempfile.gettempdir(), f"lumina-index-{os.getpid()}.sock")
+
+    service = multiprocessing.get_context("spawn").Process(
+        target=run_index_service, args=(socket_path,), name="lumina-index"
+    )
+    service.start()
+    try:
+        wait_for_socket(socket_path, service)
+        # Inherited by the spawned API workers before config.settings is loaded there;
+        # with a single worker uvicorn runs the app in this process, which already loaded it
+        os.environ["INDEX_SERVICE_SOCKET"] = settings.INDEX_SERVICE_SOCKET = socket_path
+        os.environ["CPU_WORKERS"] = str(args.cpu_workers)
+        settings.CPU_WORKERS = args.cpu_workers
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level="info")
+    finally:
+        service.terminate()
+        service.join(30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())